@@ -0,0 +1,78 @@
+"""Compares processing request and response data with the compiled processors of endpoints
+against generic schema processing, using the schemas of the standard create and query
+endpoints.
+
+    $ python benchmarks/processing.py [--resources 1000] [--iterations 20]
+"""
+
+import os
+import sys
+from argparse import ArgumentParser
+from timeit import default_timer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheme import INBOUND, OUTBOUND, Boolean, DateTime, Float, Integer, Sequence, Text
+
+from mesh.compilation import compile_processor
+from mesh.constants import OK
+from mesh.standard import Resource
+
+class Document(Resource):
+    name = 'document'
+    version = 1
+
+    class schema:
+        title = Text(required=True, max_length=200)
+        summary = Text()
+        author = Text(nonnull=True)
+        rating = Float()
+        views = Integer(minimum=0)
+        published = Boolean(default=False)
+        tags = Sequence(Text(), unique=True)
+        modified = DateTime()
+
+def construct_document(i):
+    return {'id': i, 'title': 'Document %d' % i, 'summary': 'A summary of document %d' % i,
+        'author': 'author%d' % (i % 50), 'rating': i / 7.0, 'views': i * 3,
+        'published': bool(i % 2), 'tags': ['tag%d' % (i % 5), 'tag%d' % (i % 5 + 5)]}
+
+def measure(function, value, iterations):
+    start = default_timer()
+    for i in range(iterations):
+        function(value)
+    return default_timer() - start
+
+def compare(title, schema, value, phase, iterations):
+    compiled = compile_processor(schema, phase, True)
+    assert compiled(value) == schema.process(value, phase, True)
+
+    generic = measure(lambda value: schema.process(value, phase, True), value, iterations)
+    fast = measure(compiled, value, iterations)
+
+    print(title)
+    print('  %-20s %8.3fs' % ('generic', generic))
+    print('  %-20s %8.3fs %6.2fx' % ('compiled', fast, generic / fast))
+
+def run(resources, iterations):
+    create = Document.endpoints['create'].schema
+    documents = [construct_document(i) for i in range(1, resources + 1)]
+
+    creation = dict(documents[0])
+    del creation['id']
+    compare('create request, %d iterations' % (iterations * resources), create, creation,
+        INBOUND, iterations * resources)
+
+    query = Document.endpoints['query'].responses[OK].schema
+    compare('query response of %d resources, %d iterations' % (resources, iterations), query,
+        {'total': resources, 'resources': documents}, OUTBOUND, iterations)
+
+def main():
+    parser = ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--resources', type=int, default=1000)
+    parser.add_argument('--iterations', type=int, default=20)
+    options = parser.parse_args()
+    run(options.resources, options.iterations)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Compares the time taken to decode, process and encode large nested payloads in both
+directions, as a server does for serialized requests, and the peak memory allocated to process
+and encode them once decoded, with generic schema processing, compiled processors which copy
+the data they process, and compiled processors which reuse data which is already valid.
+
+    $ python benchmarks/roundtrip.py [--orders 200] [--lines 50] [--iterations 10]
+"""
+
+import json
+import os
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from timeit import default_timer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheme import INBOUND, OUTBOUND, Boolean, Float, Integer, Sequence, Structure, Text
+
+from mesh.compilation import compile_processor
+
+Line = Structure({
+    'sku': Text(nonnull=True, max_length=32),
+    'description': Text(),
+    'quantity': Integer(minimum=1),
+    'price': Float(minimum=0.0),
+    'taxable': Boolean(),
+    'tags': Sequence(Text(), unique=True),
+})
+
+Order = Structure({
+    'id': Integer(nonnull=True),
+    'customer': Structure({'name': Text(required=True), 'email': Text()}),
+    'lines': Sequence(Line, nonnull=True),
+    'notes': Text(),
+    'total': Float(),
+})
+
+Payload = Structure({'orders': Sequence(Order, nonnull=True)})
+
+def construct_payload(orders, lines):
+    return {'orders': [{'id': i, 'customer': {'name': 'Customer %d' % i,
+        'email': 'customer%d@example.com' % i}, 'notes': 'Order %d' % i, 'total': i * 1.5,
+        'lines': [{'sku': 'SKU-%d-%d' % (i, j), 'description': 'Line %d of order %d' % (j, i),
+            'quantity': j + 1, 'price': j * 0.25, 'taxable': bool(j % 2),
+            'tags': ['tag%d' % (j % 3), 'tag%d' % (j % 3 + 3)]} for j in range(lines)]}
+        for i in range(orders)]}
+
+def construct_processors():
+    def generic(phase):
+        def process(value):
+            return Payload.process(value, phase, True)
+        return process
+
+    return [('generic', generic(INBOUND), generic(OUTBOUND)),
+        ('compiled', compile_processor(Payload, INBOUND, True),
+            compile_processor(Payload, OUTBOUND, True)),
+        ('compiled, reused', compile_processor(Payload, INBOUND, True, True),
+            compile_processor(Payload, OUTBOUND, True, True))]
+
+def measure(inbound, outbound, text, iterations):
+    start = default_timer()
+    for i in range(iterations):
+        json.dumps(outbound(inbound(json.loads(text))))
+    duration = default_timer() - start
+
+    data = json.loads(text)
+    tracemalloc.start()
+    json.dumps(outbound(inbound(data)))
+    allocated = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return duration, allocated
+
+def run(orders, lines, iterations):
+    text = json.dumps(construct_payload(orders, lines))
+    processors = construct_processors()
+
+    expected = json.loads(text)
+    for title, inbound, outbound in processors:
+        assert outbound(inbound(json.loads(text))) == expected
+
+    print('%d orders of %d lines, %d bytes, %d iterations' % (orders, lines, len(text),
+        iterations))
+    print('  %-20s %8s %8s %12s' % ('', 'time', 'speedup', 'allocated'))
+
+    baseline = None
+    for title, inbound, outbound in processors:
+        duration, allocated = measure(inbound, outbound, text, iterations)
+        baseline = baseline or duration
+        print('  %-20s %7.3fs %7.2fx %10.1fMB' % (title, duration, baseline / duration,
+            allocated / 1048576.0))
+
+def main():
+    parser = ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--orders', type=int, default=200)
+    parser.add_argument('--lines', type=int, default=50)
+    parser.add_argument('--iterations', type=int, default=10)
+    options = parser.parse_args()
+    run(options.orders, options.lines, options.iterations)
+
+if __name__ == '__main__':
+    main()
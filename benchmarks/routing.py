@@ -0,0 +1,106 @@
+"""Compares resolving request paths with the segment trie router of HttpServer against the
+regex parse and signature lookup it replaces.
+
+    $ python benchmarks/routing.py [--resources 500] [--requests 100000]
+"""
+
+import os
+import random
+import sys
+from argparse import ArgumentParser
+from timeit import default_timer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheme import Integer, Text
+
+from mesh.address import Address
+from mesh.bundle import Bundle, mount
+from mesh.resource import Controller
+from mesh.standard import Resource
+from mesh.transport.http import HttpServer
+
+def construct_bundle(count):
+    mounts = []
+    for i in range(count):
+        resource = type('Resource%d' % i, (Resource,), {
+            'name': 'resource%d' % i,
+            'version': 1,
+            'schema': {'name': Text(), 'value': Integer()},
+        })
+        controller = type('Controller%d' % i, (Controller,), {
+            'resource': resource,
+            'version': (1, 0),
+        })
+        mounts.append(mount(resource, controller))
+
+    return Bundle('benchmark', *mounts)
+
+def construct_signature_table(server):
+    paths = {}
+    for name, bundle in server.bundles.items():
+        for resource_addr, resource, controller in bundle.enumerate_resources():
+            for addr, endpoint in resource.enumerate_endpoints(resource_addr):
+                if endpoint.method:
+                    signature = addr.render_prefixed_path('id', 'id')
+                    paths.setdefault(signature, {})[endpoint.method] = (resource, controller,
+                        endpoint)
+    return paths
+
+def resolve_by_signature(paths, path):
+    address = Address.parse(path)
+    candidates = paths.get(address.render_prefixed_path('id', 'id'))
+    return address, candidates
+
+def measure(function, paths):
+    start = default_timer()
+    for path in paths:
+        function(path)
+    return default_timer() - start
+
+def run(resources, requests, distinct):
+    server = HttpServer([construct_bundle(resources)])
+    table = construct_signature_table(server)
+
+    candidates = []
+    for i in range(distinct):
+        resource = random.randrange(resources)
+        if i % 2:
+            candidates.append('/benchmark/1.0/resource%d/%d' % (resource, random.randrange(10000)))
+        else:
+            candidates.append('/benchmark/1.0/resource%d' % resource)
+
+    paths = [random.choice(candidates) for i in range(requests)]
+    for path in candidates:
+        address, methods = server.router.resolve(path)
+        expected, expected_methods = resolve_by_signature(table, path)
+        assert address.signature == expected.signature and methods == expected_methods
+
+    router = server.router
+    results = [
+        ('regex parse and signature lookup', measure(lambda path:
+            resolve_by_signature(table, path), paths)),
+        ('segment trie, uncached', measure(router._resolve_path, paths)),
+    ]
+
+    router.cache.clear()
+    results.append(('segment trie, memoized', measure(router.resolve, paths)))
+
+    print('%d resources, %d requests over %d distinct paths' % (resources, requests, distinct))
+    baseline = results[0][1]
+    for name, elapsed in results:
+        print('  %-34s %8.3fs %8.2fus/request %6.2fx' % (name, elapsed,
+            elapsed / requests * 1e6, baseline / elapsed))
+
+def main():
+    parser = ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--resources', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=100000)
+    parser.add_argument('--distinct', type=int, default=500)
+    options = parser.parse_args()
+
+    random.seed(0)
+    run(options.resources, options.requests, options.distinct)
+
+if __name__ == '__main__':
+    main()
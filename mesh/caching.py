@@ -0,0 +1,213 @@
+from threading import Lock
+from time import time
+from weakref import WeakSet
+
+from mesh.util import LruCache, string
+
+__all__ = ('AcquisitionCache', 'ResponseCache')
+
+class AcquisitionCache(object):
+    """A cache of the subjects acquired by a controller, keyed by the subject specified by
+    each request, which are evicted when least recently used or when they expire.
+
+    Identifiers for which the controller acquired no subject are cached separately, with their
+    own time to live, so that repeated requests for unknown subjects are answered without
+    invoking the controller.
+
+    :param int capacity: Optional, default is ``1000``; the maximum number of cached subjects,
+        and separately of cached unknown identifiers.
+
+    :param int ttl: Optional, default is ``60``; the number of seconds a subject is cached.
+
+    :param int negative_ttl: Optional, default is ``None``; if specified, the number of seconds
+        an identifier for which no subject was acquired is cached. If ``None``, such
+        identifiers are not cached.
+    """
+
+    def __init__(self, capacity=1000, ttl=60, negative_ttl=None):
+        self.generation = 0
+        self.lock = Lock()
+        self.subjects = LruCache(capacity, ttl)
+
+        self.missing = None
+        if negative_ttl:
+            self.missing = LruCache(capacity, negative_ttl)
+
+    def get(self, identifier, default=None):
+        """Returns the subject cached for ``identifier``, ``None`` if it is cached as having no
+        subject, or otherwise ``default``."""
+
+        identifier = str(identifier)
+        subject = self.subjects.get(identifier, default)
+        if subject is default and self.missing is not None and identifier in self.missing:
+            return None
+        return subject
+
+    def invalidate(self, identifier=None):
+        """Invalidates the cached subject for ``identifier``, or every cached subject and
+        unknown identifier if ``identifier`` is not specified."""
+
+        with self.lock:
+            self.generation += 1
+
+        if identifier is None:
+            self.subjects.clear()
+            if self.missing is not None:
+                self.missing.clear()
+        else:
+            identifier = str(identifier)
+            self.subjects.discard(identifier)
+            if self.missing is not None:
+                self.missing.discard(identifier)
+
+    def invalidate_missing(self):
+        """Invalidates every cached unknown identifier, such as when subjects are created."""
+
+        with self.lock:
+            self.generation += 1
+        if self.missing is not None:
+            self.missing.clear()
+
+    def set(self, identifier, subject, generation=None):
+        """Caches ``subject``, acquired for ``identifier``. If ``generation`` is specified, it
+        should be the :attr:`generation` of this cache when the subject began to be acquired;
+        the subject is then discarded if this cache was invalidated in the meantime."""
+
+        if generation is not None and generation != self.generation:
+            return
+
+        identifier = str(identifier)
+        if subject:
+            self.subjects.set(identifier, subject)
+        elif self.missing is not None:
+            self.missing.set(identifier, True)
+
+class CacheEntry(object):
+    """A serialized response held by a :class:`ResponseCache`."""
+
+    def __init__(self, data, mimetype, headers, expires):
+        self.data = data
+        self.expires = expires
+        self.headers = headers
+        self.mimetype = mimetype
+
+    @property
+    def stale(self):
+        return self.expires <= time()
+
+class ResponseCache(object):
+    """A server-side cache of serialized responses to ``GET`` requests.
+
+    Responses are keyed by controller, endpoint, subject, request data, response format and
+    request context, and are evicted when least recently used or when they expire. As the
+    controller implements a particular version of a resource, responses for same-named
+    resources mounted in different bundles or versions are kept apart. Cached responses are
+    served without invoking mediators or controllers, so a server should only be given a cache
+    if the response to a request is fully determined by that key.
+
+    Successful requests to other endpoints of a resource invalidate the cached responses
+    produced by every version of its controller automatically; controllers can also invalidate
+    them explicitly, such as when the underlying data is changed by other means, with
+    :meth:`Controller.invalidate`.
+
+    :param int capacity: Optional, default is ``1000``; the maximum number of cached responses.
+
+    :param int ttl: Optional, default is ``60``; the number of seconds a cached response remains
+        fresh.
+
+    :param int stale_ttl: Optional, default is ``None``; if specified, the number of seconds a
+        response remains in the cache after it is no longer fresh. A stale response is served
+        as is while a fresh response is produced in the background.
+    """
+
+    instances = WeakSet()
+
+    def __init__(self, capacity=1000, ttl=60, stale_ttl=None):
+        self.generation = 0
+        self.lock = Lock()
+        self.revalidating = set()
+        self.stale_ttl = stale_ttl
+        self.ttl = ttl
+
+        self.entries = LruCache(capacity, ttl + (stale_ttl or 0))
+        self.instances.add(self)
+
+    def begin_revalidation(self, key):
+        """Claims the revalidation of the stale response for ``key``, returning ``False`` if it
+        is already being revalidated."""
+
+        with self.lock:
+            if key in self.revalidating:
+                return False
+            self.revalidating.add(key)
+            return True
+
+    def construct_key(self, controller, endpoint, request, format, params=None):
+        subject = request.subject
+        if subject is not None:
+            subject = str(subject)
+
+        return (controller, endpoint.name, subject, _freeze(request.data),
+            format.name, _freeze(params), _freeze(request.context))
+
+    def end_revalidation(self, key):
+        with self.lock:
+            self.revalidating.discard(key)
+
+    def get(self, key):
+        """Returns the :class:`CacheEntry` cached for ``key``, which may be stale, or
+        ``None``."""
+
+        return self.entries.get(key)
+
+    def invalidate(self, controllers, subject=None):
+        """Invalidates the cached responses produced by ``controllers``, a sequence of
+        controller classes. If ``subject`` is specified, only the responses for that subject
+        and those not specific to any subject, such as the results of queries, are
+        invalidated."""
+
+        controllers = frozenset(controllers)
+        with self.lock:
+            self.generation += 1
+
+        if subject is None:
+            self.entries.discard_matching(lambda key: key[0] in controllers)
+        else:
+            subject = str(subject)
+            self.entries.discard_matching(lambda key: key[0] in controllers
+                and key[2] in (subject, None))
+
+    @classmethod
+    def invalidate_all(cls, controllers, subject=None):
+        """Invalidates the cached responses produced by ``controllers`` in every response
+        cache."""
+
+        controllers = frozenset(controllers)
+        for instance in list(cls.instances):
+            instance.invalidate(controllers, subject)
+
+    def set(self, key, response, generation=None):
+        """Caches ``response`` for ``key``. If ``generation`` is specified, it should be the
+        :attr:`generation` of this cache when the response began to be produced; the response
+        is then discarded if this cache was invalidated in the meantime."""
+
+        if generation is not None and generation != self.generation:
+            return
+
+        data = response.data
+        if isinstance(data, string) and not isinstance(data, bytes):
+            data = data.encode('utf8')
+
+        entry = CacheEntry(data, response.mimetype, dict(response.headers), time() + self.ttl)
+        self.entries.set(key, entry)
+        return entry
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    elif isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    elif isinstance(value, set):
+        return tuple(sorted(_freeze(v) for v in value))
+    else:
+        return value
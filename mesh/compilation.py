@@ -0,0 +1,284 @@
+from scheme import INBOUND, Boolean, Field, Float, Integer, Sequence, Structure, Text
+from scheme.exceptions import StructuralError
+
+from mesh.util import string
+
+__all__ = ('compile_processor', 'is_native')
+
+NATIVE_TYPES = (Boolean, Float, Integer, Text)
+
+class Deviation(Exception):
+    """Raised by a compiled processor when a value departs from the path it was compiled
+    for, such that the generic processor must be used to process it."""
+
+def compile_processor(schema, phase=INBOUND, serialized=False, reuse=False):
+    """Compiles ``schema`` into a processor, a callable which accepts a value and returns the
+    same result as ``schema.process(value, phase, serialized)``.
+
+    The common field types (structures, sequences, text, integers, floats and booleans) are
+    compiled into closures in which the attributes of each field, such as whether it is
+    required or nonnull, have been looked up in advance, and which only check values which
+    are valid. Other fields, and fields with preprocessors or constants, are processed by
+    their generic implementations. If a value is found to be invalid, or otherwise departs
+    from what the processor was compiled for, the entire value is processed again by
+    ``schema``, so that the same exception, with the same errors, is raised as would have
+    been otherwise.
+
+    If ``reuse`` is ``True``, compiled structures and sequences are returned as is, rather than
+    copied, when processing leaves their content unchanged, and are otherwise copied only
+    once a change is found. This spares a copy of data which is already valid, and should
+    only be used when nothing else holds the value, such as when it was just decoded from a
+    request body or is about to be encoded into a response body.
+    """
+
+    compiled = _compile_field(schema, phase, serialized, reuse)
+    if not compiled:
+        return _construct_generic_processor(schema, phase, serialized)
+
+    def process(value):
+        try:
+            return compiled(value)
+        except (Deviation, StructuralError):
+            return schema.process(value, phase, serialized)
+
+    return process
+
+def is_native(field):
+    """Indicates whether valid values for ``field`` are already in their serialized form, such
+    that processing them outbound would only validate them."""
+
+    if not isinstance(field, Field) or field.preprocessor:
+        return False
+
+    field_type = type(field)
+    if field_type is Structure:
+        if field.polymorphic_on:
+            return False
+        for subfield in field.structure.values():
+            if not is_native(subfield):
+                return False
+        return True
+    elif field_type is Sequence:
+        return is_native(field.item)
+    else:
+        return field_type in NATIVE_TYPES
+
+def _compile_field(field, phase, serialized, reuse=False):
+    if not isinstance(field, Field):
+        return None
+    if field.preprocessor or field.constant is not None:
+        return None
+
+    compiler = COMPILERS.get(type(field))
+    if compiler:
+        return compiler(field, phase, serialized, reuse)
+
+def _compile_boolean(field, phase, serialized, reuse):
+    nonnull = field.nonnull
+
+    def process(value):
+        if value is None:
+            if nonnull:
+                raise Deviation()
+            return None
+        if value is True or value is False:
+            return value
+        raise Deviation()
+
+    return process
+
+def _compile_float(field, phase, serialized, reuse):
+    generic = _construct_generic_processor(field, phase, serialized)
+    minimum, maximum, nonnull = field.minimum, field.maximum, field.nonnull
+
+    def process(value):
+        if value is None:
+            if nonnull:
+                raise Deviation()
+            return None
+        if type(value) is not float:
+            return generic(value)
+        if minimum is not None and value < minimum:
+            raise Deviation()
+        if maximum is not None and value > maximum:
+            raise Deviation()
+        return value
+
+    return process
+
+def _compile_integer(field, phase, serialized, reuse):
+    generic = _construct_generic_processor(field, phase, serialized)
+    minimum, maximum, nonnull = field.minimum, field.maximum, field.nonnull
+
+    def process(value):
+        if value is None:
+            if nonnull:
+                raise Deviation()
+            return None
+        if type(value) is not int:
+            return generic(value)
+        if minimum is not None and value < minimum:
+            raise Deviation()
+        if maximum is not None and value > maximum:
+            raise Deviation()
+        return value
+
+    return process
+
+def _compile_sequence(field, phase, serialized, reuse):
+    if not isinstance(field.item, Field):
+        return None
+
+    item = (_compile_field(field.item, phase, serialized, reuse)
+        or _construct_generic_processor(field.item, phase, serialized))
+
+    min_length, max_length = field.min_length, field.max_length
+    nonnull, unique = field.nonnull, field.unique
+
+    def process(value):
+        if value is None:
+            if nonnull:
+                raise Deviation()
+            return None
+        if not isinstance(value, list):
+            raise Deviation()
+        if min_length is not None and len(value) < min_length:
+            raise Deviation()
+        if max_length is not None and len(value) > max_length:
+            raise Deviation()
+
+        if reuse:
+            sequence = value
+            for i, subvalue in enumerate(value):
+                processed = item(subvalue)
+                if processed is not subvalue:
+                    sequence = value[:i]
+                    sequence.append(processed)
+                    sequence.extend([item(subvalue) for subvalue in value[i + 1:]])
+                    break
+        else:
+            sequence = [item(subvalue) for subvalue in value]
+
+        if unique and len(set(sequence)) != len(sequence):
+            raise Deviation()
+        return sequence
+
+    return process
+
+def _compile_structure(field, phase, serialized, reuse):
+    if field.polymorphic_on or field.key_order:
+        return None
+
+    entries = []
+    for name, subfield in field.structure.items():
+        if not isinstance(subfield, Field):
+            return None
+
+        processor = (_compile_field(subfield, phase, serialized, reuse)
+            or _construct_generic_processor(subfield, phase, serialized))
+
+        default = default_processor = None
+        if phase == INBOUND and subfield.default is not None:
+            default = subfield.default
+            default_processor = processor
+            if reuse:
+                # defaults belong to the schema, so they must never be reused
+                default_processor = (_compile_field(subfield, phase, serialized, False)
+                    or _construct_generic_processor(subfield, phase, serialized))
+
+        entries.append((len(entries), name, processor, default, default_processor,
+            subfield.required, subfield.ignore_null))
+
+    names = [entry[1] for entry in entries]
+    nonnull, strict = field.nonnull, field.strict
+
+    def process(value):
+        if value is None:
+            if nonnull:
+                raise Deviation()
+            return None
+        if not isinstance(value, dict):
+            raise Deviation()
+
+        structure = None if reuse else {}
+        matched = 0
+
+        for i, name, processor, default, default_processor, required, ignore_null in entries:
+            supplied = name in value
+            if supplied:
+                matched += 1
+                subvalue = value[name]
+            elif default is not None:
+                subvalue, processor = default, default_processor
+            elif required:
+                raise Deviation()
+            else:
+                continue
+
+            if subvalue is None and ignore_null:
+                if structure is None:
+                    structure = _copy_entries(value, names, i)
+                continue
+
+            processed = processor(subvalue)
+            if structure is None:
+                if supplied and processed is subvalue:
+                    continue
+                structure = _copy_entries(value, names, i)
+            structure[name] = processed
+
+        if matched != len(value):
+            if strict:
+                raise Deviation()
+            if structure is None:
+                structure = _copy_entries(value, names, len(names))
+
+        if structure is None:
+            return value
+        return structure
+
+    return process
+
+def _compile_text(field, phase, serialized, reuse):
+    min_length, max_length, pattern = field.min_length, field.max_length, field.pattern
+    nonnull, strip = field.nonnull, field.strip
+
+    def process(value):
+        if value is None:
+            if nonnull:
+                raise Deviation()
+            return None
+        if not isinstance(value, string):
+            raise Deviation()
+        if strip:
+            value = value.strip()
+        if min_length is not None and len(value) < min_length:
+            raise Deviation()
+        if max_length is not None and len(value) > max_length:
+            raise Deviation()
+        if pattern and not pattern.match(value):
+            raise Deviation()
+        return value
+
+    return process
+
+def _copy_entries(value, names, count):
+    structure = {}
+    for name in names[:count]:
+        if name in value:
+            structure[name] = value[name]
+    return structure
+
+def _construct_generic_processor(field, phase, serialized):
+    def process(value):
+        return field.process(value, phase, serialized)
+    return process
+
+COMPILERS = {
+    Boolean: _compile_boolean,
+    Float: _compile_float,
+    Integer: _compile_integer,
+    Sequence: _compile_sequence,
+    Structure: _compile_structure,
+    Text: _compile_text,
+}
@@ -21,6 +21,8 @@ PARTIAL = 'PARTIAL'
 
 VALID_STATUS_CODES = (OK, CREATED, ACCEPTED, SUBSET, PARTIAL)
 
+NOT_MODIFIED = 'NOT_MODIFIED'
+
 BAD_REQUEST = 'BAD_REQUEST'
 FORBIDDEN = 'FORBIDDEN'
 NOT_FOUND = 'NOT_FOUND'
@@ -29,6 +31,7 @@ INVALID = 'INVALID'
 TIMEOUT = 'TIMEOUT'
 CONFLICT = 'CONFLICT'
 GONE = 'GONE'
+PAYLOAD_TOO_LARGE = 'PAYLOAD_TOO_LARGE'
 
 SERVER_ERROR = 'SERVER_ERROR'
 UNIMPLEMENTED = 'UNIMPLEMENTED'
@@ -36,9 +39,9 @@ BAD_GATEWAY = 'BAD_GATEWAY'
 UNAVAILABLE = 'UNAVAILABLE'
 
 ERROR_STATUS_CODES = (BAD_REQUEST, FORBIDDEN, NOT_FOUND, METHOD_NOT_ALLOWED, INVALID, TIMEOUT,
-    CONFLICT, GONE, SERVER_ERROR, UNIMPLEMENTED, BAD_GATEWAY, UNAVAILABLE)
+    CONFLICT, GONE, PAYLOAD_TOO_LARGE, SERVER_ERROR, UNIMPLEMENTED, BAD_GATEWAY, UNAVAILABLE)
 
-STATUS_CODES = tuple(list(VALID_STATUS_CODES) + list(ERROR_STATUS_CODES))
+STATUS_CODES = tuple(list(VALID_STATUS_CODES) + [NOT_MODIFIED] + list(ERROR_STATUS_CODES))
 
 JSON = 'application/json'
 URLENCODED = 'application/x-www-form-urlencoded'
@@ -24,6 +24,7 @@ STATUS_CODES = (
     (INVALID, '406 Invalid'),
     (CONFLICT, '409 Conflict'),
     (GONE, '410 Gone'),
+    (PAYLOAD_TOO_LARGE, '413 Payload Too Large'),
     (SERVER_ERROR, '500 Internal Server Error'),
     (UNIMPLEMENTED, '501 Not Implemented'),
     (UNAVAILABLE, '503 Service Unavailable'),
@@ -2,20 +2,27 @@ import logging
 import re
 from copy import deepcopy
 from inspect import isclass
+from random import random
 from textwrap import dedent
 
-from scheme import INBOUND, OUTBOUND, Field, Structure
+from scheme import INBOUND, OUTBOUND, Field, Sequence, Structure
 from scheme.exceptions import *
 from scheme.util import format_structure
 
+from mesh.compilation import compile_processor, is_native
 from mesh.constants import *
 from mesh.exceptions import *
-from mesh.util import LogHelper, pull_class_dict, string
+from mesh.projection import Projection, locate_resource_structure
+from mesh.util import LogHelper, is_awaitable, is_iterator, pull_class_dict, string
+from mesh.util import LruCache, execute_concurrently
 
-__all__ = ('Endpoint', 'EndpointConstructor', 'EndpointResponse', 'Mediator', 'validator')
+__all__ = ('Endpoint', 'EndpointConstructor', 'EndpointResponse', 'Mediator',
+    'ValidationPolicy', 'validator')
 
 log = LogHelper(__name__)
 
+UNKNOWN = object()
+
 class EndpointConstructor(object):
     """An endpoint constructor."""
 
@@ -82,9 +89,13 @@ class Endpoint(object):
         'verbose': False,
     }
 
+    MAXIMUM_PROJECTIONS = 64
+
     def __init__(self, resource=None, name=None, method=None, schema=None, responses=None,
             specific=False, description=None, title=None, auto_constructed=False, batch=False,
-            subject_required=True, validators=None, metadata=None, verbose=False, **params):
+            subject_required=True, validators=None, metadata=None, verbose=False,
+            validation_policy=None, validation_concurrency=None, validation_threshold=1000,
+            **params):
 
         self.auto_constructed = auto_constructed
         self.batch = batch
@@ -92,11 +103,16 @@ class Endpoint(object):
         self.metadata = metadata or {}
         self.method = method
         self.name = name
+        self.processors = {}
+        self.projections = LruCache(self.MAXIMUM_PROJECTIONS)
         self.resource = resource
         self.schema = schema
         self.specific = specific
         self.subject_required = subject_required
         self.title = title
+        self.validation_concurrency = validation_concurrency
+        self.validation_policy = validation_policy
+        self.validation_threshold = validation_threshold
         self.validators = validators or []
         self.verbose = verbose
 
@@ -121,6 +137,17 @@ class Endpoint(object):
             address.subject = True
         return address
 
+    def compile(self, serialized=True):
+        """Compiles the processors for the request schema and response schemas of this
+        endpoint, for requests which are ``serialized`` or not, in advance of the first request
+        which would otherwise compile them."""
+
+        if self.schema:
+            self._get_processor(self.schema, INBOUND, serialized)
+        for response in self.responses.values():
+            if response.schema:
+                self._get_processor(response.schema, OUTBOUND, serialized)
+
     @classmethod
     def construct(cls, resource, declaration):
         bases = declaration.__bases__
@@ -218,89 +245,300 @@ class Endpoint(object):
 
         return description
 
-    def process(self, controller, request, response, mediators=None):
+    def process(self, controller, request, response, mediators=None, instrumentation=None,
+            validation_policy=None):
+        """Processes ``request`` for this endpoint using ``controller``, populating
+        ``response``. Awaitables returned by controllers or mediators cannot be awaited here;
+        use an asynchronous server to process them.
+
+        If ``instrumentation`` is specified, it should be an :class:`Instrumentation`, which
+        records the duration of each phase of processing. If ``validation_policy`` is
+        specified, it should be a :class:`ValidationPolicy`, which determines whether the
+        response is validated, unless this endpoint has a policy of its own."""
+
+        processor = self.processor(controller, request, response, mediators, instrumentation,
+            validation_policy)
+        for awaitable in processor:
+            close = getattr(awaitable, 'close', None)
+            if close:
+                close()
+            processor.close()
+            raise TypeError('request to %r returned an awaitable, which requires an'
+                ' asynchronous server' % str(self))
+
+        return response
+
+    def processor(self, controller, request, response, mediators=None, instrumentation=None,
+            validation_policy=None):
+        """Returns a generator which processes ``request`` as :meth:`process` does, but which
+        yields each awaitable returned by ``controller`` or ``mediators``, expecting to be sent
+        the result of awaiting it or to have the exception it raised thrown into it."""
+
         #self._log_request(request)
 
+        address = request.address
+        started = instrumentation and instrumentation.timer()
         if mediators:
             for mediator in mediators:
                 try:
-                    mediator.before_validation(self, request, response)
+                    result = mediator.before_validation(self, request, response)
+                    if is_awaitable(result):
+                        yield result
                     if response.status:
-                        return response
+                        return
                 except StructuralError as exception:
                     error = exception.serialize()
                     log('info', 'request to %s failed during mediator', str(self))
-                    return response(INVALID, error)
-
-        instance = controller()
+                    response(INVALID, error)
+                    return
 
-        subject = None
-        if self.specific:
-            if request.address.subject is not None:
-                subject = instance.acquire(request.address.subject)
-                if not subject and self.subject_required:
-                    log('info', 'request to %r specified unknown subject %r', str(self),
-                        request.address.subject)
-                    return response(GONE)
-            else:
-                return response(BAD_REQUEST)
-        elif request.address.subject:
-            log('info', 'request to %r improperly specified a subject', str(self))
-            return response(BAD_REQUEST)
+            if instrumentation:
+                started = instrumentation.record(self, 'mediation', started, address)
 
-        data = None
-        if self.schema:
-            try:
-                data = self.schema.process(request.data, INBOUND, request.serialized)
-            except StructuralError as exception:
-                error = exception.serialize()
-                log('info', 'request to %r failed schema validation', str(self))
-                response(INVALID, error)
+        provider = getattr(controller, 'provider', None)
+        if provider:
+            instance = provider.acquire()
+        else:
+            instance = controller()
 
-            if not response.status and self.validators:
+        acquisitions = getattr(controller, 'acquisitions', None)
+        try:
+            subject = None
+            if self.specific:
+                if request.address.subject is not None:
+                    subject = UNKNOWN
+                    if acquisitions:
+                        generation = acquisitions.generation
+                        subject = acquisitions.get(request.address.subject, UNKNOWN)
+                    if subject is UNKNOWN:
+                        subject = instance.acquire(request.address.subject)
+                        if is_awaitable(subject):
+                            subject = yield subject
+                        if acquisitions:
+                            acquisitions.set(request.address.subject, subject, generation)
+                    if not subject and self.subject_required:
+                        log('info', 'request to %r specified unknown subject %r', str(self),
+                            request.address.subject)
+                        response(GONE)
+                        return
+                    if instrumentation:
+                        started = instrumentation.record(self, 'acquisition', started, address)
+                else:
+                    response(BAD_REQUEST)
+                    return
+            elif request.address.subject:
+                log('info', 'request to %r improperly specified a subject', str(self))
+                response(BAD_REQUEST)
+                return
+
+            data = None
+            if self.schema:
                 try:
-                    self.validate(data)
+                    data = self._process(self.schema, request.data, INBOUND, request.serialized)
                 except StructuralError as exception:
                     error = exception.serialize()
-                    log('info', 'request to %r failed resource validation', str(self))
+                    log('info', 'request to %r failed schema validation', str(self))
                     response(INVALID, error)
-        elif request.data:
-            log('info', 'request to %r improperly specified data', str(self))
-            return response(BAD_REQUEST)
 
-        if not response.status:
-            try:
-                instance.dispatch(self, request, response, subject, data)
-                if not response.status:
-                    response.status = OK
-            except StructuralError as exception:
-                error = exception.serialize()
-                log('exception', 'request to %r failed controller invocation', str(self))
-                response(INVALID, error)
-            except RequestError as exception:
-                return response(exception.status, exception.content)
+                if instrumentation:
+                    started = instrumentation.record(self, 'validation', started, address)
+
+                if not response.status and self.validators:
+                    try:
+                        self.validate(data)
+                    except StructuralError as exception:
+                        error = exception.serialize()
+                        log('info', 'request to %r failed resource validation', str(self))
+                        response(INVALID, error)
+
+                    if instrumentation:
+                        started = instrumentation.record(self, 'validators', started, address)
+            elif request.data:
+                log('info', 'request to %r improperly specified data', str(self))
+                response(BAD_REQUEST)
+                return
+
+            if not response.status and 'projection' in self.metadata:
+                request.projection = self._resolve_projection(data)
+
+            if not response.status:
+                try:
+                    content = instance.dispatch(self, request, response, subject, data)
+                    if is_awaitable(content):
+                        content = yield content
+                        if content and content is not response:
+                            response(content)
+                    if not response.status:
+                        response.status = OK
+                except StructuralError as exception:
+                    error = exception.serialize()
+                    log('exception', 'request to %r failed controller invocation', str(self))
+                    response(INVALID, error)
+                except RequestError as exception:
+                    response(exception.status, exception.content)
+                    return
+                finally:
+                    if instrumentation:
+                        started = instrumentation.record(self, 'dispatch', started, address)
+
+                if acquisitions and response.ok and self.method != GET:
+                    if self.specific:
+                        acquisitions.invalidate(request.address.subject)
+                    else:
+                        acquisitions.invalidate_missing()
+        finally:
+            if provider:
+                provider.release(instance)
 
         definition = self.responses.get(response.status)
         if not definition:
             if response.status in ERROR_STATUS_CODES and not response.data:
-                return response
+                return
             else:
                 log('error', 'response for %r has undeclared status code %s',
                     str(self), response.status)
-                return response(SERVER_ERROR)
+                response(SERVER_ERROR)
+                return
 
         if definition.schema:
+            policy = self.validation_policy or validation_policy
+            trusted = policy is not None and not policy.should_validate(self)
+
+            schema, processors = definition.schema, None
+            projection = request.projection
+            if projection and not projection.complete and response.status == OK:
+                schema, processors = self._project_response_schema(definition, projection)
+
             try:
-                response.data = definition.schema.process(response.data,
-                    OUTBOUND, request.serialized)
+                response.data = self._process_response_data(schema, response.data,
+                    request, trusted, processors)
             except StructuralError as exception:
                 log('error', 'response for %r failed schema validation\n%s\n%s',
                     str(self), exception.format_errors(), format_structure(response.data))
                 response.data = None
-                return response(SERVER_ERROR)
+                response(SERVER_ERROR)
+
+            if instrumentation:
+                instrumentation.record(self, 'response_validation', started, address)
         elif response.data:
             log('error', 'response for %r improperly specified data', str(self))
-            return response(SERVER_ERROR)
+            response(SERVER_ERROR)
+
+    def _process_response_data(self, schema, data, request, trusted=False, processors=None):
+        """Processes response data which may contain iterators in place of sequences, which
+        are either processed lazily, element by element, for requests which can stream their
+        responses, or are otherwise exhausted and processed normally. If ``trusted``, data
+        which is already in serialized form is passed through without being validated. Valid
+        structures are reused rather than copied if the data is to be serialized, or frozen
+        by an in-process transport."""
+
+        serialized = request.serialized
+        reuse = serialized or request.frozen
+        if is_iterator(data) and isinstance(schema, Sequence):
+            if request.streaming:
+                return self._stream_sequence(schema, data, serialized, trusted, reuse,
+                    processors)
+            return self._process(schema, list(data), OUTBOUND, serialized, trusted, reuse,
+                processors)
+
+        if not (isinstance(data, dict) and isinstance(schema, Structure)
+                and not schema.polymorphic_on):
+            return self._process(schema, data, OUTBOUND, serialized, trusted, reuse,
+                processors)
+
+        streams = {}
+        for name, value in data.items():
+            if is_iterator(value) and isinstance(schema.structure.get(name), Sequence):
+                streams[name] = value
+
+        if not streams:
+            return self._process(schema, data, OUTBOUND, serialized, trusted, reuse,
+                processors)
+
+        data = dict(data)
+        for name, value in streams.items():
+            if request.streaming:
+                data[name] = []
+            else:
+                data[name] = list(value)
+
+        data = self._process(schema, data, OUTBOUND, serialized, trusted, reuse, processors)
+        if request.streaming:
+            for name, value in streams.items():
+                data[name] = self._stream_sequence(schema.structure[name], value, serialized,
+                    trusted, reuse, processors)
+
+        return data
+
+    def _get_processor(self, schema, phase, serialized, trusted=False, reuse=None,
+            processors=None):
+        if reuse is None:
+            reuse = serialized
+        if processors is None:
+            processors = self.processors
+
+        key = (id(schema), phase, serialized, trusted, reuse)
+        entry = processors.get(key)
+        if entry is not None and entry[0] is schema:
+            return entry[1]
+
+        # serialized data was just decoded from a request, or is about to be encoded into a
+        # response, so valid structures within it can be reused rather than copied
+        if trusted and is_native(schema):
+            processor = _pass_through
+        else:
+            processor = compile_processor(schema, phase, serialized, reuse)
+
+        processors[key] = (schema, processor)
+        return processor
+
+    def _project_response_schema(self, definition, projection):
+        """Returns the response schema of ``definition`` projected by ``projection``, along
+        with the processors compiled for it. The projected schemas of the most recently used
+        ``MAXIMUM_PROJECTIONS`` distinct projections are retained, together with their
+        processors, apart from those of the endpoint itself."""
+
+        key = (definition.status, projection.fields)
+        entry = self.projections.get(key)
+        if entry is not None:
+            return entry
+
+        path = self.metadata['projection']
+        if not isinstance(path, string):
+            path = None
+
+        entry = (projection.project_response(definition.schema, path), {})
+        self.projections.set(key, entry)
+        return entry
+
+    def _resolve_projection(self, data):
+        definition = self.responses.get(OK)
+        if not (definition and definition.schema):
+            return None
+
+        path = self.metadata['projection']
+        if not isinstance(path, string):
+            path = None
+
+        structure = locate_resource_structure(definition.schema, path)
+        if isinstance(structure, Structure) and not structure.polymorphic_on:
+            return Projection.resolve(structure, data)
+
+    def _process(self, schema, value, phase, serialized, trusted=False, reuse=None,
+            processors=None):
+        return self._get_processor(schema, phase, serialized, trusted, reuse, processors)(value)
+
+    def _stream_sequence(self, schema, iterator, serialized, trusted=False, reuse=None,
+            processors=None):
+        process = self._get_processor(schema.item, OUTBOUND, serialized, trusted, reuse,
+            processors)
+        for value in iterator:
+            try:
+                yield process(value)
+            except StructuralError as exception:
+                log('error', 'streamed response for %r failed schema validation\n%s\n%s',
+                    str(self), exception.format_errors(), format_structure(value))
+                raise
 
     @classmethod
     def reconstruct(cls, resource, description):
@@ -314,19 +552,13 @@ class Endpoint(object):
 
     def validate(self, data):
         if self.batch:
-            errors = []
-            for item in data:
-                try:
-                    self._validate_data(item)
-                except StructuralError as exception:
-                    errors.append(exception)
-                else:
-                    errors.append(None)
-
+            errors = self._validate_items(data)
             if any(errors):
                 raise ValidationError(structure=errors)
         else:
-            self._validate_data(data)
+            error = self._validate_items([data])[0]
+            if error:
+                raise error
 
     @classmethod
     def _pull_endpoint(cls, resource, endpoint, declaration=None):
@@ -353,23 +585,115 @@ class Endpoint(object):
 
         return params
 
-    def _validate_data(self, data):
-        error = ValidationError(structure={})
+    def _validate_item(self, validators, item):
+        error = None
+        for validator in validators:
+            try:
+                validator(item)
+            except StructuralError as exception:
+                error = _merge_validation_error(error, validator.attr, exception)
+
+        if error and error.substantive:
+            return error
+
+    def _validate_items(self, items):
+        """Validates ``items`` with the validators of this endpoint, returning a list
+        containing, for each item, either the error it failed validation with or ``None``.
+        Validators which accept batches are invoked once with the entire list; the others are
+        invoked with each item, by concurrent threads if this endpoint specifies a
+        ``validation_concurrency`` and there are at least ``validation_threshold`` items."""
+
+        validators, batch_validators = [], []
         for validator in self.validators:
+            if getattr(validator, 'batch', False):
+                batch_validators.append(validator)
+            else:
+                validators.append(validator)
+
+        errors = [None] * len(items)
+        if validators:
+            concurrency = self.validation_concurrency
+            if concurrency and concurrency > 1 and len(items) >= self.validation_threshold:
+                arguments = [(validators, item) for item in items]
+                errors = execute_concurrently(self._validate_item, arguments, concurrency)
+                for error in errors:
+                    if error and not isinstance(error, StructuralError):
+                        raise error
+            else:
+                errors = [self._validate_item(validators, item) for item in items]
+
+        for validator in batch_validators:
             try:
-                validator(data)
+                validator(items)
             except StructuralError as exception:
                 attr = validator.attr
-                if attr:
-                    if attr in error.structure:
-                        error.structure[attr].merge(exception)
-                    else:
-                        error.structure[attr] = exception
+                structure = exception.structure
+                if isinstance(structure, list) and len(structure) == len(items):
+                    for i, error in enumerate(structure):
+                        if error:
+                            errors[i] = _merge_validation_error(errors[i], attr, error)
                 else:
-                    error.merge(exception)
+                    for i in range(len(items)):
+                        errors[i] = _merge_validation_error(errors[i], attr, exception)
+
+        return errors
+
+class ValidationPolicy(object):
+    """A policy which determines whether the data of each response is validated against the
+    response schema of its endpoint before it is serialized.
 
-        if error.substantive:
-            raise error
+    With ``'always'``, the default, every response is validated. With ``'sampled'``, a
+    randomly sampled ``rate`` of responses are validated, and those which fail are logged and
+    replaced as always. With ``'trusted'``, no responses are validated. Responses which are not
+    validated are passed through as returned by the controller, provided their schemas contain
+    only fields whose values need no serialization; other responses are always processed.
+
+    The mode and rate of a policy can be changed at any time with :meth:`configure`, and take
+    effect with the next response.
+
+    :param string mode: Optional, default is ``'always'``; one of ``'always'``, ``'sampled'``
+        or ``'trusted'``.
+
+    :param float rate: Optional, default is ``0.01``; the fraction of responses validated
+        under the ``'sampled'`` mode.
+    """
+
+    ALWAYS = 'always'
+    SAMPLED = 'sampled'
+    TRUSTED = 'trusted'
+
+    MODES = (ALWAYS, SAMPLED, TRUSTED)
+
+    def __init__(self, mode=ALWAYS, rate=0.01):
+        self.mode = self.rate = None
+        self.configure(mode, rate)
+
+    def __repr__(self):
+        return 'ValidationPolicy(%r, %r)' % (self.mode, self.rate)
+
+    def configure(self, mode=None, rate=None):
+        """Changes the mode or the sampling rate, or both, of this policy."""
+
+        if mode is not None:
+            if mode not in self.MODES:
+                raise ValueError(mode)
+            self.mode = mode
+
+        if rate is not None:
+            if not 0 <= rate <= 1:
+                raise ValueError(rate)
+            self.rate = rate
+
+    def should_validate(self, endpoint):
+        """Indicates whether the current response for ``endpoint`` should be validated."""
+
+        mode = self.mode
+        if mode == self.ALWAYS:
+            return True
+        elif mode == self.SAMPLED:
+            return random() < self.rate
+        else:
+            return False
 
 class Mediator(object):
     """A request mediator."""
@@ -377,7 +701,7 @@ class Mediator(object):
     def before_validation(self, definition, request, response):
         pass
 
-def validator(attr=None, endpoints=None):
+def validator(attr=None, endpoints=None, batch=False):
     """Marks the decorated method as an endpoint validator.
 
     :param string attr: Optional, default is ``None``; if specified, the name of the field within
@@ -389,6 +713,14 @@ def validator(attr=None, endpoints=None):
     method to a classmethod itself, as otherwise the method can not be annotated. The decorated
     method will receive a single positional argument, the received data, which will already have
     passed standard validation, and should raise :exc:`ValidationError` is warranted.
+
+    If ``batch`` is ``True``, the decorated method will instead receive a ``list`` of items,
+    each of which would otherwise have been validated separately, so that it can validate them
+    together, such as with a single query. For a batch endpoint, the list contains every item
+    of the request; otherwise, it contains the request data alone. To fail particular items,
+    the method should raise :exc:`ValidationError` with a ``structure`` which is a ``list``
+    containing, for each item, either its error or ``None``; any other error applies to every
+    item.
     """
 
     if isinstance(endpoints, string):
@@ -406,6 +738,23 @@ def validator(attr=None, endpoints=None):
     def decorator(method):
         method.__validates__ = True
         method.attr = attr
+        method.batch = batch
         method.endpoints = endpoints
         return classmethod(method)
     return decorator
+
+def _merge_validation_error(error, attr, exception):
+    if error is None:
+        error = ValidationError(structure={})
+
+    if attr:
+        if attr in error.structure:
+            error.structure[attr].merge(exception)
+        else:
+            error.structure[attr] = exception
+    else:
+        error.merge(exception)
+    return error
+
+def _pass_through(value):
+    return value
@@ -15,6 +15,10 @@ class ConnectionFailed(MeshError):
 class ConnectionRefused(ConnectionFailed):
     """Raised when a connection is refused."""
 
+class ConnectionReset(ConnectionFailed):
+    """Raised when a connection is closed by the server before any part of the response to a
+    request is received."""
+
 class ConnectionTimedOut(ConnectionFailed):
     """Raised when a connection times out."""
 
@@ -61,6 +65,9 @@ class ConflictError(RequestError):
 class GoneError(RequestError):
     status = GONE
 
+class PayloadTooLargeError(RequestError):
+    status = PAYLOAD_TOO_LARGE
+
 class ServerError(RequestError):
     status = SERVER_ERROR
 
@@ -82,6 +89,7 @@ RequestError.errors = {
     TIMEOUT: TimeoutError,
     CONFLICT: ConflictError,
     GONE: GoneError,
+    PAYLOAD_TOO_LARGE: PayloadTooLargeError,
     SERVER_ERROR: ServerError,
     UNIMPLEMENTED: UnimplementedError,
     BAD_GATEWAY: BadGatewayError,
@@ -0,0 +1,220 @@
+from bisect import bisect_left
+from collections import deque
+from threading import Lock
+from timeit import default_timer
+
+__all__ = ('Instrumentation',)
+
+PHASES = ('routing', 'parsing', 'mediation', 'acquisition', 'validation', 'validators',
+    'dispatch', 'response_validation', 'serialization')
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+class Histogram(object):
+    """A histogram of observed values, counted in buckets with the specified upper bounds."""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.count = 0
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        buckets, cumulative = [], 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            buckets.append((bound, cumulative))
+        return {'count': self.count, 'sum': self.sum, 'buckets': buckets}
+
+class EndpointMetrics(object):
+    """The metrics collected by an :class:`Instrumentation` for a single endpoint, as mounted
+    at the prefix and bundle of ``address``, if specified."""
+
+    def __init__(self, endpoint, address, buckets, size_buckets):
+        self.buckets = buckets
+        self.endpoint = endpoint
+        self.phases = {}
+        self.sizes = Histogram(size_buckets)
+        self.statuses = {}
+
+        self.bundle = self.prefix = None
+        if address is not None:
+            self.bundle = address.render('b').lstrip('/') or None
+            self.prefix = address.prefix
+
+        self.name = str(endpoint)
+        if self.bundle:
+            self.name = '%s/%s:%s' % (self.prefix or '', self.bundle, self.name)
+
+    @property
+    def labels(self):
+        resource = self.endpoint.resource
+        labels = 'resource="%s",version="%s",endpoint="%s"' % (resource.name,
+            resource.version, self.endpoint.name)
+        if self.bundle:
+            labels = 'bundle="%s",%s' % (self.bundle, labels)
+        if self.prefix:
+            labels = 'prefix="%s",%s' % (self.prefix, labels)
+        return labels
+
+    def observe(self, phase, duration):
+        histogram = self.phases.get(phase)
+        if histogram is None:
+            histogram = self.phases[phase] = Histogram(self.buckets)
+        histogram.observe(duration)
+
+    def snapshot(self):
+        phases = {}
+        for phase, histogram in self.phases.items():
+            phases[phase] = histogram.snapshot()
+
+        return {'phases': phases, 'statuses': dict(self.statuses),
+            'sizes': self.sizes.snapshot()}
+
+class Instrumentation(object):
+    """Collects per-endpoint metrics for a server: a latency histogram for each phase of
+    request processing, the number of responses with each status and a histogram of response
+    sizes.
+
+    The phases are ``routing``, ``parsing`` of the request body, ``mediation``, subject
+    ``acquisition``, schema ``validation`` of request data, resource ``validators``,
+    controller ``dispatch``, ``response_validation`` and ``serialization`` of the response;
+    a phase which a request does not reach, or which its endpoint does not have, is not
+    recorded. Recording a phase costs a clock read and an append to a queue of observations,
+    which are aggregated into histograms in bulk, so instrumentation can remain enabled in
+    production.
+
+    :param buckets: Optional; the upper bounds, in seconds, of the buckets of the latency
+        histograms.
+
+    :param size_buckets: Optional; the upper bounds, in bytes, of the buckets of the response
+        size histograms.
+
+    :param int backlog: Optional, default is ``10000``; the number of observations which are
+        queued before being aggregated.
+    """
+
+    timer = staticmethod(default_timer)
+
+    def __init__(self, buckets=LATENCY_BUCKETS, size_buckets=SIZE_BUCKETS, backlog=10000):
+        self.backlog = backlog
+        self.buckets = tuple(sorted(buckets))
+        self.endpoints = {}
+        self.lock = Lock()
+        self.observations = deque()
+        self.size_buckets = tuple(sorted(size_buckets))
+
+    def record(self, endpoint, phase, started, address=None):
+        """Records the duration of ``phase`` of a request to ``endpoint``, which began at
+        ``started``, as returned by :meth:`timer`, and returns the current time, at which the
+        following phase begins. If specified, ``address`` is the address of the request, which
+        distinguishes the endpoint from those of same-named resources in other bundles."""
+
+        now = default_timer()
+        observations = self.observations
+        observations.append((endpoint, address, phase, now - started))
+        if len(observations) >= self.backlog:
+            self._aggregate()
+        return now
+
+    def record_response(self, endpoint, status, size=None, address=None):
+        """Records a response to a request to ``endpoint``, at ``address`` if specified, with
+        ``status`` and, if it is known, a body of ``size`` bytes."""
+
+        observations = self.observations
+        observations.append((endpoint, address, status, size))
+        if len(observations) >= self.backlog:
+            self._aggregate()
+
+    def render_prometheus(self, namespace='mesh'):
+        """Renders the collected metrics in the Prometheus text exposition format."""
+
+        lines = []
+        snapshot = [(metrics.labels, data) for metrics, data in self._snapshot_endpoints()]
+
+        name = '%s_phase_duration_seconds' % namespace
+        lines.extend(['# HELP %s Duration of each phase of request processing.' % name,
+            '# TYPE %s histogram' % name])
+        for labels, metrics in snapshot:
+            for phase in PHASES:
+                histogram = metrics['phases'].get(phase)
+                if histogram:
+                    _render_histogram(lines, name, '%s,phase="%s"' % (labels, phase),
+                        histogram)
+
+        name = '%s_responses_total' % namespace
+        lines.extend(['# HELP %s Responses by status.' % name, '# TYPE %s counter' % name])
+        for labels, metrics in snapshot:
+            for status, count in sorted(metrics['statuses'].items()):
+                lines.append('%s{%s,status="%s"} %d' % (name, labels, status, count))
+
+        name = '%s_response_size_bytes' % namespace
+        lines.extend(['# HELP %s Size of response bodies.' % name,
+            '# TYPE %s histogram' % name])
+        for labels, metrics in snapshot:
+            if metrics['sizes']['count']:
+                _render_histogram(lines, name, labels, metrics['sizes'])
+
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """Discards all collected metrics."""
+
+        with self.lock:
+            self.observations.clear()
+            self.endpoints = {}
+
+    def snapshot(self):
+        """Returns a consistent copy of the collected metrics, as a ``dict`` mapping the name
+        of each endpoint, as ``'/prefix/bundle/1.0:resource:version:endpoint'``, to a ``dict``
+        of its ``phases``, ``statuses`` and response ``sizes``. The prefix and bundle are
+        omitted for endpoints whose requests were recorded without an address."""
+
+        return dict((metrics.name, data) for metrics, data in self._snapshot_endpoints())
+
+    def _aggregate(self):
+        observations = self.observations
+        with self.lock:
+            endpoints = self.endpoints
+            while True:
+                try:
+                    endpoint, address, name, value = observations.popleft()
+                except IndexError:
+                    break
+
+                key = endpoint
+                if address is not None:
+                    key = (endpoint, address.prefix, address.bundle)
+
+                metrics = endpoints.get(key)
+                if metrics is None:
+                    metrics = endpoints[key] = EndpointMetrics(endpoint, address,
+                        self.buckets, self.size_buckets)
+
+                if name in PHASES:
+                    metrics.observe(name, value)
+                else:
+                    metrics.statuses[name] = metrics.statuses.get(name, 0) + 1
+                    if value is not None:
+                        metrics.sizes.observe(value)
+
+    def _snapshot_endpoints(self):
+        self._aggregate()
+        with self.lock:
+            snapshot = [(metrics, metrics.snapshot()) for metrics in self.endpoints.values()]
+        return sorted(snapshot, key=lambda item: item[0].name)
+
+def _render_histogram(lines, name, labels, histogram):
+    for bound, count in histogram['buckets']:
+        lines.append('%s_bucket{%s,le="%r"} %d' % (name, labels, bound, count))
+    lines.append('%s_bucket{%s,le="+Inf"} %d' % (name, labels, histogram['count']))
+    lines.append('%s_sum{%s} %r' % (name, labels, histogram['sum']))
+    lines.append('%s_count{%s} %d' % (name, labels, histogram['count']))
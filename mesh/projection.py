@@ -0,0 +1,87 @@
+from scheme import Sequence, Structure
+
+__all__ = ('Projection',)
+
+class Projection(object):
+    """The fields of a resource requested by a ``get`` or ``query`` request, resolved from its
+    ``fields``, ``include`` and ``exclude`` parameters.
+
+    When ``fields`` is specified, exactly those fields are requested; otherwise, every field
+    which is not deferred is requested, along with those in ``include`` and except those in
+    ``exclude``. The identifier of the resource is always requested. Controllers can consult
+    the projection of a request, available as ``request.projection``, to avoid loading fields
+    which will not be returned.
+
+    :param fields: The names of the requested fields.
+
+    :param boolean complete: Optional, default is ``False``; whether every field of the
+        resource is requested.
+    """
+
+    def __init__(self, fields, complete=False):
+        self.complete = complete
+        self.fields = frozenset(fields)
+
+    def __contains__(self, name):
+        return name in self.fields
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __repr__(self):
+        return 'Projection(%r)' % sorted(self.fields)
+
+    @classmethod
+    def resolve(cls, structure, data=None):
+        """Resolves the projection of ``structure``, the schema of a resource, requested by
+        ``data``, the processed data of a request."""
+
+        data = data or {}
+        if data.get('fields'):
+            fields = set(data['fields'])
+        else:
+            fields = set(name for name, field in structure.structure.items()
+                if not getattr(field, 'deferred', False))
+            if data.get('include'):
+                fields.update(data['include'])
+            if data.get('exclude'):
+                fields.difference_update(data['exclude'])
+
+        for name, field in structure.structure.items():
+            if field.is_identifier:
+                fields.add(name)
+
+        fields.intersection_update(structure.structure.keys())
+        return cls(fields, len(fields) == len(structure.structure))
+
+    def project(self, structure):
+        """Constructs a clone of ``structure``, the schema of a resource, which contains only
+        the requested fields, and which ignores, rather than rejects, any other fields."""
+
+        fields = self.fields
+        return structure.clone(strict=False, structure=dict((name, field) for name, field
+            in structure.structure.items() if name in fields))
+
+    def project_response(self, schema, path=None):
+        """Constructs a clone of ``schema``, the response schema of an endpoint, in which the
+        resources at ``path`` are projected. If ``path`` is ``None``, ``schema`` is itself
+        the schema of the resource; otherwise, ``path`` names the field of ``schema`` which
+        contains a sequence of resources."""
+
+        if path is None:
+            return self.project(schema)
+
+        sequence = schema.structure[path]
+        projected = sequence.clone(item=self.project(sequence.item))
+        return schema.replace({path: projected})
+
+def locate_resource_structure(schema, path=None):
+    """Returns the schema of the resource within ``schema``, the response schema of an
+    endpoint, as described by :meth:`Projection.project_response`."""
+
+    if path is None:
+        return schema
+
+    sequence = schema.structure.get(path)
+    if isinstance(sequence, Sequence) and isinstance(sequence.item, Structure):
+        return sequence.item
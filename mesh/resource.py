@@ -1,15 +1,20 @@
 import re
+import weakref
 from inspect import isclass
 from textwrap import dedent
+from threading import Lock, current_thread, local
 
 from scheme import *
 
 from mesh.address import *
+from mesh.caching import AcquisitionCache, ResponseCache
 from mesh.constants import *
 from mesh.endpoint import *
 from mesh.exceptions import *
 from mesh.util import *
 
+log = LogHelper(__name__)
+
 class Configuration(object):
     """A resource configuration scheme.
 
@@ -431,6 +436,19 @@ class ControllerMeta(type):
         versions[controller.version] = controller
         controller.version_string = '%d.%d' % controller.version
 
+        controller.provider = None
+        if controller.lifecycle:
+            provider = INSTANCE_PROVIDERS.get(controller.lifecycle)
+            if not provider:
+                raise SpecificationError('controller %r declares an invalid lifecycle: %r'
+                    % (name, controller.lifecycle))
+            controller.provider = provider(controller)
+
+        controller.acquisitions = None
+        if controller.acquisition_ttl:
+            controller.acquisitions = AcquisitionCache(controller.acquisition_capacity,
+                controller.acquisition_ttl, controller.negative_acquisition_ttl)
+
         controller.__construct__()
 
     def __repr__(controller):
@@ -448,10 +466,192 @@ class ControllerMeta(type):
     def minimum_version(controller):
         return min(controller.versions.keys())
 
+class InstanceProvider(object):
+    """Provides instances of a controller to process requests with, according to the
+    lifecycle declared by the controller."""
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.instances = []
+        self.lock = Lock()
+
+    def acquire(self):
+        """Returns an instance of the controller with which to process a request."""
+
+        raise NotImplementedError()
+
+    def close(self):
+        """Tears down every instance constructed by this provider."""
+
+        with self.lock:
+            instances, self.instances = self.instances, []
+        for instance in instances:
+            self._teardown(instance)
+
+    def release(self, instance):
+        """Returns ``instance``, acquired from this provider, once a request has been
+        processed with it."""
+
+    def _construct(self):
+        instance = self.controller()
+        instance.setup()
+        with self.lock:
+            self.instances.append(instance)
+        return instance
+
+    def _discard(self, instance):
+        with self.lock:
+            try:
+                self.instances.remove(instance)
+            except ValueError:
+                return
+        self._teardown(instance)
+
+    def _teardown(self, instance):
+        try:
+            instance.teardown()
+        except Exception:
+            log('exception', 'teardown of %r raised an exception', self.controller)
+
+class SingletonProvider(InstanceProvider):
+    """Provides a single instance of a controller to every request."""
+
+    def __init__(self, controller):
+        super(SingletonProvider, self).__init__(controller)
+        self.instance = None
+
+    def acquire(self):
+        instance = self.instance
+        if instance is None:
+            with self.lock:
+                instance = self.instance
+                if instance is None:
+                    instance = self.controller()
+                    instance.setup()
+                    self.instance = instance
+                    self.instances.append(instance)
+        return instance
+
+    def close(self):
+        super(SingletonProvider, self).close()
+        self.instance = None
+
+class ThreadLocalProvider(InstanceProvider):
+    """Provides one instance of a controller to all requests processed on each thread. The
+    instances of threads which have exited are torn down, on the constructing thread, when
+    the next instance is constructed."""
+
+    def __init__(self, controller):
+        super(ThreadLocalProvider, self).__init__(controller)
+        self.local = local()
+        self.threads = {}
+
+    def acquire(self):
+        instance = getattr(self.local, 'instance', None)
+        if instance is None:
+            self._discard_orphaned_instances()
+            instance = self.controller()
+            instance.setup()
+            with self.lock:
+                self.instances.append(instance)
+                self.threads[id(instance)] = weakref.ref(current_thread())
+            self.local.instance = instance
+        return instance
+
+    def close(self):
+        super(ThreadLocalProvider, self).close()
+        with self.lock:
+            self.threads = {}
+        self.local = local()
+
+    def _discard_orphaned_instances(self):
+        orphans = []
+        with self.lock:
+            for instance in self.instances:
+                thread = self.threads[id(instance)]()
+                if thread is None or not thread.is_alive():
+                    orphans.append(instance)
+            if not orphans:
+                return
+
+            for instance in orphans:
+                self.instances.remove(instance)
+                del self.threads[id(instance)]
+
+        for instance in orphans:
+            self._teardown(instance)
+
+class PooledProvider(InstanceProvider):
+    """Provides instances of a controller from a pool, such that each instance processes
+    only one request at a time. Instances are constructed when no idle instance is available,
+    and at most ``pool_size`` idle instances are retained."""
+
+    def __init__(self, controller):
+        super(PooledProvider, self).__init__(controller)
+        self.idle = []
+
+    def acquire(self):
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+        return self._construct()
+
+    def close(self):
+        with self.lock:
+            self.idle = []
+        super(PooledProvider, self).close()
+
+    def release(self, instance):
+        with self.lock:
+            if len(self.idle) < self.controller.pool_size:
+                self.idle.append(instance)
+                return
+        self._discard(instance)
+
+INSTANCE_PROVIDERS = {
+    'singleton': SingletonProvider,
+    'thread': ThreadLocalProvider,
+    'pooled': PooledProvider,
+}
+
 @with_metaclass(ControllerMeta)
 class Controller(object):
-    """A resource controller."""
+    """A resource controller.
+
+    By default, a new instance of a controller is constructed to process each request. A
+    controller which holds resources which are expensive to construct, such as database
+    sessions or clients, can instead declare a ``lifecycle``, in which case its instances are
+    reused from one request to the next:
+
+    * ``'singleton'``: a single instance processes every request;
+    * ``'thread'``: one instance processes every request on each thread;
+    * ``'pooled'``: instances are borrowed from a pool, each processing one request at a time,
+      and at most ``pool_size`` idle instances are kept.
+
+    Reused instances are prepared with :meth:`setup` when they are constructed, and released
+    with :meth:`teardown` when they are discarded or the controller is :meth:`shutdown`.
+    Since a reused instance outlives any one request, it must not keep per-request state on
+    itself; singleton instances, and thread instances under an asynchronous server, must also
+    tolerate processing requests concurrently.
+
+    A controller whose :meth:`acquire` is expensive can also declare an ``acquisition_ttl``,
+    in which case acquired subjects are cached, for that many seconds, in an
+    :class:`AcquisitionCache` of at most ``acquisition_capacity`` subjects; if it declares a
+    ``negative_acquisition_ttl``, requests for unknown subjects are also remembered for that
+    many seconds. Cached subjects are shared by concurrent requests, and are invalidated when
+    a request to an endpoint other than a ``GET`` succeeds for the same subject; successful
+    requests to such endpoints which are not specific to a subject, such as ``create``,
+    invalidate the cached unknown subjects. Changes made by other means should be signaled
+    with :meth:`invalidate`.
+    """
 
+    acquisition_capacity = 1000
+    acquisition_ttl = None
+    acquisitions = None
+    lifecycle = None
+    negative_acquisition_ttl = None
+    pool_size = 10
+    provider = None
     resource = None
     version = None
 
@@ -465,12 +665,44 @@ class Controller(object):
 
         raise NotImplementedError()
 
+    @classmethod
+    def invalidate(cls, subject=None):
+        """Invalidates the cached responses produced by every version of this controller in
+        every :class:`ResponseCache` of this process, along with the subjects cached by those
+        versions. If ``subject`` is specified, only the responses for that subject and those
+        not specific to any subject are invalidated."""
+
+        ResponseCache.invalidate_all(cls.versions.values(), subject)
+        for controller in cls.versions.values():
+            if controller.acquisitions:
+                controller.acquisitions.invalidate(subject)
+
+    def setup(self):
+        """Prepares this instance, which will be reused to process requests. Only invoked on
+        controllers which declare a ``lifecycle``."""
+
+    @classmethod
+    def shutdown(cls):
+        """Tears down every instance of this controller retained by its ``lifecycle``."""
+
+        provider = cls.provider
+        if provider:
+            provider.close()
+
+    def teardown(self):
+        """Releases the resources held by this instance, which will no longer be used. Only
+        invoked on controllers which declare a ``lifecycle``."""
+
     def dispatch(self, endpoint, request, response, subject, data):
-        """Dispatches a request to this controller."""
+        """Dispatches a request to this controller. If the implementation of the endpoint is
+        a coroutine function, the awaitable it returns is returned, to be awaited by the
+        server."""
 
         implementation = self.endpoints.get(endpoint.name)
         if implementation:
             content = implementation(self, request, response, subject, data)
+            if is_awaitable(content):
+                return content
             if content and content is not response:
                 response(content)
         elif not self._dispatch_request(endpoint, request, response, subject, data):
@@ -206,6 +206,7 @@ class ConstructGetEndpoint(StandardConstructor):
             schema=Structure(endpoint_schema),
             responses=responses,
             specific=True,
+            metadata={'projection': True},
             title='Getting a specific %s' % resource.title.lower(),
             auto_constructed=True)
 
@@ -284,6 +285,7 @@ class ConstructQueryEndpoint(StandardConstructor):
         return Endpoint(resource, 'query', GET,
             schema=Structure(endpoint_schema),
             responses=responses,
+            metadata={'projection': 'resources'},
             title='Querying %s' % pluralize(resource.title.lower()),
             auto_constructed=True)
 
@@ -0,0 +1,591 @@
+"""Asynchronous transports built on asyncio; requires Python 3.5 or later."""
+
+import asyncio
+import errno
+import ssl
+from io import BytesIO
+from time import time
+
+from mesh.constants import *
+from mesh.exceptions import *
+from mesh.transport.http import *
+from mesh.transport.http import RESET_ERRORS, STATUS_CODES, Connection
+from mesh.transport.multipart import MultipartMixedEncoder
+from mesh.util import LogHelper, is_iterator, string
+
+__all__ = ('AsgiServer', 'AsyncConnectionPool', 'AsyncHttpClient', 'dispatch_internally',
+    'execute_internally', 'process_endpoint')
+
+log = LogHelper(__name__)
+
+NEWLINE = b'\r\n'
+
+class StreamConnection(object):
+    """A persistent HTTP/1.1 connection over an asyncio stream."""
+
+    default_port = 80
+    secure = False
+
+    def __init__(self, host, timeout=None):
+        self.host = host
+        self.loop = None
+        self.reader = None
+        self.timeout = timeout
+        self.writer = None
+
+    @property
+    def sock(self):
+        if self.writer:
+            return self.writer.get_extra_info('socket')
+
+    def close(self):
+        writer = self.writer
+        if writer:
+            self.reader = self.writer = None
+            writer.close()
+
+    async def connect(self):
+        host, port = self.host, self.default_port
+        if host.rfind(':') > host.rfind(']'):
+            host, port = host.rsplit(':', 1)
+            port = int(port)
+
+        host = host.strip('[]')
+        if self.secure:
+            self.reader, self.writer = await asyncio.open_connection(host, port,
+                ssl=ssl.create_default_context(), server_hostname=host)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(host, port)
+
+        self.loop = asyncio.get_event_loop()
+
+    async def getresponse(self, method):
+        reader = self.reader
+
+        line = await reader.readline()
+        if not line:
+            raise ConnectionReset()
+
+        version, status = line.decode('latin-1').split(None, 2)[:2]
+        status = int(status)
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionResetError()
+            elif line == NEWLINE:
+                break
+
+            key, value = line.decode('latin-1').split(':', 1)
+            headers[key.strip().title()] = value.strip()
+
+        will_close = (headers.get('Connection', '').lower() == 'close'
+            or (version == 'HTTP/1.0' and headers.get('Connection', '').lower() != 'keep-alive'))
+
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            data = b''
+        elif headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            data = await self._read_chunked_body(reader)
+        elif 'Content-Length' in headers:
+            data = await reader.readexactly(int(headers['Content-Length']))
+        else:
+            data = await reader.read()
+            will_close = True
+
+        return status, data, headers, will_close
+
+    async def request(self, method, url, body, headers):
+        if self.writer is None:
+            await self.connect()
+
+        lines = ['%s %s HTTP/1.1' % (method, url or '/'), 'Host: %s' % self.host]
+        for name, value in headers.items():
+            lines.append('%s: %s' % (name, value))
+
+        multipart = isinstance(body, MultipartMixedEncoder)
+        chunked = is_iterator(body)
+        if chunked:
+            lines.append('Transfer-Encoding: chunked')
+        elif not multipart:
+            if body is None:
+                body = b''
+            elif isinstance(body, string):
+                body = body.encode('utf8')
+            if body or method not in ('GET', 'HEAD'):
+                lines.append('Content-Length: %d' % len(body))
+
+        writer = self.writer
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+
+        if chunked:
+            for chunk in body:
+                if isinstance(chunk, string) and not isinstance(chunk, bytes):
+                    chunk = chunk.encode('utf8')
+                if chunk:
+                    writer.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+                    await writer.drain()
+            writer.write(b'0\r\n\r\n')
+            await writer.drain()
+        elif multipart:
+            while True:
+                chunk = body.next_chunk()
+                if chunk:
+                    writer.write(chunk)
+                    await writer.drain()
+                else:
+                    break
+        else:
+            writer.write(body)
+            await writer.drain()
+
+    async def _read_chunked_body(self, reader):
+        chunks = []
+        while True:
+            line = await reader.readline()
+            size = int(line.split(b';', 1)[0].strip(), 16)
+            if size == 0:
+                break
+
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+
+        while True:
+            line = await reader.readline()
+            if not line or line == NEWLINE:
+                break
+
+        return b''.join(chunks)
+
+class SecureStreamConnection(StreamConnection):
+    """A persistent HTTPS connection over an asyncio stream."""
+
+    default_port = 443
+    secure = True
+
+class AsyncConnectionPool(ConnectionPool):
+    """A pool of persistent asyncio stream connections to a single host.
+
+    Streams are bound to the event loop which opened them; idle streams belonging to a
+    different loop than the one acquiring a connection are closed rather than reused.
+    """
+
+    pools = {}
+
+    async def acquire(self, timeout=None):
+        loop = asyncio.get_event_loop()
+        while True:
+            with self.lock:
+                self._evict_idle_connections(time())
+                if self.idle:
+                    connection = self.idle.pop()[0]
+                else:
+                    break
+
+            if connection.loop is not loop or self._is_dropped(connection):
+                connection.close()
+                continue
+
+            connection.timeout = timeout
+            return connection, True
+
+        return self.implementation(self.host, timeout=timeout), False
+
+    def _is_dropped(self, connection):
+        reader, writer = connection.reader, connection.writer
+        if writer is None or writer.transport.is_closing():
+            return True
+
+        return reader.at_eof()
+
+class AsyncConnection(Connection):
+    """An HTTP connection which performs non-blocking requests over pooled asyncio streams."""
+
+    PoolImplementation = AsyncConnectionPool
+    http_connection = StreamConnection
+    https_connection = SecureStreamConnection
+
+    async def request(self, method, url=None, body=None, headers=None, mimetype=None,
+            serialize=False):
+
+        url, body, headers, multipart = self._prepare_request(method, url, body, headers,
+            mimetype, serialize)
+
+        connection, reused = await self.pool.acquire(self.timeout)
+        try:
+            response = await self._perform_request(connection, method, url, body, headers)
+        except ConnectionFailed as exception:
+            self.pool.discard(connection)
+            if not (reused and isinstance(exception, ConnectionReset)):
+                raise
+            if multipart or is_iterator(body):
+                raise
+
+            connection = self.pool.implementation(self.pool.host, timeout=self.timeout)
+            try:
+                response = await self._perform_request(connection, method, url, body, headers)
+            except ConnectionFailed:
+                self.pool.discard(connection)
+                raise
+
+        return self._complete_request(connection, *response)
+
+    async def _perform_request(self, connection, method, url, body, headers):
+        try:
+            return await asyncio.wait_for(self._exchange(connection, method, url, body, headers),
+                self.timeout)
+        except asyncio.TimeoutError:
+            raise ConnectionTimedOut(url)
+        except ConnectionReset:
+            raise ConnectionReset(url)
+        except OSError as exception:
+            if exception.errno in (errno.EACCES, errno.EPERM, errno.ECONNREFUSED):
+                raise ConnectionRefused(url)
+            elif exception.errno == errno.ETIMEDOUT:
+                raise ConnectionTimedOut(url)
+            else:
+                raise ConnectionFailed(url)
+        except (asyncio.IncompleteReadError, ValueError):
+            raise ConnectionFailed(url)
+
+    async def _exchange(self, connection, method, url, body, headers):
+        try:
+            await connection.request(method, url, body, headers)
+        except OSError as exception:
+            if exception.errno in RESET_ERRORS:
+                raise ConnectionReset()
+            raise
+        return await connection.getresponse(method)
+
+class AsyncHttpClient(HttpClient):
+    """An asyncio HTTP client.
+
+    ``AsyncHttpClient`` prepares requests and processes responses exactly as :class:`HttpClient`
+    does, but :meth:`execute` and :meth:`execute_batch` are coroutines which perform
+    non-blocking I/O over pooled streams, so that many concurrent requests can share a single
+    event loop.
+    """
+
+    ConnectionImplementation = AsyncConnection
+
+    async def execute(self, target, subject=None, data=None, format=None, context=None):
+        endpoint, method, path, mimetype, data, headers = self._prepare_request(target, subject,
+            data, format, context)
+
+        cached = self._consult_cache(method, path, data, headers)
+        if cached and cached[1] and cached[1].fresh:
+            return cached[1].construct_response()
+
+        response = await self.connection.request(method, path, data, headers)
+        return self._process_response(endpoint, response, cached)
+
+    async def execute_batch(self, requests, parallel=False, context=None):
+        results, pending, batch = self._prepare_batch(requests, parallel, context)
+        if not batch:
+            return results
+
+        response = await self.connection.request(POST, *batch)
+        return self._complete_batch(results, pending, response)
+
+    async def execute_many(self, requests, concurrency=None, format=None, context=None):
+        semaphore = asyncio.Semaphore(concurrency or self.DefaultConcurrency)
+
+        async def execute(target, subject=None, data=None):
+            async with semaphore:
+                try:
+                    return await self.execute(target, subject, data, format, context)
+                except Exception as exception:
+                    return exception
+
+        return await asyncio.gather(*[execute(*request) for request in requests])
+
+async def process_endpoint(endpoint, controller, request, response, mediators=None,
+        instrumentation=None, validation_policy=None):
+    """Processes ``request`` for ``endpoint`` as :meth:`Endpoint.process` does, awaiting
+    each awaitable returned by ``controller`` or ``mediators``."""
+
+    processor = endpoint.processor(controller, request, response, mediators,
+        instrumentation, validation_policy)
+    value = exception = None
+
+    while True:
+        try:
+            if exception is not None:
+                awaitable = processor.throw(exception)
+            else:
+                awaitable = processor.send(value)
+        except StopIteration:
+            return response
+
+        try:
+            value, exception = await awaitable, None
+        except Exception as error:
+            value, exception = None, error
+
+def is_coroutine_endpoint(endpoint, controller, mediators=None):
+    """Indicates whether processing a request for ``endpoint`` with ``controller`` and
+    ``mediators`` can await a coroutine, and must therefore take place on the event loop."""
+
+    candidates = [controller.endpoints.get(endpoint.name), getattr(controller, 'acquire', None)]
+    for mediator in mediators or ():
+        candidates.append(getattr(mediator, 'before_validation', None))
+
+    for candidate in candidates:
+        if candidate is not None and asyncio.iscoroutinefunction(candidate):
+            return True
+    return False
+
+async def dispatch_internally(server, address, context=None, data=None, mimetype=None,
+        frozen=False, executor=None):
+    """Dispatches a request to ``server``, an :class:`InternalServer`, as
+    :meth:`InternalServer.dispatch` does. If the endpoint is implemented by coroutines, the
+    request is processed on the running event loop; otherwise, it is processed on
+    ``executor``, or the default executor of the event loop if ``executor`` is ``None``."""
+
+    request, response, endpoint, format = server._prepare_dispatch(address, context, data,
+        mimetype, frozen)
+    if not endpoint:
+        return response
+
+    resource, controller, endpoint = endpoint
+    arguments = (endpoint, controller, request, response, server.mediators,
+        server.instrumentation, server.validation_policy)
+
+    try:
+        if is_coroutine_endpoint(endpoint, controller, server.mediators):
+            await process_endpoint(*arguments)
+        else:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(executor, endpoint.process, *arguments[1:])
+    except Exception:
+        log('exception', 'uncaught exception raised during endpoint processing')
+        return response(SERVER_ERROR)
+
+    return server._complete_dispatch(request, response, endpoint, format)
+
+async def execute_internally(client, address, subject=None, data=None, format=None,
+        context=None):
+    """Executes a request with ``client``, an :class:`InternalClient`, as
+    :meth:`InternalClient.execute` does, dispatching it with :func:`dispatch_internally`."""
+
+    address, data, context, mimetype = client._prepare_request(address, subject, data,
+        format, context)
+
+    response = await dispatch_internally(client.server, address, context, data, mimetype,
+        client.frozen, client.executor)
+    return client._complete_response(client._check_response(response))
+
+class AsgiServer(HttpServer):
+    """The HTTP mesh server as an ASGI application.
+
+    ``AsgiServer`` routes, negotiates formats and processes requests exactly as
+    :class:`HttpServer` does, but controller endpoint implementations, ``acquire`` and
+    :meth:`Mediator.before_validation` can be coroutine functions, which are awaited on the
+    event loop of the ASGI server rather than occupying a thread. Synchronous implementations
+    remain supported, but block the event loop while they run.
+
+    If ``context_key`` is specified, the request context is taken from that key of the ASGI
+    connection scope.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._handle_lifespan(receive, send)
+        elif scope['type'] != 'http':
+            raise ValueError('unsupported scope type %r' % scope['type'])
+
+        started = False
+        try:
+            environ = self._construct_environ(scope)
+            method = environ['REQUEST_METHOD']
+            mimetype = environ.get('CONTENT_TYPE')
+
+            try:
+                await self._receive_request_body(environ, receive)
+                data = self._parse_request_data(method, mimetype, environ)
+            except PayloadTooLargeError:
+                log('info', 'rejected oversized request body for %s', environ['PATH_INFO'])
+                return await self._send_error(send, PAYLOAD_TOO_LARGE)
+            except Exception:
+                log('exception', 'exception raised during asgi request parsing')
+                return await self._send_error(send, BAD_REQUEST)
+
+            key = self.context_environ_key
+            if key and key in scope:
+                context = scope[key]
+            else:
+                context = {}
+
+            identity = self._identify_ipaddr(environ)
+            response = await self.dispatch(method, environ['PATH_INFO'], mimetype, context,
+                environ, data, identity)
+
+            body = self._construct_response_body(environ, response)
+            headers = response.construct_headers(self.context_header_prefix)
+
+            started = True
+            await send({'type': 'http.response.start', 'status': response.status_code,
+                'headers': [(name.lower().encode('latin-1'), str(value).encode('latin-1'))
+                    for name, value in headers]})
+
+            for chunk in body:
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk,
+                        'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        except Exception:
+            log('exception', 'uncaught exception raised during asgi dispatch')
+            if started:
+                raise
+            await self._send_error(send, SERVER_ERROR)
+
+    async def dispatch(self, method, path, mimetype, context, headers, data, identity):
+        if method == POST and path == self.batch_path:
+            return await self._dispatch_batch(context, headers, data, identity)
+        elif method == GET and path == self.metrics_path:
+            return self._construct_metrics_response()
+
+        request, response, controller, endpoint = self._prepare_dispatch(method, path,
+            mimetype, context, headers, data, identity)
+        if not request:
+            return response
+
+        key, entry = self._consult_cache(request, controller, endpoint)
+        if entry:
+            if entry.stale and self.cache.begin_revalidation(key):
+                asyncio.ensure_future(self._revalidate_cached_response(key, request,
+                    controller, endpoint))
+            return self._record_response(request, endpoint,
+                self._construct_cached_response(request, entry))
+
+        generation = self.cache.generation if self.cache else None
+        try:
+            await process_endpoint(endpoint, controller, request, response, self.mediators,
+                self.instrumentation, self.validation_policy)
+        except Exception as exception:
+            log('exception', 'uncaught exception raised during endpoint processing')
+            return self._record_response(request, endpoint, response(SERVER_ERROR))
+
+        response = self._complete_dispatch(request, response, endpoint)
+        self._update_cache(key, generation, request, response, controller, endpoint)
+        return self._record_response(request, endpoint, response)
+
+    async def _dispatch_batch(self, context, headers, data, identity):
+        batch = self._parse_batch(data)
+        if not batch:
+            return HttpResponse(BAD_REQUEST)
+
+        subrequests, parallel = batch
+        headers = self._construct_subrequest_headers(headers)
+
+        if parallel and self.batch_concurrency:
+            semaphore = asyncio.Semaphore(self.batch_concurrency)
+            async def dispatch(method, path, subdata):
+                async with semaphore:
+                    return await self._dispatch_subrequest(method, path, context, headers,
+                        subdata, identity)
+
+            responses = await asyncio.gather(*[dispatch(method, path, subdata)
+                for method, path, subdata in subrequests], return_exceptions=True)
+        else:
+            responses = []
+            for method, path, subdata in subrequests:
+                try:
+                    responses.append(await self._dispatch_subrequest(method, path, context,
+                        headers, subdata, identity))
+                except Exception as exception:
+                    responses.append(exception)
+
+        return self._construct_batch_response(responses)
+
+    async def _dispatch_subrequest(self, method, path, context, headers, data, identity):
+        if isinstance(context, dict):
+            context = dict(context)
+
+        response = await self.dispatch(method, path, JSON, context, headers, data, identity)
+        if is_iterator(response.data):
+            response.data = b''.join(response.data)
+        return response
+
+    async def _revalidate_cached_response(self, key, request, controller, endpoint):
+        try:
+            generation = self.cache.generation
+            request.headers = dict(request.headers or {})
+            request.headers.pop('HTTP_IF_NONE_MATCH', None)
+
+            response = HttpResponse()
+            await process_endpoint(endpoint, controller, request, response, self.mediators,
+                self.instrumentation, self.validation_policy)
+            response = self._complete_dispatch(request, response, endpoint)
+            self._update_cache(key, generation, request, response, controller, endpoint)
+        except Exception:
+            log('exception', 'uncaught exception raised during revalidation of %r', request)
+        finally:
+            self.cache.end_revalidation(key)
+
+    def _construct_environ(self, scope):
+        path, root = scope['path'], scope.get('root_path', '')
+        if root and path.startswith(root):
+            path = path[len(root):]
+
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': root,
+            'PATH_INFO': path,
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        }
+
+        client = scope.get('client')
+        if client:
+            environ['REMOTE_ADDR'] = client[0]
+
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                name = 'HTTP_' + name
+            if name in environ:
+                value = environ[name] + ',' + value
+            environ[name] = value
+
+        return environ
+
+    async def _handle_lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _receive_request_body(self, environ, receive):
+        limit = self.max_request_size
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        if limit is not None and length > limit:
+            raise PayloadTooLargeError()
+
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                raise ConnectionResetError()
+
+            chunk = message.get('body', b'')
+            if chunk:
+                size += len(chunk)
+                if limit is not None and size > limit:
+                    raise PayloadTooLargeError()
+                chunks.append(chunk)
+
+            if not message.get('more_body', False):
+                break
+
+        environ.pop('HTTP_TRANSFER_ENCODING', None)
+        environ['CONTENT_LENGTH'] = str(size)
+        environ['wsgi.input'] = BytesIO(b''.join(chunks))
+
+    async def _send_error(self, send, status):
+        await send({'type': 'http.response.start', 'status': STATUS_CODES[status],
+            'headers': [(b'content-length', b'0')]})
+        await send({'type': 'http.response.body', 'body': b''})
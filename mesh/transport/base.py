@@ -22,6 +22,16 @@ class Request(object):
 
     token = 'mesh'
 
+    # whether the response data will be frozen rather than serialized, such that it can
+    # share structures with the data returned by the controller
+    frozen = False
+
+    # the fields requested by the request, if its endpoint supports projection
+    projection = None
+
+    # whether the transport can send response data containing iterators incrementally
+    streaming = False
+
     def __init__(self, address=None, data=None, context=None, mimetype=None,
             identity=None, serialized=False):
 
@@ -49,13 +59,18 @@ class Request(object):
             str(address) if address else '-')
 
 class Response(object):
-    """A mesh response."""
+    """A mesh response.
+
+    Controllers may set ``version`` to an opaque token identifying the version of the data
+    in this response, which transports can use to recognize that a client already holds it.
+    """
 
     def __init__(self, status=None, data=None, context=None, mimetype=None):
         self.context = context
         self.data = data
         self.mimetype = mimetype
         self.status = status
+        self.version = None
 
     def __call__(self, status=None, data=None):
         return self.construct(status, data)
@@ -84,12 +99,22 @@ class Response(object):
             return self.data
 
 class Server(object):
-    """A mesh server."""
+    """A mesh server.
+
+    :param instrumentation: Optional, default is ``None``; an :class:`Instrumentation` which
+        collects metrics for the requests processed by this server.
+
+    :param validation_policy: Optional, default is ``None``; a :class:`ValidationPolicy`
+        which determines whether responses are validated, for endpoints without a policy of
+        their own. If ``None``, every response is validated. The policy can be replaced at
+        any time by assigning ``validation_policy``.
+    """
 
     AvailableFormats = (formats.Json,)
     DefaultFormat = None
 
-    def __init__(self, bundles, default_format=None, available_formats=None, mediators=None):
+    def __init__(self, bundles, default_format=None, available_formats=None, mediators=None,
+            instrumentation=None, validation_policy=None):
         self.bundles = {}
         for bundle in bundles:
             if isinstance(bundle, Bundle):
@@ -101,7 +126,9 @@ class Server(object):
                 raise TypeError(bundle)
 
         self.default_format = default_format or self.DefaultFormat
+        self.instrumentation = instrumentation
         self.mediators = mediators
+        self.validation_policy = validation_policy
 
         self.formats = {}
         for format in (available_formats or self.AvailableFormats):
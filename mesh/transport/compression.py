@@ -0,0 +1,156 @@
+import zlib
+
+from mesh.exceptions import PayloadTooLargeError
+from mesh.util import string
+
+__all__ = ('Compression', 'UnsupportedEncoding')
+
+ENCODINGS = ('gzip', 'deflate')
+
+class UnsupportedEncoding(ValueError):
+    """Raised when a payload specifies a content encoding which cannot be decoded."""
+
+class Compression(object):
+    """A content-encoding policy for an HTTP transport.
+
+    Servers use a ``Compression`` to negotiate an encoding for each response from the request's
+    ``Accept-Encoding`` header; clients use one to advertise the encodings they accept and,
+    optionally, to compress the bodies of the requests they send. Decoding a compressed payload
+    never requires a ``Compression``; see :func:`Compression.decompress`.
+
+    :param int level: Optional, default is ``6``; the zlib compression level, from ``1``
+        (fastest) to ``9`` (smallest).
+
+    :param int threshold: Optional, default is ``1024``; payloads smaller than this number of
+        bytes are sent uncompressed, since compressing them costs more than it saves.
+
+    :param string request_encoding: Optional, default is ``None``; if specified, either
+        ``'gzip'`` or ``'deflate'``, the encoding clients apply to request bodies. Only enable
+        this for servers known to accept compressed requests.
+
+    :param encodings: Optional, default is ``('gzip', 'deflate')``; the encodings which can be
+        negotiated, in order of preference.
+    """
+
+    def __init__(self, level=6, threshold=1024, request_encoding=None, encodings=ENCODINGS):
+        if request_encoding and request_encoding not in ENCODINGS:
+            raise ValueError(request_encoding)
+
+        self.encodings = tuple(encodings)
+        self.level = level
+        self.request_encoding = request_encoding
+        self.threshold = threshold
+
+    @property
+    def accept_encoding(self):
+        return ', '.join(self.encodings)
+
+    def compress(self, data, encoding):
+        """Compresses ``data``, which can be either a string or an iterable of chunks, with
+        ``encoding``. An iterable is compressed incrementally, returning a generator which yields
+        compressed chunks as each chunk is consumed."""
+
+        if not isinstance(data, (bytes, string)):
+            return self._compress_chunks(data, encoding)
+
+        compressor = self._construct_compressor(encoding)
+        return compressor.compress(_encode(data)) + compressor.flush()
+
+    @staticmethod
+    def decompress(data, encoding, limit=None):
+        """Decompresses ``data`` encoded with ``encoding``, which is the value of a
+        ``Content-Encoding`` header; ``identity`` or an empty encoding returns ``data``
+        unchanged. If ``limit`` is specified, :exc:`PayloadTooLargeError` is raised as soon
+        as the decompressed payload exceeds that number of bytes."""
+
+        encoding = (encoding or 'identity').strip().lower()
+        if encoding == 'identity' or not data:
+            return data
+        elif encoding in ('gzip', 'x-gzip'):
+            return _decompress(data, 16 + zlib.MAX_WBITS, limit)
+        elif encoding == 'deflate':
+            try:
+                return _decompress(data, zlib.MAX_WBITS, limit)
+            except zlib.error:
+                # some implementations send a raw deflate stream without the zlib wrapper
+                return _decompress(data, -zlib.MAX_WBITS, limit)
+        else:
+            raise UnsupportedEncoding(encoding)
+
+    def negotiate(self, accept_encoding):
+        """Selects the preferred encoding acceptable to a peer which sent the specified
+        ``Accept-Encoding`` header, or returns ``None`` if the payload should be sent
+        uncompressed."""
+
+        if not accept_encoding:
+            return None
+
+        weights = {}
+        for candidate in accept_encoding.split(','):
+            candidate, params = (candidate.split(';', 1) + [''])[:2]
+            candidate = candidate.strip().lower()
+            if not candidate:
+                continue
+
+            weight = 1.0
+            params = params.strip()
+            if params[:2].lower() == 'q=':
+                try:
+                    weight = float(params[2:])
+                except ValueError:
+                    weight = 0.0
+            weights[candidate] = weight
+
+        selected, selected_weight = None, 0.0
+        for encoding in self.encodings:
+            weight = weights.get(encoding, weights.get('*', 0.0))
+            if weight > selected_weight:
+                selected, selected_weight = encoding, weight
+
+        return selected
+
+    def should_compress(self, data):
+        """Indicates whether ``data``, either a string or an iterable of chunks, is large enough
+        to be worth compressing. Iterators, whose size cannot be known in advance, are always
+        compressed."""
+
+        if isinstance(data, (bytes, string)):
+            size = len(data)
+        elif isinstance(data, list):
+            size = 0
+            for chunk in data:
+                size += len(chunk)
+        else:
+            return True
+        return size >= self.threshold
+
+    def _compress_chunks(self, chunks, encoding):
+        compressor = self._construct_compressor(encoding)
+        for chunk in chunks:
+            compressed = compressor.compress(_encode(chunk))
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+    def _construct_compressor(self, encoding):
+        if encoding == 'gzip':
+            return zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        elif encoding == 'deflate':
+            return zlib.compressobj(self.level, zlib.DEFLATED, zlib.MAX_WBITS)
+        else:
+            raise UnsupportedEncoding(encoding)
+
+def _decompress(data, wbits, limit=None):
+    if limit is None:
+        return zlib.decompress(data, wbits)
+
+    decompressor = zlib.decompressobj(wbits)
+    data = decompressor.decompress(data, limit + 1)
+    if len(data) > limit:
+        raise PayloadTooLargeError()
+    return data + decompressor.flush()
+
+def _encode(data):
+    if isinstance(data, string) and not isinstance(data, bytes):
+        return data.encode('utf8')
+    return data
@@ -1,12 +1,22 @@
 import errno
+import hashlib
+import json
 import re
+import select
 import socket
 from cgi import parse_header
+from threading import Lock, Thread
+from time import time
 
 try:
-    from httplib import HTTPConnection, HTTPSConnection
+    from httplib import BadStatusLine, HTTPConnection, HTTPException, HTTPSConnection
 except ImportError:
-    from http.client import HTTPConnection, HTTPSConnection
+    from http.client import BadStatusLine, HTTPConnection, HTTPException, HTTPSConnection
+
+try:
+    from http.client import RemoteDisconnected
+except ImportError:
+    RemoteDisconnected = None
 
 try:
     from urlparse import urlparse
@@ -19,22 +29,34 @@ from scheme.formats import *
 
 from mesh.address import *
 from mesh.bundle import Specification
+from mesh.caching import ResponseCache
+from mesh.compilation import compile_processor
 from mesh.constants import *
 from mesh.exceptions import *
 from mesh.transport.base import *
+from mesh.transport.compression import *
 from mesh.transport.multipart import *
-from mesh.util import LogHelper, string
+from mesh.transport.routing import Router
+from mesh.util import LogHelper, LruCache, execute_concurrently, is_iterator, string
 
-__all__ = ('HttpClient', 'HttpProxy', 'HttpRequest', 'HttpResponse', 'HttpServer')
+__all__ = ('Compression', 'ConnectionPool', 'HttpClient', 'HttpClientCache', 'HttpProxy',
+    'HttpRequest', 'HttpResponse', 'HttpServer', 'RequestInput')
 
 log = LogHelper(__name__)
 
+BATCH_PATH = '_batch'
+METRICS_PATH = '_metrics'
+PROMETHEUS_MIMETYPE = 'text/plain; version=0.0.4'
+SUBREQUEST_EXCLUDED_HEADERS = ('HTTP_ACCEPT', 'HTTP_CONTENT_ENCODING', 'HTTP_IF_NONE_MATCH',
+    'HTTP_TRANSFER_ENCODING')
+
 STATUS_CODES = {
     OK: 200,
     CREATED: 201,
     ACCEPTED: 202,
     SUBSET: 203,
     PARTIAL: 206,
+    NOT_MODIFIED: 304,
     BAD_REQUEST: 400,
     FORBIDDEN: 403,
     NOT_FOUND: 404,
@@ -43,6 +65,7 @@ STATUS_CODES = {
     TIMEOUT: 408,
     CONFLICT: 409,
     GONE: 410,
+    PAYLOAD_TOO_LARGE: 413,
     SERVER_ERROR: 500,
     UNIMPLEMENTED: 501,
     BAD_GATEWAY: 502,
@@ -57,6 +80,7 @@ STATUS_LINES = {
     ACCEPTED: '202 Accepted',
     SUBSET: '203 Subset',
     PARTIAL: '206 Partial',
+    NOT_MODIFIED: '304 Not Modified',
     BAD_REQUEST: '400 Bad Request',
     FORBIDDEN: '403 Forbidden',
     NOT_FOUND: '404 Not Found',
@@ -65,21 +89,188 @@ STATUS_LINES = {
     TIMEOUT: '408 Request Timeout',
     CONFLICT: '409 Conflict',
     GONE: '410 Gone',
+    PAYLOAD_TOO_LARGE: '413 Payload Too Large',
     SERVER_ERROR: '500 Internal Server Error',
     UNIMPLEMENTED: '501 Not Implemented',
     BAD_GATEWAY: '502 Bad Gateway',
     UNAVAILABLE: '503 Service Unavailable',
 }
 
+RESET_ERRORS = (errno.ECONNABORTED, errno.ECONNRESET, errno.EPIPE)
+
+DROPPED_EVENTS = 0
+if hasattr(select, 'poll'):
+    DROPPED_EVENTS = select.POLLIN | select.POLLPRI | select.POLLERR | select.POLLHUP
+
+def is_closed_without_response(exception):
+    """Indicates whether ``exception``, raised while awaiting the response to a request,
+    reports that the server closed or reset the connection before sending any part of a
+    response."""
+
+    if RemoteDisconnected is not None and isinstance(exception, RemoteDisconnected):
+        return True
+    if isinstance(exception, socket.error):
+        return exception.errno in RESET_ERRORS
+    if isinstance(exception, BadStatusLine):
+        line = exception.line or ''
+        return not line.strip("'") or line.startswith('No status line received')
+    return False
+
+class ConnectionPool(object):
+    """A thread-safe pool of persistent HTTP connections to a single host.
+
+    :param implementation: The connection class used to open new connections, normally either
+        ``HTTPConnection`` or ``HTTPSConnection``.
+
+    :param str host: The host, with an optional port, to which pooled connections are opened.
+
+    :param int maxsize: Optional, default is ``None``; the maximum number of idle connections
+        retained by this pool. Connections released while the pool is full are closed. If
+        ``None``, ``DefaultMaxSize`` is used.
+
+    :param idle_timeout: Optional, default is ``None``; the number of seconds an idle connection
+        is retained before it is evicted. If ``None``, ``DefaultIdleTimeout`` is used.
+
+    The pool does not limit the number of connections in use at any one time; it only limits
+    how many are kept open between requests. Pools shared between clients are obtained with
+    :meth:`get_pool`, which maintains one pool per scheme and host.
+    """
+
+    DefaultIdleTimeout = 60
+    DefaultMaxSize = 10
+
+    pools = {}
+    registry_lock = Lock()
+
+    def __init__(self, implementation, host, maxsize=None, idle_timeout=None):
+        if maxsize is None:
+            maxsize = self.DefaultMaxSize
+        if idle_timeout is None:
+            idle_timeout = self.DefaultIdleTimeout
+
+        self.host = host
+        self.idle = []
+        self.idle_timeout = idle_timeout
+        self.implementation = implementation
+        self.lock = Lock()
+        self.maxsize = maxsize
+
+    def __repr__(self):
+        return '%s(%r, idle=%d)' % (type(self).__name__, self.host, len(self.idle))
+
+    def acquire(self, timeout=None):
+        """Acquires a connection from this pool, opening a new one if no usable idle connection
+        is available. Returns a ``(connection, reused)`` tuple, where ``reused`` indicates the
+        connection was previously used for another request."""
+
+        while True:
+            with self.lock:
+                self._evict_idle_connections(time())
+                if self.idle:
+                    connection = self.idle.pop()[0]
+                else:
+                    break
+
+            if self._is_dropped(connection):
+                connection.close()
+                continue
+
+            connection.timeout = timeout
+            connection.sock.settimeout(timeout)
+            return connection, True
+
+        return self.implementation(self.host, timeout=timeout), False
+
+    def close(self):
+        """Closes all idle connections held by this pool."""
+
+        with self.lock:
+            idle, self.idle = self.idle, []
+
+        for connection, released in idle:
+            connection.close()
+
+    def discard(self, connection):
+        """Closes ``connection`` without returning it to this pool."""
+
+        connection.close()
+
+    @classmethod
+    def get_pool(cls, scheme, host, implementation, **params):
+        """Returns the shared pool for ``scheme`` and ``host``, constructing it with
+        ``implementation`` and ``params`` if it does not yet exist."""
+
+        key = (scheme, host)
+        with cls.registry_lock:
+            pool = cls.pools.get(key)
+            if not pool:
+                pool = cls.pools[key] = cls(implementation, host, **params)
+            return pool
+
+    def release(self, connection):
+        """Returns ``connection`` to this pool once the response to its last request has been
+        fully read. Closed connections, and connections released while this pool is full, are
+        dropped."""
+
+        if connection.sock is None:
+            return
+
+        with self.lock:
+            if len(self.idle) < self.maxsize:
+                self.idle.append((connection, time()))
+                return
+
+        connection.close()
+
+    def _evict_idle_connections(self, now):
+        idle = self.idle
+        threshold = now - self.idle_timeout
+
+        expired = 0
+        while expired < len(idle) and idle[expired][1] < threshold:
+            idle[expired][0].close()
+            expired += 1
+
+        if expired:
+            del idle[:expired]
+
+    def _is_dropped(self, connection):
+        sock = connection.sock
+        if sock is None:
+            return True
+
+        # an idle keep-alive connection should have nothing to read, so a readable socket
+        # indicates the server has closed its side of the connection; poll is preferred as
+        # select cannot watch descriptors beyond FD_SETSIZE
+        try:
+            if hasattr(select, 'poll'):
+                poller = select.poll()
+                poller.register(sock, DROPPED_EVENTS)
+                return bool(poller.poll(0))
+            return bool(select.select([sock], [], [], 0)[0])
+        except (select.error, ValueError):
+            return True
+
 class Connection(object):
-    """An HTTP connection."""
+    """An HTTP connection.
 
+    Connections are drawn from a :class:`ConnectionPool`, which by default is the pool shared
+    by every ``Connection`` to the same scheme and host, so that persistent connections are
+    reused across requests and clients. If ``compression`` is specified, the connection
+    advertises the encodings it accepts and compresses request bodies as configured.
+
+    A request body can be an iterator of chunks, which is sent with chunked transfer encoding
+    as it is consumed, so that large payloads need not be buffered to compute their length.
+    """
+
+    PoolImplementation = ConnectionPool
     http_connection = HTTPConnection
     https_connection = HTTPSConnection
 
-    def __init__(self, url, timeout=None):
+    def __init__(self, url, timeout=None, pool=None, compression=None):
         self.scheme, self.host, self.path = urlparse(url)[:3]
         self.path = self.path.rstrip('/')
+        self.compression = compression
         self.timeout = timeout
 
         if self.scheme == 'https':
@@ -89,7 +280,87 @@ class Connection(object):
         else:
             raise ValueError(url)
 
+        if pool is None:
+            pool = self.PoolImplementation.get_pool(self.scheme, self.host, self.implementation)
+        self.pool = pool
+
     def request(self, method, url=None, body=None, headers=None, mimetype=None, serialize=False):
+        url, body, headers, multipart = self._prepare_request(method, url, body, headers,
+            mimetype, serialize)
+
+        connection, reused = self.pool.acquire(self.timeout)
+        try:
+            response = self._perform_request(connection, method, url, body, headers, multipart)
+        except ConnectionFailed as exception:
+            self.pool.discard(connection)
+            if not (reused and isinstance(exception, ConnectionReset)):
+                raise
+            if multipart or is_iterator(body):
+                raise
+
+            # the server closed a reused connection without responding to this request, which
+            # it therefore never processed, so retry it once on a fresh connection
+            connection = self.pool.implementation(self.pool.host, timeout=self.timeout)
+            try:
+                response = self._perform_request(connection, method, url, body, headers)
+            except ConnectionFailed:
+                self.pool.discard(connection)
+                raise
+
+        return self._complete_request(connection, *response)
+
+    def _complete_request(self, connection, status, data, headers, will_close):
+        if will_close:
+            self.pool.discard(connection)
+        else:
+            self.pool.release(connection)
+
+        if data and 'Content-Encoding' in headers:
+            data = Compression.decompress(data, headers.pop('Content-Encoding'))
+
+        return HttpResponse(STATUS_CODES[status], data or None,
+            mimetype=headers.get('Content-Type'), headers=headers)
+
+    def _perform_request(self, connection, method, url, body, headers, multipart=False):
+        try:
+            if multipart:
+                self._send_multipart_request(connection, method, url, body, headers)
+            else:
+                connection.request(method, url, body, headers)
+        except socket.timeout:
+            raise ConnectionTimedOut(url)
+        except socket.error as exception:
+            if exception.errno in (errno.EACCES, errno.EPERM, errno.ECONNREFUSED):
+                raise ConnectionRefused(url)
+            elif exception.errno == errno.ETIMEDOUT:
+                raise ConnectionTimedOut(url)
+            elif exception.errno in RESET_ERRORS:
+                raise ConnectionReset(url)
+            else:
+                raise ConnectionFailed(url)
+        except HTTPException:
+            raise ConnectionFailed(url)
+
+        try:
+            response = connection.getresponse()
+        except socket.timeout:
+            raise ConnectionTimedOut(url)
+        except (socket.error, HTTPException) as exception:
+            if is_closed_without_response(exception):
+                raise ConnectionReset(url)
+            raise ConnectionFailed(url)
+
+        try:
+            data = response.read()
+        except socket.timeout:
+            raise ConnectionTimedOut(url)
+        except (socket.error, HTTPException):
+            raise ConnectionFailed(url)
+
+        headers = dict((key.title(), value) for key, value in response.getheaders())
+        return response.status, data, headers, response.will_close
+
+    def _prepare_request(self, method, url, body, headers, mimetype, serialize):
         if url:
             if url[0] != '/':
                 url = '/' + url
@@ -109,39 +380,31 @@ class Connection(object):
                 else:
                     raise ValueError(mimetype)
 
+            # bodies are encoded once, here, rather than by each consumer in turn
+            if isinstance(body, string) and not isinstance(body, bytes):
+                body = body.encode('utf8')
+
         headers = headers or {}
         if 'Content-Type' not in headers and mimetype:
             headers['Content-Type'] = mimetype
 
-        connection = self.implementation(self.host, timeout=self.timeout)
-        try:
-            if multipart:
-                self._send_multipart_request(connection, method, url, body, headers)
-            else:
-                connection.request(method, url, body, headers)
-        except socket.error as Exception:
-            if exception.errno in (errno.EACCES, errno.EPERM, errno.ECONNREFUSED):
-                raise ConnectionRefused(url)
-            elif exception.errno == errno.ETIMEDOUT:
-                raise ConnectionTimedOut(url)
-            else:
-                raise ConnectionFailed(url)
-        except socket.timeout:
-            raise ConnectionTimedOut(url)
+        compression = self.compression
+        if compression:
+            if 'Accept-Encoding' not in headers:
+                headers['Accept-Encoding'] = compression.accept_encoding
 
-        try:
-            response = connection.getresponse()
-        except socket.error as exception:
-            raise ConnectionFailed(url)
-        except socket.timeout:
-            raise ConnectionTimedOut(url)
+            encoding = compression.request_encoding
+            if (encoding and body and not multipart and 'Content-Encoding' not in headers
+                    and compression.should_compress(body)):
+                body = compression.compress(body, encoding)
+                headers['Content-Encoding'] = encoding
 
-        return HttpResponse(STATUS_CODES[response.status], response.read() or None,
-            response.getheader('Content-Type', None),
-            dict((key.title(), value) for key, value in response.getheaders()))
+        return url, body, headers, multipart
 
     def _send_multipart_request(self, connection, method, url, body, headers):
-        connection.connect()
+        if connection.sock is None:
+            connection.connect()
+
         connection.putrequest(method, url)
 
         for header, value in headers.items():
@@ -170,7 +433,6 @@ class HttpRequest(Request):
         self.headers = headers
         self.method = method
         self.mimetype = mimetype
-        self.signature = address.render_prefixed_path('id', 'id')
         self.subject = address.subject
 
     @property
@@ -192,6 +454,10 @@ class HttpRequest(Request):
         if mimetype in Format.formats:
             return parse_header(header)
 
+    @property
+    def signature(self):
+        return self.address.render_prefixed_path('id', 'id')
+
 class HttpResponse(Response):
     """An HTTP response."""
 
@@ -215,13 +481,15 @@ class HttpResponse(Response):
         if 'Content-Type' not in headers and self.mimetype:
             headers['Content-Type'] = self.mimetype
 
-        if 'Content-Length' not in headers:
+        if 'Content-Length' not in headers and self.status != NOT_MODIFIED:
             if isinstance(self.data, list):
                 content_length = 0
                 for chunk in self.data:
                     content_length += len(chunk)
                 headers['Content-Length'] = str(content_length)
-            else:
+            elif not self.data:
+                headers['Content-Length'] = '0'
+            elif hasattr(self.data, '__len__'):
                 headers['Content-Length'] = str(len(self.data))
 
         prefix = prefix or ''
@@ -236,14 +504,108 @@ class HttpResponse(Response):
         if not (name in self.headers or conditional):
             self.headers[name] = value
 
+class RequestInput(object):
+    """A file-like reader over the body of a WSGI request which was sent without a
+    ``Content-Length``, using chunked transfer encoding.
+
+    If the WSGI server has already decoded the chunked body, which it indicates by setting
+    ``wsgi.input_terminated``, the input is read until it is exhausted; otherwise, the chunk
+    framing is decoded as the input is read. In either case, :exc:`PayloadTooLargeError` is
+    raised as soon as the body is known to exceed ``limit`` bytes, before the offending chunk
+    is read.
+    """
+
+    BlockSize = 65536
+
+    def __init__(self, stream, limit=None, terminated=False):
+        self.buffer = b''
+        self.consumed = 0
+        self.finished = False
+        self.limit = limit
+        self.remaining = 0
+        self.stream = stream
+        self.terminated = terminated
+
+    def read(self, size=-1):
+        while not self.finished and (size is None or size < 0 or len(self.buffer) < size):
+            self._fill()
+
+        buffer = self.buffer
+        if size is None or size < 0:
+            self.buffer = b''
+            return buffer
+
+        self.buffer = buffer[size:]
+        return buffer[:size]
+
+    def readline(self):
+        while b'\n' not in self.buffer and not self.finished:
+            self._fill()
+
+        offset = self.buffer.find(b'\n')
+        if offset < 0:
+            return self.read()
+        return self.read(offset + 1)
+
+    def _fill(self):
+        stream = self.stream
+        if self.terminated:
+            data = stream.read(self.BlockSize)
+            if not data:
+                self.finished = True
+                return
+        else:
+            if not self.remaining:
+                line = stream.readline()
+                if not line:
+                    raise ValueError('chunked request body was truncated')
+
+                size = int(line.split(b';', 1)[0].strip(), 16)
+                if size == 0:
+                    while line.strip():
+                        line = stream.readline()
+                    self.finished = True
+                    return
+
+                self._check_limit(size)
+                self.remaining = size
+
+            data = stream.read(min(self.remaining, self.BlockSize))
+            if not data:
+                raise ValueError('chunked request body was truncated')
+
+            self.remaining -= len(data)
+            if not self.remaining:
+                stream.readline()
+
+        self._check_limit(len(data))
+        self.consumed += len(data)
+        self.buffer += data
+
+    def _check_limit(self, size):
+        if self.limit is not None and self.consumed + size > self.limit:
+            raise PayloadTooLargeError()
+
 class WsgiServer(Server):
+    """A WSGI application serving mesh bundles.
+
+    :param int max_request_size: Optional, default is ``None``; the maximum size, in bytes, of a
+        request body, beyond which the request is rejected with ``413 Payload Too Large``. A
+        request which declares a larger ``Content-Length`` is rejected before its body is read.
+        If ``None``, the size of request bodies is not limited.
+    """
+
     DefaultFormat = Json
 
     def __init__(self, bundles, default_format=None, available_formats=None, mediators=None,
-            context_environ_key=None, context_header_prefix=None):
+            context_environ_key=None, context_header_prefix=None, compression=None,
+            max_request_size=None, instrumentation=None, validation_policy=None):
 
-        super(WsgiServer, self).__init__(bundles, default_format, available_formats, mediators)
+        super(WsgiServer, self).__init__(bundles, default_format, available_formats, mediators,
+            instrumentation, validation_policy)
+        self.compression = compression
         self.context_environ_key = context_environ_key
+        self.max_request_size = max_request_size
         self.context_header_prefix = context_header_prefix
         self.multipart_parser = MultipartMixedParser()
 
@@ -254,6 +616,10 @@ class WsgiServer(Server):
 
             try:
                 data = self._parse_request_data(method, mimetype, environ)
+            except PayloadTooLargeError:
+                log('info', 'rejected oversized request body for %s', environ['PATH_INFO'])
+                start_response(STATUS_LINES[PAYLOAD_TOO_LARGE], [('Content-Length', '0')])
+                return []
             except Exception:
                 log('exception', 'exception raised during wsgi request parsing')
                 start_response('400 Bad Request', [])
@@ -269,24 +635,46 @@ class WsgiServer(Server):
             response = self.dispatch(method, environ['PATH_INFO'], mimetype, context,
                 environ, data, identity)
 
+            body = self._construct_response_body(environ, response)
             headers = response.construct_headers(self.context_header_prefix)
-            data = response.data
-
-            if data:
-                if isinstance(data, string):
-                    data = data.encode('utf8')
-                if not isinstance(data, list):
-                    data = [data]
-            else:
-                data = []
 
             start_response(response.status_line, headers)
-            return data
+            return body
         except Exception:
             log('exception', 'uncaught exception raised during wsgi dispatch')
             start_response('500 Internal Server Error', [])
             return []
 
+    def _construct_response_body(self, environ, response):
+        data = response.data
+        if data and isinstance(data, string) and not isinstance(data, bytes):
+            data = response.data = data.encode('utf8')
+
+        if data and self.compression:
+            self._compress_response(environ, response)
+            data = response.data
+
+        if not data:
+            return []
+        elif isinstance(data, bytes):
+            return [data]
+        else:
+            return data
+
+    def _compress_response(self, environ, response):
+        compression = self.compression
+        response.headers['Vary'] = 'Accept-Encoding'
+
+        if 'Content-Encoding' in response.headers:
+            return
+        if not compression.should_compress(response.data):
+            return
+
+        encoding = compression.negotiate(environ.get('HTTP_ACCEPT_ENCODING'))
+        if encoding:
+            response.data = compression.compress(response.data, encoding)
+            response.headers['Content-Encoding'] = encoding
+
     def _identify_ipaddr(self, environ):
         if 'HTTP_X_FORWARDED_FOR' in environ:
             return environ['HTTP_X_FORWARDED_FOR']
@@ -295,32 +683,84 @@ class WsgiServer(Server):
 
     def _parse_request_data(self, method, mimetype, environ):
         if method == 'GET':
-            return environ['QUERY_STRING']
+            return environ.get('QUERY_STRING') or None
         elif method in ('HEAD', 'OPTIONS'):
             return None
 
+        limit = self.max_request_size
         length = int(environ.get('CONTENT_LENGTH') or 0)
+
         if length > 0:
-            if mimetype and 'multipart/mixed' in mimetype:
-                return self.multipart_parser.parse(environ['wsgi.input'], mimetype)
-            else:
-                return environ['wsgi.input'].read(int(length)).decode('utf-8')
+            if limit is not None and length > limit:
+                raise PayloadTooLargeError()
+            stream = environ['wsgi.input']
+        else:
+            encoding = environ.get('HTTP_TRANSFER_ENCODING') or environ.get('TRANSFER_ENCODING')
+            if not (encoding and 'chunked' in encoding.lower()):
+                return None
 
-        encoding = environ.get('TRANSFER_ENCODING')
-        if encoding:
-            raise NotImplementedError()
+            stream = RequestInput(environ['wsgi.input'], limit,
+                environ.get('wsgi.input_terminated', False))
+
+        if mimetype and 'multipart/mixed' in mimetype:
+            return self.multipart_parser.parse(stream, mimetype)
+
+        if length > 0:
+            data = stream.read(length)
         else:
-            return None
+            data = stream.read()
+            if not data:
+                return None
+
+        encoding = environ.get('HTTP_CONTENT_ENCODING')
+        if encoding:
+            data = Compression.decompress(data, encoding, limit)
+        return data.decode('utf-8')
 
 class HttpServer(WsgiServer):
-    """The HTTP mesh server."""
+    """The HTTP mesh server.
+
+    Controllers can return iterators, such as generators, in place of the sequences in their
+    responses, or as the entirety of a response whose schema is a sequence. When the response
+    is serialized as JSON, each element is then processed and serialized as the response body
+    is consumed, in chunks of approximately ``StreamChunkSize`` bytes, and the response is sent
+    without a ``Content-Length``.
+
+    If ``cache`` is specified, it should be a :class:`ResponseCache`, in which the serialized
+    responses to ``GET`` requests are cached.
+
+    When JSON is an available format, many requests can be made in one round trip by posting a
+    JSON batch to ``_batch``, beneath ``prefix`` if one is specified, such as::
+
+        {"requests": [{"method": "GET", "path": "/bundle/1.0/resource/1"},
+                      {"method": "POST", "path": "/bundle/1.0/resource", "data": {...}}],
+         "parallel": false}
+
+    Each request is dispatched as if it had been made individually, with the context and
+    headers of the batch, and the response lists ``{"status": ..., "data": ...}`` for each
+    request, in order. Requests in a batch are processed in order unless the batch is marked
+    ``parallel`` and ``batch_concurrency`` is specified, in which case at most that number of
+    them are processed at once.
+
+    If ``instrumentation`` is specified and ``expose_metrics`` is ``True``, the metrics it
+    collects can be retrieved in the Prometheus text format from ``_metrics``, beneath
+    ``prefix`` if one is specified.
+    """
+
+    StreamChunkSize = 65536
 
     def __init__(self, bundles, prefix=None, default_format=None, available_formats=None,
-            mediators=None, context_key=None):
+            mediators=None, context_key=None, compression=None, max_request_size=None,
+            cache=None, batch_concurrency=None, instrumentation=None, expose_metrics=False,
+            validation_policy=None):
 
         super(HttpServer, self).__init__(bundles, default_format, available_formats,
-            mediators, context_key)
+            mediators, context_key, compression=compression,
+            max_request_size=max_request_size, instrumentation=instrumentation,
+            validation_policy=validation_policy)
 
+        self.batch_concurrency = batch_concurrency
+        self.cache = cache
         self.prefix = None
         address = None
 
@@ -328,20 +768,210 @@ class HttpServer(WsgiServer):
             self.prefix = '/' + prefix.strip('/')
             address = Address(prefix=self.prefix)
 
-        self.paths = {}
+        self.batch_path = None
+        if JSON in self.formats:
+            self.batch_path = '%s/%s' % (self.prefix or '', BATCH_PATH)
+
+        self.metrics_path = None
+        if instrumentation and expose_metrics:
+            self.metrics_path = '%s/%s' % (self.prefix or '', METRICS_PATH)
+
+        self.router = Router(self.prefix)
         for name, bundle in self.bundles.items():
             for resource_addr, resource, controller in bundle.enumerate_resources(address):
                 for addr, endpoint in resource.enumerate_endpoints(resource_addr):
                     if endpoint.method:
-                        signature = addr.render_prefixed_path('id', 'id')
-                        if signature not in self.paths:
-                            self.paths[signature] = {}
-                        self.paths[signature][endpoint.method] = (resource, controller, endpoint)
+                        self.router.add(addr, endpoint.method, resource, controller, endpoint)
+                        endpoint.compile()
 
     def dispatch(self, method, path, mimetype, context, headers, data, identity):
+        if method == POST and path == self.batch_path:
+            return self._dispatch_batch(context, headers, data, identity)
+        elif method == GET and path == self.metrics_path:
+            return self._construct_metrics_response()
+
+        request, response, controller, endpoint = self._prepare_dispatch(method, path,
+            mimetype, context, headers, data, identity)
+        if not request:
+            return response
+
+        key, entry = self._consult_cache(request, controller, endpoint)
+        if entry:
+            if entry.stale and self.cache.begin_revalidation(key):
+                thread = Thread(target=self._revalidate_cached_response,
+                    args=(key, request, controller, endpoint))
+                thread.daemon = True
+                thread.start()
+            return self._record_response(request, endpoint,
+                self._construct_cached_response(request, entry))
+
+        generation = self.cache.generation if self.cache else None
+        try:
+            endpoint.process(controller, request, response, self.mediators,
+                self.instrumentation, self.validation_policy)
+        except Exception as exception:
+            log('exception', 'uncaught exception raised during endpoint processing')
+            return self._record_response(request, endpoint, response(SERVER_ERROR))
+
+        response = self._complete_dispatch(request, response, endpoint)
+        self._update_cache(key, generation, request, response, controller, endpoint)
+        return self._record_response(request, endpoint, response)
+
+    def _construct_batch_response(self, responses):
+        segments = []
+        for response in responses:
+            if isinstance(response, Exception):
+                log('error', 'uncaught exception raised during batched dispatch: %r', response)
+                response = HttpResponse(SERVER_ERROR)
+
+            segment = [b'{"status": "', response.status.encode('utf8'), b'"']
+            data = response.data
+            if data:
+                if not isinstance(data, bytes):
+                    data = data.encode('utf8')
+                segment.extend((b', "data": ', data))
+            segment.append(b'}')
+            segments.append(b''.join(segment))
+
+        return HttpResponse(OK, b'[' + b', '.join(segments) + b']', mimetype=JSON)
+
+    def _construct_metrics_response(self):
+        return HttpResponse(OK, self.instrumentation.render_prometheus(),
+            mimetype=PROMETHEUS_MIMETYPE)
+
+    def _construct_subrequest_headers(self, headers):
+        subheaders = {}
+        if headers:
+            for name, value in headers.items():
+                if name.startswith('HTTP_') and name not in SUBREQUEST_EXCLUDED_HEADERS:
+                    subheaders[name] = value
+        return subheaders
+
+    def _dispatch_batch(self, context, headers, data, identity):
+        batch = self._parse_batch(data)
+        if not batch:
+            return HttpResponse(BAD_REQUEST)
+
+        subrequests, parallel = batch
+        headers = self._construct_subrequest_headers(headers)
+
+        arguments = []
+        for method, path, subdata in subrequests:
+            arguments.append((method, path, context, headers, subdata, identity))
+
+        concurrency = None
+        if parallel:
+            concurrency = self.batch_concurrency
+
+        responses = execute_concurrently(self._dispatch_subrequest, arguments, concurrency)
+        return self._construct_batch_response(responses)
+
+    def _dispatch_subrequest(self, method, path, context, headers, data, identity):
+        if isinstance(context, dict):
+            context = dict(context)
+
+        response = self.dispatch(method, path, JSON, context, headers, data, identity)
+        if is_iterator(response.data):
+            response.data = b''.join(response.data)
+        return response
+
+    def _parse_batch(self, data):
+        """Parses the body of a batch into a ``(subrequests, parallel)`` tuple, where
+        ``subrequests`` is a list of ``(method, path, data)`` tuples, or returns ``None`` if
+        the batch is malformed."""
+
+        if not isinstance(data, string):
+            return None
+
+        try:
+            batch = json.loads(data)
+        except ValueError:
+            return None
+
+        if not (isinstance(batch, dict) and isinstance(batch.get('requests'), list)):
+            return None
+
+        subrequests = []
+        for subrequest in batch['requests']:
+            if not isinstance(subrequest, dict):
+                return None
+
+            method, path = subrequest.get('method'), subrequest.get('path')
+            if not (method and isinstance(method, string)):
+                return None
+            if not isinstance(path, string) or '!' in path:
+                return None
+            if path in (self.batch_path, self.metrics_path):
+                return None
+
+            subrequests.append((method, path, subrequest.get('data')))
+
+        return subrequests, bool(batch.get('parallel'))
+
+    def _consult_cache(self, request, controller, endpoint):
+        if not (self.cache and request.method == GET):
+            return None, None
+
+        format, params = self._resolve_format(request)
+        key = self.cache.construct_key(controller, endpoint, request, format, params)
+        return key, self.cache.get(key)
+
+    def _construct_cached_response(self, request, entry):
+        response = HttpResponse(OK, entry.data, mimetype=entry.mimetype,
+            headers=dict(entry.headers))
+
+        etag = response.headers.get('ETag')
+        if etag and self._match_etag(request.headers, etag):
+            return self._construct_not_modified_response(response, etag)
+        return response
+
+    def _record_response(self, request, endpoint, response):
+        instrumentation = self.instrumentation
+        if instrumentation:
+            size = None
+            if isinstance(response.data, (bytes, string)):
+                size = len(response.data)
+            instrumentation.record_response(endpoint, response.status, size, request.address)
+        return response
+
+    def _revalidate_cached_response(self, key, request, controller, endpoint):
+        try:
+            generation = self.cache.generation
+            request.headers = dict(request.headers or {})
+            request.headers.pop('HTTP_IF_NONE_MATCH', None)
+
+            response = HttpResponse()
+            endpoint.process(controller, request, response, self.mediators,
+                self.instrumentation, self.validation_policy)
+            response = self._complete_dispatch(request, response, endpoint)
+            self._update_cache(key, generation, request, response, controller, endpoint)
+        except Exception:
+            log('exception', 'uncaught exception raised during revalidation of %r', request)
+        finally:
+            self.cache.end_revalidation(key)
+
+    def _update_cache(self, key, generation, request, response, controller, endpoint):
+        cache = self.cache
+        if not cache:
+            return
+
+        if key:
+            if response.status == OK and isinstance(response.data, (bytes, string)):
+                cache.set(key, response, generation)
+        elif response.ok:
+            ResponseCache.invalidate_all(controller.versions.values(), request.subject)
+
+    def _prepare_dispatch(self, method, path, mimetype, context, headers, data, identity):
+        """Prepares a request for processing by an endpoint, returning a ``(request, response,
+        controller, endpoint)`` tuple; if the request cannot be processed, ``request`` is
+        ``None`` and ``response`` is complete."""
+
+        instrumentation = self.instrumentation
+        started = instrumentation and instrumentation.timer()
+
         response = HttpResponse()
         if method == GET and path.strip('/') in self.bundles:
-            return response(OK)
+            return None, response(OK), None, None
 
         mimetype = mimetype or URLENCODED
         if ';' in mimetype:
@@ -349,11 +979,14 @@ class HttpServer(WsgiServer):
         if mimetype not in self.formats:
             mimetype = URLENCODED
 
-        try:
-            address = Address.parse(path, self.prefix)
-        except ValueError:
+        resolution = self.router.resolve(path)
+        if not resolution:
             log('info', 'no path found for %s', path)
-            return response(NOT_FOUND)
+            return None, response(NOT_FOUND), None, None
+
+        address, candidates = resolution
+        if address.format and address.format not in self.formats:
+            return None, response(NOT_FOUND), None, None
 
         request = HttpRequest(address, method, data, context, mimetype, headers, identity)
         if request.accept:
@@ -365,93 +998,399 @@ class HttpServer(WsgiServer):
         else:
             request.format = self.default_format
 
-        candidates = self.paths.get(request.signature)
-        if candidates:
-            candidate = candidates.get(request.method)
-            if candidate:
-                resource, controller, endpoint = candidate
-            else:
-                return response(METHOD_NOT_ALLOWED)
+        candidate = candidates.get(request.method)
+        if candidate:
+            resource, controller, endpoint = candidate
         else:
-            return response(NOT_FOUND)
+            return None, response(METHOD_NOT_ALLOWED), None, None
 
-        if data:
+        format, params = self._resolve_format(request)
+        request.streaming = (format.name == 'json' and not params)
+
+        if instrumentation:
+            started = instrumentation.record(endpoint, 'routing', started, address)
+
+        if data is not None and not isinstance(data, (MultipartPayload, string)):
+            # the data of a batched request has already been unserialized with the batch
+            request.data = data
+        elif data:
             if isinstance(data, MultipartPayload):
                 try:
                     request.data = data.unserialize(self.formats)
                 except Exception:
                     log('exception', 'failed to parse data for %r', request)
-                    return response(BAD_REQUEST)
+                    return None, response(BAD_REQUEST), None, None
             else:
                 try:
                     request.data = self.formats[mimetype].unserialize(data, endpoint.schema)
                 except Exception:
                     log('exception', 'failed to parse data for %r', request)
-                    return response(BAD_REQUEST)
+                    return None, response(BAD_REQUEST), None, None
 
-        try:
-            endpoint.process(controller, request, response, self.mediators)
-        except Exception as exception:
-            log('exception', 'uncaught exception raised during endpoint processing')
-            return response(SERVER_ERROR)
+            if instrumentation:
+                instrumentation.record(endpoint, 'parsing', started, address)
 
-        format = request.format
+        return request, response, controller, endpoint
+
+    def _complete_dispatch(self, request, response, endpoint):
+        """Serializes the data of a response which has been processed by an endpoint."""
+
+        format, params = self._resolve_format(request)
+        headers = request.headers
+
+        tagged = (request.method == GET and response.status == OK)
+        if tagged and response.version is not None:
+            etag = '"%s"' % response.version
+            if self._match_etag(headers, etag):
+                return self._construct_not_modified_response(response, etag)
+
+        streamed = False
         if response.data:
-            schema = endpoint.responses[response.status].schema
-            if isinstance(format, tuple):
-                format, params = format
-                response.data = format.serialize(response.data, schema, **params)
+            if request.streaming and self._is_streamed(response.data):
+                response.data = self._serialize_stream(format, response.data)
+                streamed = True
             else:
-                response.data = format.serialize(response.data, schema)
+                instrumentation = self.instrumentation
+                started = instrumentation and instrumentation.timer()
+
+                schema = endpoint.responses[response.status].schema
+                response.data = format.serialize(response.data, schema, **params)
+                if not isinstance(response.data, bytes):
+                    response.data = response.data.encode('utf8')
+
+                if instrumentation:
+                    instrumentation.record(endpoint, 'serialization', started,
+                        request.address)
+
+        if tagged and response.data and 'ETag' not in response.headers:
+            etag = None
+            if response.version is not None:
+                etag = '"%s"' % response.version
+            elif not streamed:
+                etag = self._generate_etag(response.data)
+
+            if etag:
+                response.headers['ETag'] = etag
+                if self._match_etag(headers, etag):
+                    return self._construct_not_modified_response(response, etag)
 
         response.mimetype = format.mimetype
         return response
 
+    def _resolve_format(self, request):
+        format = request.format
+        if isinstance(format, tuple):
+            return format
+        else:
+            return format, {}
+
+    def _construct_not_modified_response(self, response, etag):
+        response.headers['ETag'] = etag
+        response.data = None
+        return response(NOT_MODIFIED)
+
+    def _generate_serialized_segments(self, format, value):
+        if is_iterator(value):
+            yield '['
+            separator = ''
+            for item in value:
+                yield separator + format.serialize(item)
+                separator = ', '
+            yield ']'
+        elif isinstance(value, dict):
+            yield '{'
+            separator = ''
+            for key, item in value.items():
+                yield separator + format.serialize(key) + ': '
+                for segment in self._generate_serialized_segments(format, item):
+                    yield segment
+                separator = ', '
+            yield '}'
+        else:
+            yield format.serialize(value)
+
+    def _is_streamed(self, data):
+        if isinstance(data, dict):
+            for value in data.values():
+                if is_iterator(value):
+                    return True
+            return False
+        return is_iterator(data)
+
+    def _serialize_stream(self, format, data):
+        threshold = self.StreamChunkSize
+        chunk, size = [], 0
+
+        for segment in self._generate_serialized_segments(format, data):
+            segment = segment.encode('utf8')
+            chunk.append(segment)
+            size += len(segment)
+            if size >= threshold:
+                yield b''.join(chunk)
+                chunk, size = [], 0
+
+        if chunk:
+            yield b''.join(chunk)
+
+    def _generate_etag(self, data):
+        if isinstance(data, string):
+            data = data.encode('utf8')
+        return '"%s"' % hashlib.sha1(data).hexdigest()
+
+    def _match_etag(self, headers, etag):
+        header = headers and headers.get('HTTP_IF_NONE_MATCH')
+        if not header:
+            return False
+        elif header.strip() == '*':
+            return True
+
+        for candidate in header.split(','):
+            candidate = candidate.strip()
+            if candidate.startswith('W/'):
+                candidate = candidate[2:]
+            if candidate == etag:
+                return True
+        else:
+            return False
+
+class RequestPlan(object):
+    """A compiled plan for requests to a particular endpoint, holding everything about such
+    requests which does not vary from one request to the next."""
+
+    def __init__(self, endpoint, context_header_prefix=None):
+        self.endpoint = endpoint
+        self.method = endpoint['method']
+        self.prefix = context_header_prefix or ''
+        self.prefixed_headers = {}
+        self.schema = endpoint['schema']
+
+        self.serializer = None
+        if self.method == GET:
+            self.serializer = UrlEncoded
+
+        address = self.address = Address(*endpoint['address'])
+        address.subject = None
+
+        self.path = address.prefixed_path
+        self.template = '%s/%%s%s' % (address.render('pbr').replace('%', '%%'),
+            address.render('uvf').replace('%', '%%'))
+
+    def __repr__(self):
+        return 'RequestPlan(%r, %r)' % (self.method, self.path)
+
+    def render_path(self, subject=None):
+        if subject:
+            return self.template % subject
+        else:
+            return self.path
+
+    def render_headers(self, context):
+        headers = {}
+        prefixed_headers = self.prefixed_headers
+
+        for name, value in context.items():
+            try:
+                headers[prefixed_headers[name]] = value
+            except KeyError:
+                header = prefixed_headers[name] = self.prefix + name
+                headers[header] = value
+
+        return headers
+
+class CachedResponse(object):
+    """A processed response held by an :class:`HttpClientCache`."""
+
+    def __init__(self, response, lifetime, etag=None):
+        self.data = response.data
+        self.etag = etag
+        self.expires = time() + lifetime
+        self.headers = response.headers
+        self.mimetype = response.mimetype
+        self.status = response.status
+
+    @property
+    def fresh(self):
+        return self.expires > time()
+
+    def construct_response(self):
+        return HttpResponse(self.status, self.data, mimetype=self.mimetype,
+            headers=dict(self.headers))
+
+class HttpClientCache(object):
+    """A client-side cache of processed responses to GET requests.
+
+    :param int capacity: Optional, default is ``1000``; the maximum number of responses held
+        by this cache, beyond which the least recently used response is evicted.
+
+    :param int ttl: Optional, default is ``60``; the maximum number of seconds a response is
+        considered fresh. A shorter ``max-age`` specified by the server takes precedence.
+
+    Responses are keyed by method, path, query and request headers, with the query
+    parameters placed in a canonical order. Since the context of a request is sent in its
+    headers, a cached response is only returned for requests with the same context. A fresh
+    response is returned without contacting the server. A stale response with an ``ETag`` is
+    revalidated with ``If-None-Match``, and is returned again if the server replies that it
+    has not been modified. Responses marked ``no-store``, and stale responses without an
+    ``ETag``, are not kept. Cached data is shared by every response returned for it, and
+    should be treated as read-only.
+    """
+
+    def __init__(self, capacity=1000, ttl=60):
+        self.entries = LruCache(capacity)
+        self.ttl = ttl
+
+    def lookup(self, method, path, query, headers):
+        """Looks up the cached response for a request, adding an ``If-None-Match`` header to
+        ``headers`` when a stale response must be revalidated. Returns a ``(key, entry)``
+        tuple, where ``entry`` is ``None`` if no usable response is cached."""
+
+        if query:
+            query = '&'.join(sorted(query.split('&')))
+
+        key = (method, path, query, tuple(sorted(headers.items())))
+        entry = self.entries.get(key)
+
+        if entry and not entry.fresh:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            else:
+                self.entries.discard(key)
+                entry = None
+
+        return key, entry
+
+    def revalidate(self, key, entry, response):
+        """Refreshes ``entry`` following a not-modified ``response``, then returns a response
+        constructed from it."""
+
+        lifetime = self._calculate_lifetime(response.headers)
+        if lifetime is None:
+            self.entries.discard(key)
+        else:
+            entry.expires = time() + lifetime
+
+        return entry.construct_response()
+
+    def store(self, key, response):
+        lifetime = self._calculate_lifetime(response.headers)
+        etag = response.headers.get('Etag')
+
+        if lifetime is None or (lifetime <= 0 and not etag):
+            self.entries.discard(key)
+        else:
+            self.entries.set(key, CachedResponse(response, lifetime, etag))
+
+    def _calculate_lifetime(self, headers):
+        directives = {}
+        for directive in headers.get('Cache-Control', '').split(','):
+            name, _, value = directive.strip().partition('=')
+            directives[name.lower()] = value
+
+        if 'no-store' in directives:
+            return None
+        elif 'max-age' in directives:
+            try:
+                return min(int(directives['max-age']), self.ttl)
+            except ValueError:
+                return 0
+        elif 'no-cache' in directives:
+            return 0
+        else:
+            return self.ttl
+
 class HttpClient(Client):
-    """An HTTP client."""
+    """An HTTP client.
+
+    Response data is decoded and then processed against the response schema of its endpoint
+    by a compiled processor, which validates the freshly decoded data in place of copying it.
+    If ``raw`` is ``True``, response data is instead returned exactly as decoded, without
+    being processed, which should only be done for trusted servers whose responses are known
+    to be valid and whose schemas need no unserialization, such as of dates.
+    """
 
     ConnectionImplementation = Connection
+    DefaultConcurrency = 10
     DefaultHeaderPrefix = None
     DefaultFormat = Json
 
     def __init__(self, url, specification=None, context=None, format=None, formats=None,
-            context_header_prefix=None, timeout=None, bundle=None):
+            context_header_prefix=None, timeout=None, bundle=None, pool=None, cache=None,
+            compression=None, raw=False):
 
         super(HttpClient, self).__init__(specification, context, format, formats)
         if '//' not in url:
             url = 'http://' + url
 
-        self.connection = self.ConnectionImplementation(url, timeout)
+        self.cache = cache
+        self.connection = self.ConnectionImplementation(url, timeout, pool, compression)
         self.context_header_prefix = context_header_prefix or self.DefaultHeaderPrefix
+        self.plans = {}
+        self.processors = {}
+        self.raw = raw
         self.url = url.rstrip('/')
 
     def execute(self, target, subject=None, data=None, format=None, context=None):
         endpoint, method, path, mimetype, data, headers = self._prepare_request(target, subject,
             data, format, context)
 
+        cached = self._consult_cache(method, path, data, headers)
+        if cached and cached[1] and cached[1].fresh:
+            return cached[1].construct_response()
+
         try:
             response = self.connection.request(method, path, data, headers)
         except socket.timeout:
             raise TimeoutError()
 
-        status = response.status
-        if status in endpoint['responses']:
-            schema = endpoint['responses'][status]['schema']
-        elif not (status in ERROR_STATUS_CODES and not response.data):
-            exception = RequestError.construct(status)
-            if exception:
-                raise exception
-            else:
-                raise Exception('server returned unknown status: %s' % status)
+        return self._process_response(endpoint, response, cached)
 
-        if response.data:
-            response.data = schema.process(self.formats[response.mimetype]
-                .unserialize(response.data.decode('utf8'), schema), INBOUND, True)
+    def execute_many(self, requests, concurrency=None, format=None, context=None):
+        """Executes many requests concurrently over pooled connections.
 
-        if response.ok:
-            return response
-        else:
-            raise RequestError.construct(status, response.data)
+        :param requests: A sequence of ``(target, subject, data)`` tuples, each specifying a
+            request as would be passed to :meth:`execute`; ``subject`` and ``data`` may be
+            omitted from the end of a tuple.
+
+        :param int concurrency: Optional, default is ``None``; the maximum number of requests
+            executed at once. If ``None``, ``DefaultConcurrency`` is used.
+
+        :returns: A ``list`` containing, in the order of ``requests``, either the response to
+            each request or the exception raised while executing it.
+        """
+
+        arguments = []
+        for request in requests:
+            target, subject, data = (tuple(request) + (None, None))[:3]
+            arguments.append((target, subject, data, format, context))
+
+        return execute_concurrently(self.execute, arguments,
+            concurrency or self.DefaultConcurrency)
+
+    def execute_batch(self, requests, parallel=False, context=None):
+        """Executes many requests in a single round trip, as a batch processed by the server.
+
+        :param requests: A sequence of ``(target, subject, data)`` tuples, each specifying a
+            request as would be passed to :meth:`execute`; ``subject`` and ``data`` may be
+            omitted from the end of a tuple. Every target must be served by the same server.
+
+        :param boolean parallel: Optional, default is ``False``; if ``True``, the server may
+            process the requests concurrently, and in any order, rather than in order.
+
+        :returns: A ``list`` containing, in the order of ``requests``, either the response to
+            each request or the exception which would have been raised had it been executed
+            individually.
+        """
+
+        results, pending, batch = self._prepare_batch(requests, parallel, context)
+        if not batch:
+            return results
+
+        try:
+            response = self.connection.request(POST, *batch)
+        except socket.timeout:
+            raise TimeoutError()
+
+        return self._complete_batch(results, pending, response)
 
     def prepare(self, target, subject=None, data=None, format=None, context=None,
             preparation=None):
@@ -470,52 +1409,177 @@ class HttpClient(Client):
             preparation['headers'] = headers
         return preparation
 
-    def _prepare_request(self, target, subject=None, data=None, format=None, context=None):
-        endpoint = None
-        if isinstance(target, dict):
-            endpoint = target
-        elif isinstance(target, string):
-            target = Address.parse(target)
-            if not subject and target.subject:
-                subject = target.subject
-        elif not isinstance(target, Address):
+    def _complete_batch(self, results, pending, response):
+        if response.status != OK:
+            exception = RequestError.construct(response.status)
+            if exception:
+                raise exception
+            else:
+                raise Exception('server returned unknown status: %s' % response.status)
+
+        items = json.loads(response.data.decode('utf8'))
+        for (index, endpoint), item in zip(pending, items):
+            subresponse = HttpResponse(item['status'], item.get('data'), mimetype=JSON)
+            try:
+                results[index] = self._validate_response(endpoint, subresponse)
+            except Exception as exception:
+                results[index] = exception
+
+        return results
+
+    def _consult_cache(self, method, path, data, headers):
+        if self.cache and method == GET:
+            return self.cache.lookup(method, path, data, headers)
+
+    def _process_response(self, endpoint, response, cached=None):
+        status = response.status
+        if cached and cached[1] and status == NOT_MODIFIED:
+            return self.cache.revalidate(cached[0], cached[1], response)
+
+        schema = self._find_response_schema(endpoint, response)
+        if response.data:
+            response.data = self._process_response_data(schema, self.formats[response.mimetype]
+                .unserialize(response.data.decode('utf8'), schema))
+
+        if response.ok:
+            if cached:
+                self.cache.store(cached[0], response)
+            return response
+        else:
+            raise RequestError.construct(status, response.data)
+
+    def _find_response_schema(self, endpoint, response):
+        status = response.status
+        if status in endpoint['responses']:
+            return endpoint['responses'][status]['schema']
+        elif not (status in ERROR_STATUS_CODES and not response.data):
+            exception = RequestError.construct(status)
+            if exception:
+                raise exception
+            else:
+                raise Exception('server returned unknown status: %s' % status)
+
+    def _validate_response(self, endpoint, response):
+        schema = self._find_response_schema(endpoint, response)
+        if response.data:
+            response.data = self._process_response_data(schema, response.data)
+
+        if response.ok:
+            return response
+        else:
+            raise RequestError.construct(response.status, response.data)
+
+    def _process_response_data(self, schema, data):
+        if self.raw:
+            return data
+
+        key = id(schema)
+        entry = self.processors.get(key)
+        if entry is None or entry[0] is not schema:
+            entry = self.processors[key] = (schema, compile_processor(schema, INBOUND, True,
+                True))
+        return entry[1](data)
+
+    def _find_plan(self, target):
+        plans = self.plans
+        subject = None
+
+        if isinstance(target, string):
+            plan = plans.get(target)
+            if plan:
+                return plan, None
+
+            address = Address.parse(target)
+            if address.subject:
+                subject = address.subject
+                key = address.render('ebr')
+            else:
+                key = target
+        elif isinstance(target, Address):
+            address = target
+            key = target.render('ebr')
+        elif isinstance(target, dict):
+            key = Address(*target['address']).render('ebr')
+        else:
             raise TypeError(target)
 
-        if not endpoint:
-            endpoint = self.specification.find(target)
+        plan = plans.get(key)
+        if not plan:
+            if isinstance(target, dict):
+                endpoint = target
+            else:
+                endpoint = self.specification.find(address)
+            plan = plans[key] = RequestPlan(endpoint, self.context_header_prefix)
 
-        address = Address(*endpoint['address'])
-        if subject:
-            address.subject = subject
+        return plan, subject
+
+    def _prepare_batch(self, requests, parallel, context):
+        results, pending, subrequests = [], [], []
+        plan = None
+
+        for request in requests:
+            target, subject, data = (tuple(request) + (None, None))[:3]
+            try:
+                plan, subrequest = self._prepare_subrequest(target, subject, data)
+            except Exception as exception:
+                results.append(exception)
+            else:
+                pending.append((len(results), plan.endpoint))
+                subrequests.append(subrequest)
+                results.append(None)
+
+        if not subrequests:
+            return results, pending, None
+
+        headers = {'Content-Type': JSON}
+        if context is not False:
+            headers.update(plan.render_headers(self._construct_context(context)))
+
+        path = '%s/%s' % (plan.address.prefix or '', BATCH_PATH)
+        body = json.dumps({'requests': subrequests, 'parallel': parallel})
+        return results, pending, (path, body, headers)
+
+    def _prepare_request(self, target, subject=None, data=None, format=None, context=None):
+        plan, target_subject = self._find_plan(target)
+        if not subject and target_subject:
+            subject = target_subject
 
         headers = {}
         if context is not False:
-            prefix = self.context_header_prefix or ''
-            for name, value in self._construct_context(context).items():
-                headers[prefix + name] = value
+            headers = plan.render_headers(self._construct_context(context))
 
         format = format or self.format
         mimetype = None
 
         if data is not None:
             if isinstance(data, MultipartPayload):
-                data.payload = endpoint['schema'].process(data.payload, OUTBOUND, True)
+                data.payload = plan.schema.process(data.payload, OUTBOUND, True)
                 data = MultipartMixedEncoder(data, format)
                 headers.update(data.headers)
             else:
-                data = endpoint['schema'].process(data, OUTBOUND, True)
-                if endpoint['method'] == GET:
-                    data = UrlEncoded.serialize(data)
-                    mimetype = fields.UrlEncoded.mimetype
+                data = plan.schema.process(data, OUTBOUND, True)
+                if plan.serializer:
+                    data = plan.serializer.serialize(data)
+                    mimetype = plan.serializer.mimetype
                 else:
-                    data = format.serialize(data, endpoint['schema'])
+                    data = format.serialize(data, plan.schema)
                     mimetype = format.mimetype
 
         if mimetype:
             headers['Content-Type'] = mimetype
 
-        path = address.prefixed_path
-        return endpoint, endpoint['method'], path, mimetype, data, headers
+        return (plan.endpoint, plan.method, plan.render_path(subject), mimetype, data,
+            headers)
+
+    def _prepare_subrequest(self, target, subject=None, data=None):
+        plan, target_subject = self._find_plan(target)
+        if not subject and target_subject:
+            subject = target_subject
+
+        subrequest = {'method': plan.method, 'path': plan.render_path(subject)}
+        if data is not None:
+            subrequest['data'] = plan.schema.process(data, OUTBOUND, True)
+        return plan, subrequest
 
     def _provide_binding(self):
         return self.specification
@@ -5,7 +5,12 @@ from mesh.address import *
 from mesh.constants import *
 from mesh.exceptions import *
 from mesh.transport.base import *
-from mesh.util import LogHelper, string
+from mesh.util import LogHelper, freeze, string, unwrap
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
 
 __all__ = ('InternalClient', 'InternalServer')
 
@@ -14,8 +19,10 @@ log = LogHelper(__name__)
 class InternalServer(Server):
     """An process-internal mesh server."""
 
-    def __init__(self, bundles, default_format=None, available_formats=None, mediators=None):
-        super(InternalServer, self).__init__(bundles, default_format, available_formats, mediators)
+    def __init__(self, bundles, default_format=None, available_formats=None, mediators=None,
+            instrumentation=None, validation_policy=None):
+        super(InternalServer, self).__init__(bundles, default_format, available_formats,
+            mediators, instrumentation, validation_policy)
 
         self.endpoints = {}
         for name, bundle in self.bundles.items():
@@ -23,15 +30,35 @@ class InternalServer(Server):
                 for endpoint_addr, endpoint in resource.enumerate_endpoints(resource_addr):
                     self.endpoints[endpoint_addr.address] = (resource, controller, endpoint)
 
-    def dispatch(self, address, context=None, data=None, mimetype=None):
+    def dispatch(self, address, context=None, data=None, mimetype=None, frozen=False):
+        """Dispatches a request to the endpoint at ``address``. If ``mimetype`` is specified,
+        ``data`` is serialized in that format, as is the data of the response. Otherwise, if
+        ``frozen``, the data of the response is returned as a read-only view, which may share
+        structures with the data returned by the controller, rather than as a copy."""
+
+        request, response, endpoint, format = self._prepare_dispatch(address, context, data,
+            mimetype, frozen)
+        if not endpoint:
+            return response
+
+        resource, controller, endpoint = endpoint
+        try:
+            endpoint.process(controller, request, response, self.mediators,
+                self.instrumentation, self.validation_policy)
+        except Exception as exception:
+            log('exception', 'uncaught exception raised during endpoint processing')
+            return response(SERVER_ERROR)
+
+        return self._complete_dispatch(request, response, endpoint, format)
+
+    def _prepare_dispatch(self, address, context, data, mimetype, frozen):
         request = Request(address, data, context, mimetype, None, bool(mimetype))
+        request.frozen = frozen and not mimetype
         response = Response()
 
         endpoint = self.endpoints.get(address.render('ebr'))
-        if endpoint:
-            resource, controller, endpoint = endpoint
-        else:
-            return response(NOT_FOUND)
+        if not endpoint:
+            return request, response(NOT_FOUND), None, None
 
         format = None
         if request.serialized:
@@ -39,25 +66,44 @@ class InternalServer(Server):
                 format = self.formats[request.mimetype]
                 request.data = format.unserialize(data)
             except Exception:
-                return response(BAD_REQUEST)
+                return request, response(BAD_REQUEST), None, None
 
-        try:
-            endpoint.process(controller, request, response, self.mediators)
-        except Exception as exception:
-            log('exception', 'uncaught exception raised during endpoint processing')
-            return response(SERVER_ERROR)
+        return request, response, endpoint, format
 
+    def _complete_dispatch(self, request, response, endpoint, format):
         if request.serialized:
             response.mimetype = format.mimetype
             if response.data:
                 response.data = format.serialize(response.data)
+        elif request.frozen:
+            response.data = freeze(response.data)
 
+        if self.instrumentation:
+            self.instrumentation.record_response(endpoint, response.status, None,
+                request.address)
         return response
 
 class InternalClient(Client):
-    """The internal mesh client."""
-
-    def __init__(self, server, bundle, context=None, format=None, formats=None):
+    """The internal mesh client.
+
+    By default, request data is processed by the endpoint into a copy, and response data is
+    copied as it is processed, so that neither the caller nor the controller can modify the
+    other's data. If ``frozen`` is ``True``, response data is instead returned as read-only
+    views, constructed by :func:`mesh.util.freeze`, of the valid data returned by the
+    controller, sparing the copy; such data can be passed as request data to other endpoints,
+    and :func:`mesh.util.thaw` returns a mutable copy. A ``format`` specified for a request
+    takes precedence over ``frozen``.
+
+    Requests can also be executed concurrently: :meth:`execute_future` processes a request
+    on ``executor``, a :class:`concurrent.futures.Executor`, and :meth:`execute_async`
+    returns a coroutine for an asyncio event loop. If ``executor`` is ``None``, a thread
+    pool of ``DefaultConcurrency`` threads is constructed when first needed.
+    """
+
+    DefaultConcurrency = 10
+
+    def __init__(self, server, bundle, context=None, format=None, formats=None, frozen=False,
+            executor=None):
         if isinstance(bundle, string):
             if bundle in server.bundles:
                 bundle = server.bundles[bundle]
@@ -65,9 +111,57 @@ class InternalClient(Client):
                 raise ValueError(bundle)
 
         super(InternalClient, self).__init__(bundle, context, format, formats)
+        self._executor = executor
+        self.frozen = frozen
         self.server = server
 
+    @property
+    def executor(self):
+        executor = self._executor
+        if executor is None:
+            if ThreadPoolExecutor is None:
+                raise RuntimeError('concurrent.futures is not available')
+            executor = self._executor = ThreadPoolExecutor(self.DefaultConcurrency)
+        return executor
+
     def execute(self, address, subject=None, data=None, format=None, context=None):
+        address, data, context, mimetype = self._prepare_request(address, subject, data,
+            format, context)
+        return self._complete_response(self._dispatch_request(address, data, context, mimetype))
+
+    def execute_async(self, address, subject=None, data=None, format=None, context=None):
+        """Executes a request as :meth:`execute` does, returning a coroutine which can be
+        awaited on an asyncio event loop; requires Python 3.5 or later. If the controller
+        implements the endpoint, ``acquire`` or a mediator's ``before_validation`` as a
+        coroutine function, the request is processed on the event loop; otherwise, it is
+        processed on ``executor`` so as not to block the event loop."""
+
+        from mesh.transport.asynchronous import execute_internally
+        return execute_internally(self, address, subject, data, format, context)
+
+    def execute_future(self, address, subject=None, data=None, format=None, context=None):
+        """Executes a request as :meth:`execute` does, but on ``executor``, returning a
+        :class:`concurrent.futures.Future` which resolves to the response or raises the
+        :exc:`RequestError` which :meth:`execute` would raise."""
+
+        return self.executor.submit(self.execute, address, subject, data, format, context)
+
+    def _check_response(self, response):
+        if response.ok:
+            return response
+        else:
+            raise RequestError.construct(response.status, response.data)
+
+    def _complete_response(self, response):
+        if response.mimetype and response.data:
+            response.data = response.unserialize()
+        return response
+
+    def _dispatch_request(self, address, data, context, mimetype):
+        return self._check_response(self.server.dispatch(address, context, data, mimetype,
+            self.frozen))
+
+    def _prepare_request(self, address, subject, data, format, context):
         context = self._construct_context(context)
 
         if not isinstance(address, Address):
@@ -84,18 +178,9 @@ class InternalClient(Client):
 
         mimetype = None
         if format and data:
-            data = format.serialize(data)
+            data = format.serialize(unwrap(data))
             mimetype = format.mimetype
+        elif data:
+            data = unwrap(data)
 
-        response = self._dispatch_request(address, data, context, mimetype)
-        if response.mimetype and response.data:
-            response.data = response.unserialize()
-
-        return response
-
-    def _dispatch_request(self, address, data, context, mimetype):
-        response = self.server.dispatch(address, context, data, mimetype)
-        if response.ok:
-            return response
-        else:
-            raise RequestError.construct(response.status, response.data)
+        return address, data, context, mimetype
@@ -0,0 +1,159 @@
+import re
+
+from mesh.address import Address
+from mesh.util import LruCache
+
+__all__ = ('Router',)
+
+FORMAT_EXPR = re.compile(r'^\w+$')
+SUBJECT_EXPR = re.compile(r'^[-.:;\w]+$')
+
+class RouteNode(object):
+    """A node in the segment trie of a :class:`Router`."""
+
+    def __init__(self):
+        self.children = {}
+        self.route = None
+        self.variable = None
+
+class Route(object):
+    """A routable path, together with the endpoints which can be invoked on it, keyed by
+    HTTP method, as ``(resource, controller, endpoint)`` tuples."""
+
+    def __init__(self, prefix, bundle, resource, subresource=None):
+        self.bundle = bundle
+        self.candidates = {}
+        self.prefix = prefix
+        self.resource = resource
+        self.subresource = subresource
+
+    def construct_address(self, subject=None, subsubject=None, format=None):
+        return Address(None, self.prefix, self.bundle, self.resource, subject,
+            self.subresource, subsubject, format)
+
+class Router(object):
+    """Resolves request paths to endpoints using a trie of path segments.
+
+    A path is resolved in a single walk over its segments, literal segments (bundle names and
+    versions and resource names) being matched exactly and subject segments being captured.
+    Resolutions are memoized for the most recently requested paths.
+
+    :param string prefix: Optional, default is ``None``; a path prefix, such as ``'/api'``,
+        which must precede every routable path.
+
+    :param int capacity: Optional, default is ``1000``; the number of resolved paths to
+        memoize. If ``0``, resolutions are not memoized.
+    """
+
+    def __init__(self, prefix=None, capacity=1000):
+        self.cache = None
+        if capacity:
+            self.cache = LruCache(capacity)
+
+        self.prefix = prefix
+        self.root = RouteNode()
+
+    def add(self, address, method, resource, controller, endpoint):
+        """Adds a route for ``endpoint``, attached at ``address``, invoked with ``method``."""
+
+        segments = []
+        bundle = address.bundle
+        for i in range(0, len(bundle), 2):
+            segments.extend([bundle[i], '%d.%d' % bundle[i + 1]])
+
+        segments.append(address.resource)
+        if address.subject:
+            segments.append(None)
+        if address.subresource:
+            segments.append(address.subresource)
+            if address.subsubject:
+                segments.append(None)
+
+        node = self.root
+        for segment in segments:
+            if segment is None:
+                if not node.variable:
+                    node.variable = RouteNode()
+                node = node.variable
+            else:
+                child = node.children.get(segment)
+                if not child:
+                    child = node.children[segment] = RouteNode()
+                node = child
+
+        if not node.route:
+            node.route = Route(self.prefix, address.bundle, address.resource,
+                address.subresource)
+
+        node.route.candidates[method] = (resource, controller, endpoint)
+        if self.cache is not None:
+            self.cache.clear()
+
+    def resolve(self, path):
+        """Resolves ``path`` to a ``(address, candidates)`` tuple, where ``address`` is the
+        :class:`Address` of the request and ``candidates`` is a ``dict`` mapping HTTP methods to
+        ``(resource, controller, endpoint)`` tuples, or returns ``None`` if ``path`` cannot
+        be routed."""
+
+        cache = self.cache
+        if cache is not None:
+            resolution = cache.get(path)
+            if resolution:
+                route, subject, subsubject, format = resolution
+                return (route.construct_address(subject, subsubject, format),
+                    route.candidates)
+
+        resolution = self._resolve_path(path)
+        if not resolution:
+            return None
+
+        if cache is not None:
+            cache.set(path, resolution)
+
+        route, subject, subsubject, format = resolution
+        return route.construct_address(subject, subsubject, format), route.candidates
+
+    def _match(self, node, segments, index, captured):
+        if index == len(segments):
+            if node.route:
+                return node.route, captured
+            return None
+
+        segment = segments[index]
+        child = node.children.get(segment)
+        if child:
+            match = self._match(child, segments, index + 1, captured)
+            if match:
+                return match
+
+        variable = node.variable
+        if variable and SUBJECT_EXPR.match(segment):
+            return self._match(variable, segments, index + 1, captured + [segment])
+
+    def _resolve_path(self, path):
+        prefix = self.prefix
+        if prefix:
+            if not path.startswith(prefix):
+                return None
+            path = path[len(prefix):]
+
+        if path[:1] != '/':
+            return None
+
+        path = path[1:]
+        if path[-1:] == '/':
+            path = path[:-1]
+
+        format = None
+        if '!' in path:
+            path, format = path.rsplit('!', 1)
+            if not FORMAT_EXPR.match(format):
+                return None
+
+        match = self._match(self.root, path.split('/'), 0, [])
+        if not match:
+            return None
+
+        route, captured = match
+        captured.extend([None, None])
+        return route, captured[0], captured[1], format
@@ -179,7 +179,8 @@ class ZmqServer(Server):
             return response(NOT_FOUND).prepare()
 
         try:
-            endpoint.process(controller, request, response, self.mediators)
+            endpoint.process(controller, request, response, self.mediators,
+                self.instrumentation, self.validation_policy)
         except Exception:
             log('exception', 'endpoint processing failed for %s', request)
             return response(SERVER_ERROR).prepare()
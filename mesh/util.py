@@ -2,8 +2,23 @@ import logging
 import os
 import re
 import sys
+from collections import OrderedDict
 from datetime import datetime
 from inspect import getargspec
+from threading import Lock, Thread
+from time import time
+
+try:
+    from collections.abc import Iterator
+    from collections.abc import Mapping as MappingBase, Sequence as SequenceBase
+except ImportError:
+    from collections import Iterator
+    from collections import Mapping as MappingBase, Sequence as SequenceBase
+
+try:
+    from inspect import isawaitable
+except ImportError:
+    isawaitable = None
 
 try:
     string = basestring
@@ -18,9 +33,169 @@ def call_with_supported_params(callable, *args, **params):
 
     return callable(*args, **params)
 
+def execute_concurrently(function, arguments, concurrency):
+    """Invokes ``function`` once for each tuple of positional arguments in ``arguments``, using
+    at most ``concurrency`` threads, and returns a list containing, in order, either the value
+    returned by each invocation or the exception it raised."""
+
+    arguments = list(arguments)
+    results = [None] * len(arguments)
+
+    def invoke(i):
+        try:
+            results[i] = function(*arguments[i])
+        except Exception as exception:
+            results[i] = exception
+
+    concurrency = min(concurrency or 1, len(arguments))
+    if concurrency <= 1:
+        for i in range(len(arguments)):
+            invoke(i)
+        return results
+
+    lock = Lock()
+    indexes = iter(range(len(arguments)))
+
+    def work():
+        while True:
+            with lock:
+                i = next(indexes, None)
+            if i is None:
+                return
+            invoke(i)
+
+    threads = [Thread(target=work) for i in range(concurrency)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return results
+
 def format_url_path(*segments):
     return '/' + '/'.join(segment.strip('/') for segment in segments)
 
+class FrozenMapping(MappingBase):
+    """A read-only view of a ``dict``, whose nested ``dict`` and ``list`` values are likewise
+    returned as read-only views. The view reflects later changes to the underlying ``dict``;
+    :meth:`thaw` returns a mutable copy."""
+
+    __slots__ = ('_value',)
+
+    def __init__(self, value):
+        self._value = value
+
+    def __contains__(self, key):
+        return key in self._value
+
+    def __getitem__(self, key):
+        return freeze(self._value[key])
+
+    def __iter__(self):
+        return iter(self._value)
+
+    def __len__(self):
+        return len(self._value)
+
+    def __repr__(self):
+        return 'FrozenMapping(%r)' % (self._value,)
+
+    def thaw(self):
+        return thaw(self._value)
+
+class FrozenSequence(SequenceBase):
+    """A read-only view of a ``list``, whose nested ``dict`` and ``list`` values are likewise
+    returned as read-only views. The view reflects later changes to the underlying ``list``;
+    :meth:`thaw` returns a mutable copy."""
+
+    __slots__ = ('_value',)
+
+    def __init__(self, value):
+        self._value = value
+
+    def __eq__(self, other):
+        if isinstance(other, FrozenSequence):
+            other = other._value
+        elif not isinstance(other, (list, tuple)):
+            return NotImplemented
+        return len(self._value) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+
+    __hash__ = None
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return FrozenSequence(self._value[index])
+        return freeze(self._value[index])
+
+    def __len__(self):
+        return len(self._value)
+
+    def __repr__(self):
+        return 'FrozenSequence(%r)' % (self._value,)
+
+    def thaw(self):
+        return thaw(self._value)
+
+def freeze(value):
+    """Returns a read-only view of ``value`` if it is a ``dict`` or ``list``, without copying
+    it, or otherwise ``value`` itself."""
+
+    if isinstance(value, dict):
+        return FrozenMapping(value)
+    elif isinstance(value, list):
+        return FrozenSequence(value)
+    else:
+        return value
+
+def thaw(value):
+    """Returns a mutable copy of ``value``, in which every ``dict`` and ``list``, and every
+    view of one constructed by :func:`freeze`, is copied."""
+
+    if isinstance(value, (FrozenMapping, FrozenSequence)):
+        value = value._value
+    if isinstance(value, dict):
+        return dict((key, thaw(item)) for key, item in value.items())
+    elif isinstance(value, list):
+        return [thaw(item) for item in value]
+    else:
+        return value
+
+def unwrap(value):
+    """Returns ``value`` with every view constructed by :func:`freeze` within it replaced by
+    the structure it views, copying only those containers which hold views. Unlike
+    :func:`thaw`, the result may share structures with ``value`` and with the views, and must
+    therefore not be mutated."""
+
+    if isinstance(value, (FrozenMapping, FrozenSequence)):
+        return value._value
+    elif isinstance(value, dict):
+        unwrapped = None
+        for key, item in value.items():
+            candidate = unwrap(item)
+            if candidate is not item:
+                if unwrapped is None:
+                    unwrapped = dict(value)
+                unwrapped[key] = candidate
+        return value if unwrapped is None else unwrapped
+    elif isinstance(value, list):
+        unwrapped = None
+        for i, item in enumerate(value):
+            candidate = unwrap(item)
+            if candidate is not item:
+                if unwrapped is None:
+                    unwrapped = list(value)
+                unwrapped[i] = candidate
+        return value if unwrapped is None else unwrapped
+    else:
+        return value
+
 def get_package_data(module, path):
     openfile = open(get_package_path(module, path))
     try:
@@ -85,6 +260,83 @@ class LogHelper(object):
         else:
             self.logger.log(self.LEVELS[level], message, *args)
 
+class LruCache(object):
+    """A thread-safe cache of bounded size which evicts the least recently used entry when
+    full, and which optionally expires entries after a time to live.
+
+    :param int capacity: Optional, default is ``1000``; the maximum number of entries.
+
+    :param ttl: Optional, default is ``None``; the default number of seconds an entry remains
+        in this cache. If ``None``, entries only leave the cache when evicted or discarded.
+    """
+
+    def __init__(self, capacity=1000, ttl=None):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.ttl = ttl
+
+    def __contains__(self, key):
+        return self.get(key, self) is not self
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def discard_matching(self, test):
+        """Discards every entry whose key satisfies ``test``."""
+
+        with self.lock:
+            for key in [key for key in self.entries if test(key)]:
+                del self.entries[key]
+
+    def get(self, key, default=None):
+        with self.lock:
+            try:
+                value, expires = self.entries.pop(key)
+            except KeyError:
+                return default
+
+            if expires is not None and expires <= time():
+                return default
+
+            self.entries[key] = (value, expires)
+            return value
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+
+        expires = None
+        if ttl is not None:
+            expires = time() + ttl
+
+        with self.lock:
+            entries = self.entries
+            entries.pop(key, None)
+            entries[key] = (value, expires)
+            while len(entries) > self.capacity:
+                entries.popitem(False)
+
+def is_awaitable(value):
+    """Indicates whether ``value`` can be awaited, such as the coroutine returned by calling an
+    ``async def`` function; always ``False`` where ``async`` is not supported."""
+
+    return isawaitable is not None and isawaitable(value)
+
+def is_iterator(value):
+    """Indicates whether ``value`` is an iterator, such as a generator, as opposed to a
+    container which can be iterated over repeatedly."""
+
+    return isinstance(value, Iterator)
+
 def minimize_string(value):
     return re.sub(r'\s+', ' ', value).strip(' ')
 
@@ -0,0 +1,68 @@
+import asyncio
+
+from scheme import Text
+
+from mesh.bundle import Bundle, mount
+from mesh.constants import *
+from mesh.endpoint import Mediator
+from mesh.resource import Controller
+from mesh.standard import Resource
+
+class Thing(Resource):
+    name = 'thing'
+    version = 1
+    endpoints = 'create get query'
+
+    class schema:
+        name = Text()
+
+class ThingController(Controller):
+    resource = Thing
+    version = (1, 0)
+
+    active = peak = 0
+
+    async def acquire(self, subject):
+        await asyncio.sleep(0)
+        if subject != '0':
+            return {'id': int(subject), 'name': 'thing %s' % subject}
+
+    async def create(self, request, response, subject, data):
+        cls = type(self)
+        cls.active += 1
+        cls.peak = max(cls.peak, cls.active)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            cls.active -= 1
+        return {'id': len(data['name'])}
+
+    async def get(self, request, response, subject, data):
+        await asyncio.sleep(0)
+        return subject
+
+    def query(self, request, response, subject, data):
+        resources = ({'id': i, 'name': 'thing %d' % i} for i in range(1, 101))
+        return {'total': 100, 'resources': resources}
+
+class ForbiddingMediator(Mediator):
+    async def before_validation(self, definition, request, response):
+        await asyncio.sleep(0)
+        if request.context.get('forbidden'):
+            response(FORBIDDEN)
+
+ThingBundle = Bundle('things',
+    mount(Thing, ThingController),
+)
+
+async def call_application(application, scope, messages):
+    messages, sent = list(messages), []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await application(scope, receive, send)
+    return sent
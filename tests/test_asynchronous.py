@@ -0,0 +1,219 @@
+try:
+    from unittest2 import TestCase, skipIf
+except ImportError:
+    from unittest import TestCase, skipIf
+
+import json
+
+try:
+    import asyncio
+    from mesh.transport.asynchronous import *
+    from tests.asynchronous_fixtures import *
+except (ImportError, SyntaxError):
+    asyncio = None
+
+from mesh.constants import *
+from mesh.transport.http import HttpServer
+
+from tests.fixtures import *
+from tests.wsgi import ThreadedWsgiServer
+
+@skipIf(asyncio is None, 'asyncio transports are not available')
+class TestAsyncHttpClient(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.httpd = ThreadedWsgiServer.serve(HttpServer([ExampleBundle]))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.httpd.stop()
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.client = AsyncHttpClient('127.0.0.1:%d' % self.httpd.server_port, ExampleBundle)
+
+    def tearDown(self):
+        self.client.connection.pool.close()
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def test_execution_with_data(self):
+        response = self.loop.run_until_complete(
+            self.client.execute('test::/examples/1.0/example', data={'id': 2}))
+
+        self.assertEqual(response.status, OK)
+        self.assertEqual(response.data, {'id': 2})
+
+    def test_execution_with_subject(self):
+        response = self.loop.run_until_complete(
+            self.client.execute('operation::/examples/1.0/example', 3))
+
+        self.assertEqual(response.status, OK)
+        self.assertEqual(response.data, {'id': 3})
+
+    def test_concurrent_execution(self):
+        requests = [self.client.execute('test::/examples/1.0/example', data={'id': i})
+            for i in range(20)]
+
+        responses = self.loop.run_until_complete(asyncio.gather(*requests))
+        self.assertEqual([response.data['id'] for response in responses], list(range(20)))
+
+    def test_concurrent_execution_of_many_requests(self):
+        requests = [('operation::/examples/1.0/example', i) for i in range(1, 11)]
+        requests.append(('test::/examples/1.0/example', None, {'id': 'invalid'}))
+
+        responses = self.loop.run_until_complete(self.client.execute_many(requests, 4))
+        self.assertEqual([response.data['id'] for response in responses[:-1]],
+            list(range(1, 11)))
+        self.assertIsInstance(responses[-1], Exception)
+
+    def test_execution_of_batches(self):
+        requests = [('operation::/examples/1.0/example', i) for i in range(1, 6)]
+        requests.append(('test::/examples/1.0/example', None, {'id': 'invalid'}))
+        requests.append(('test::/examples/1.0/example', None, {'id': 7}))
+
+        responses = self.loop.run_until_complete(self.client.execute_batch(requests))
+        self.assertEqual([response.data['id'] for response in responses[:5]],
+            list(range(1, 6)))
+        self.assertIsInstance(responses[5], Exception)
+        self.assertEqual(responses[6].data, {'id': 7})
+
+        responses = self.loop.run_until_complete(self.client.execute_batch(requests[:5],
+            parallel=True))
+        self.assertEqual([response.status for response in responses], [OK] * 5)
+
+@skipIf(asyncio is None, 'asyncio transports are not available')
+class TestAsgiServer(TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.server = AsgiServer([ThingBundle], mediators=[ForbiddingMediator()],
+            context_key='mesh.context', max_request_size=64)
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def request(self, method, path, chunks=(), headers=None, context=None):
+        scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'',
+            'client': ('127.0.0.1', 8000), 'headers': []}
+        if context is not None:
+            scope['mesh.context'] = context
+        for name, value in (headers or {}).items():
+            scope['headers'].append((name.lower().encode('latin-1'), value.encode('latin-1')))
+
+        sent = self.loop.run_until_complete(call_application(self.server, scope,
+            self.construct_messages(chunks)))
+        return self.parse_response(sent)
+
+    def construct_messages(self, chunks):
+        messages = [{'type': 'http.request', 'body': chunk, 'more_body': True}
+            for chunk in chunks]
+        messages.append({'type': 'http.request', 'body': b''})
+        return messages
+
+    def parse_response(self, sent):
+        self.assertEqual(sent[0]['type'], 'http.response.start')
+        self.assertFalse(sent[-1].get('more_body', False))
+
+        headers = dict((name.decode('latin-1'), value.decode('latin-1'))
+            for name, value in sent[0]['headers'])
+        return sent[0]['status'], headers, [message['body'] for message in sent[1:]]
+
+    def test_coroutine_controllers(self):
+        status, headers, body = self.request('POST', '/things/1.0/thing',
+            [b'{"name":', b' "four"}'], {'Content-Type': JSON})
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['content-type'], JSON)
+        self.assertEqual(json.loads(b''.join(body).decode('utf8')), {'id': 4})
+
+        status, headers, body = self.request('GET', '/things/1.0/thing/3')
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(b''.join(body).decode('utf8')),
+            {'id': 3, 'name': 'thing 3'})
+        self.assertIn('etag', headers)
+
+        status, headers, body = self.request('GET', '/things/1.0/thing/0')
+        self.assertEqual(status, 410)
+
+        status, headers, body = self.request('GET', '/things/1.0/invalid')
+        self.assertEqual(status, 404)
+
+    def test_concurrent_requests(self):
+        ThingController.peak = 0
+        scope = {'type': 'http', 'method': 'POST', 'path': '/things/1.0/thing',
+            'headers': [(b'content-type', JSON.encode('latin-1'))]}
+
+        sent = self.loop.run_until_complete(asyncio.gather(*[call_application(self.server,
+            scope, self.construct_messages([b'{"name": "abc"}'])) for i in range(20)]))
+        responses = [self.parse_response(messages) for messages in sent]
+        self.assertEqual([response[0] for response in responses], [200] * 20)
+        self.assertEqual(ThingController.peak, 20)
+
+    def test_coroutine_mediators(self):
+        status, headers, body = self.request('GET', '/things/1.0/thing/3',
+            context={'forbidden': True})
+        self.assertEqual(status, 403)
+
+    def test_streaming(self):
+        self.server.StreamChunkSize = 256
+        status, headers, body = self.request('GET', '/things/1.0/thing')
+
+        self.assertEqual(status, 200)
+        self.assertNotIn('content-length', headers)
+        self.assertTrue(len(body) > 2)
+
+        data = json.loads(b''.join(body).decode('utf8'))
+        self.assertEqual(len(data['resources']), 100)
+
+    def test_request_size_limits(self):
+        status, headers, body = self.request('POST', '/things/1.0/thing', [b'{}'],
+            {'Content-Type': JSON, 'Content-Length': '65'})
+        self.assertEqual(status, 413)
+
+        status, headers, body = self.request('POST', '/things/1.0/thing',
+            [b' ' * 40, b' ' * 40], {'Content-Type': JSON})
+        self.assertEqual(status, 413)
+
+    def test_batch_requests(self):
+        self.server.batch_concurrency = 10
+        self.server.max_request_size = None
+        ThingController.peak = 0
+
+        batch = {'requests': [{'method': 'POST', 'path': '/things/1.0/thing',
+            'data': {'name': 'x' * i}} for i in range(1, 11)], 'parallel': True}
+        batch['requests'].append({'method': 'GET', 'path': '/things/1.0/thing/0'})
+
+        status, headers, body = self.request('POST', '/_batch',
+            [json.dumps(batch).encode('utf8')], {'Content-Type': JSON})
+        self.assertEqual(status, 200)
+
+        responses = json.loads(b''.join(body).decode('utf8'))
+        self.assertEqual([response.get('data') for response in responses[:10]],
+            [{'id': i} for i in range(1, 11)])
+        self.assertEqual(responses[10]['status'], GONE)
+        self.assertEqual(ThingController.peak, 10)
+
+        batch['parallel'] = False
+        ThingController.peak = 0
+
+        status, headers, body = self.request('POST', '/_batch',
+            [json.dumps(batch).encode('utf8')], {'Content-Type': JSON})
+        self.assertEqual(status, 200)
+        self.assertEqual(ThingController.peak, 1)
+
+    def test_lifespan(self):
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = self.loop.run_until_complete(call_application(self.server,
+            {'type': 'lifespan'}, messages))
+        self.assertEqual([message['type'] for message in sent],
+            ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+
+    def test_synchronous_servers(self):
+        server = HttpServer([ThingBundle])
+        response = server.dispatch(GET, '/things/1.0/thing/3', None, {}, {}, None, None)
+        self.assertEqual(response.status, SERVER_ERROR)
+
+        response = server.dispatch(GET, '/things/1.0/thing', None, {}, {}, None, None)
+        self.assertEqual(response.status, OK)
@@ -0,0 +1,161 @@
+try:
+    from unittest2 import TestCase
+except ImportError:
+    from unittest import TestCase
+
+from mesh.caching import *
+from mesh.transport.http import HttpRequest, HttpResponse
+
+from mesh.address import Address
+from mesh.constants import *
+
+class MockResource(object):
+    name = 'item'
+
+class MockEndpoint(object):
+    name = 'get'
+    resource = MockResource
+
+class MockFormat(object):
+    name = 'json'
+
+class MockController(object):
+    pass
+
+class OtherController(object):
+    pass
+
+def construct_key(cache, subject=None, data=None, context=None):
+    address = Address(bundle=('items', (1, 0)), resource='item', subject=subject)
+    request = HttpRequest(address, GET, data, context)
+    return cache.construct_key(MockController, MockEndpoint, request, MockFormat)
+
+class TestResponseCache(TestCase):
+    def test_keys(self):
+        cache = ResponseCache()
+        self.assertEqual(construct_key(cache, '1', {'a': [1, {'b': 2}], 'c': 3}),
+            construct_key(cache, 1, {'c': 3, 'a': [1, {'b': 2}]}))
+        self.assertNotEqual(construct_key(cache, '1'), construct_key(cache, '2'))
+        self.assertNotEqual(construct_key(cache, context={'user': 1}),
+            construct_key(cache, context={'user': 2}))
+
+    def test_caching(self):
+        cache = ResponseCache(ttl=60)
+        key = construct_key(cache, '1')
+
+        entry = cache.set(key, HttpResponse(OK, u'{"id": 1}', mimetype=JSON,
+            headers={'ETag': '"a"'}))
+        self.assertIs(cache.get(key), entry)
+        self.assertEqual(entry.data, b'{"id": 1}')
+        self.assertEqual(entry.headers, {'ETag': '"a"'})
+        self.assertFalse(entry.stale)
+
+        cache = ResponseCache(ttl=0, stale_ttl=60)
+        entry = cache.set(key, HttpResponse(OK, b'{"id": 1}'))
+        self.assertIs(cache.get(key), entry)
+        self.assertTrue(entry.stale)
+
+        self.assertTrue(cache.begin_revalidation(key))
+        self.assertFalse(cache.begin_revalidation(key))
+        cache.end_revalidation(key)
+        self.assertTrue(cache.begin_revalidation(key))
+
+    def test_invalidation(self):
+        cache = ResponseCache()
+        keys = [construct_key(cache, subject) for subject in ('1', '2', None)]
+        for key in keys:
+            cache.set(key, HttpResponse(OK, b'{}'))
+
+        generation = cache.generation
+        cache.invalidate([MockController], 1)
+        self.assertEqual([cache.get(key) is not None for key in keys], [False, True, False])
+
+        cache.set(keys[0], HttpResponse(OK, b'{}'), generation)
+        self.assertIs(cache.get(keys[0]), None)
+
+        cache.invalidate([OtherController])
+        self.assertIsNot(cache.get(keys[1]), None)
+
+        ResponseCache.invalidate_all([MockController])
+        self.assertIs(cache.get(keys[1]), None)
+
+class TestAcquisitionCache(TestCase):
+    def test_caching(self):
+        cache = AcquisitionCache(negative_ttl=10)
+        self.assertIs(cache.get(1, False), False)
+
+        cache.set(1, {'id': 1})
+        cache.set('2', None)
+        self.assertEqual(cache.get('1'), {'id': 1})
+        self.assertIs(cache.get(2, False), None)
+
+        generation = cache.generation
+        cache.invalidate('1')
+        cache.set(1, {'id': 1}, generation)
+        self.assertIs(cache.get(1, False), False)
+
+        cache.invalidate_missing()
+        self.assertIs(cache.get(2, False), False)
+
+        cache = AcquisitionCache()
+        cache.set(2, None)
+        self.assertIs(cache.get(2, False), False)
+
+    def test_controller_acquisitions(self):
+        from mesh.resource import Controller
+        from mesh.standard import Resource
+        from mesh.transport.base import Request, Response
+        from scheme import Text
+
+        class Item(Resource):
+            name = 'item'
+            version = 1
+            endpoints = 'create delete get'
+
+            class schema:
+                name = Text()
+
+        class ItemController(Controller):
+            resource = Item
+            version = (1, 0)
+            acquisition_ttl = 60
+            negative_acquisition_ttl = 10
+
+            acquired = []
+            items = {'1': {'id': 1, 'name': 'one'}}
+
+            def acquire(self, subject):
+                self.acquired.append(subject)
+                return self.items.get(subject)
+
+            def create(self, request, response, subject, data):
+                self.items['2'] = dict(data, id=2)
+                response({'id': 2})
+
+            def delete(self, request, response, subject, data):
+                del self.items[str(subject['id'])]
+                response({'id': subject['id']})
+
+            def get(self, request, response, subject, data):
+                response(subject)
+
+        def process(name, subject=None, data=None):
+            address = Address(bundle=('items', (1, 0)), resource='item', subject=subject)
+            response = Response()
+            Item.endpoints[name].process(ItemController, Request(address, data), response)
+            return response.status
+
+        for i in range(3):
+            self.assertEqual(process('get', '1'), OK)
+            self.assertEqual(process('get', '2'), GONE)
+        self.assertEqual(ItemController.acquired, ['1', '2'])
+
+        self.assertEqual(process('create', data={'name': 'two'}), OK)
+        self.assertEqual(process('get', '2'), OK)
+        self.assertEqual(process('delete', '1'), OK)
+        self.assertEqual(process('get', '1'), GONE)
+        self.assertEqual(ItemController.acquired, ['1', '2', '2', '1'])
+
+        ItemController.items['1'] = {'id': 1}
+        ItemController.invalidate('1')
+        self.assertEqual(process('get', '1'), OK)
@@ -0,0 +1,101 @@
+try:
+    from unittest2 import TestCase
+except ImportError:
+    from unittest import TestCase
+
+from copy import deepcopy
+from datetime import datetime
+
+from scheme import *
+from scheme.exceptions import *
+from scheme.timezone import UTC
+
+from mesh.compilation import compile_processor
+
+Example = Structure({
+    'id': Integer(nonnull=True, minimum=1),
+    'name': Text(required=True, max_length=10),
+    'ratio': Float(),
+    'active': Boolean(default=True),
+    'created': DateTime(),
+    'tags': Sequence(Text(), unique=True),
+    'nested': Structure({'value': Integer(), 'note': Text(ignore_null=True)}),
+})
+
+class TestCompiledProcessors(TestCase):
+    def assert_equivalent(self, schema, value, phase=INBOUND, serialized=False, reuse=False):
+        processor = compile_processor(schema, phase, serialized, reuse)
+        try:
+            expected = schema.process(value, phase, serialized)
+        except StructuralError as exception:
+            with self.assertRaises(type(exception)) as context:
+                processor(value)
+            self.assertEqual(context.exception.serialize(), exception.serialize())
+        else:
+            processed = processor(value)
+            self.assertEqual(processed, expected)
+            self.assertEqual(type(processed), type(expected))
+
+    def test_valid_values(self):
+        for value in ({'name': ' one '}, {'id': 2, 'name': 'two', 'ratio': 0.5, 'tags': ['a']},
+                {'name': 'three', 'active': False, 'nested': {'value': 3, 'note': None}},
+                {'name': 'four', 'created': '2020-01-01T00:00:00Z', 'ratio': None}):
+            for phase, serialized in ((INBOUND, True), (INBOUND, False), (OUTBOUND, False)):
+                self.assert_equivalent(Example, value, phase, serialized)
+                self.assert_equivalent(Example, value, phase, serialized, True)
+
+    def test_coerced_values(self):
+        self.assert_equivalent(Example, {'id': '4', 'name': 'four', 'ratio': 1}, INBOUND, True)
+        self.assert_equivalent(Example, {'id': 4.0, 'name': 'four'}, INBOUND, True)
+
+    def test_invalid_values(self):
+        for value in (None, [], {}, {'name': 1}, {'name': 'x' * 11}, {'name': 'a', 'id': None},
+                {'name': 'a', 'id': 0}, {'name': 'a', 'unknown': 1},
+                {'name': 'a', 'tags': ['a', 'a']}, {'name': 'a', 'nested': {'value': 'a'}},
+                {'name': 'a', 'active': 1}, {'name': 'a', 'id': True}):
+            self.assert_equivalent(Example, value, INBOUND, True)
+
+    def test_uncompiled_fields(self):
+        polymorphic = Structure({'a': {'value': Integer()}, 'b': {'value': Text()}},
+            polymorphic_on='type')
+        self.assert_equivalent(polymorphic, {'type': 'a', 'value': 1})
+        self.assert_equivalent(polymorphic, {'type': 'b', 'value': 1})
+
+        preprocessed = Structure({'value': Text(preprocessor=lambda value: value.upper())})
+        self.assert_equivalent(preprocessed, {'value': 'abc'})
+
+        self.assert_equivalent(Sequence(Union((Integer(), Text()))), [1, 'a'])
+
+    def test_reused_values(self):
+        processor = compile_processor(Example, OUTBOUND, True, True)
+        value = {'id': 1, 'name': 'one', 'tags': ['a', 'b'], 'nested': {'value': 1}}
+        self.assertIs(processor(value), value)
+
+        for changed in ({'name': ' one ', 'tags': ['a']}, {'name': 'one', 'tags': ['a', ' b']},
+                {'name': 'one', 'nested': {'value': 1, 'note': None}},
+                {'name': 'one', 'created': datetime(2000, 1, 1, tzinfo=UTC)}):
+            original = deepcopy(changed)
+            processed = processor(changed)
+            self.assertIsNot(processed, changed)
+            self.assertEqual(changed, original)
+            self.assertEqual(processed, Example.process(changed, OUTBOUND, True))
+
+        processor = compile_processor(Example, INBOUND, True, True)
+        value = {'name': 'one', 'tags': ['a']}
+        self.assertEqual(processor(value), {'name': 'one', 'tags': ['a'], 'active': True})
+        self.assertEqual(value, {'name': 'one', 'tags': ['a']})
+
+    def test_reused_defaults(self):
+        schema = Structure({'tags': Sequence(Text(), default=['x']),
+            'nested': Structure({'value': Integer()}, default={'value': 1})})
+
+        for serialized in (True, False):
+            processor = compile_processor(schema, INBOUND, serialized, True)
+            for i in range(2):
+                processed = processor({})
+                self.assertEqual(processed, {'tags': ['x'], 'nested': {'value': 1}})
+                processed['tags'].append('mutated')
+                processed['nested']['value'] = 2
+
+            self.assertEqual(schema.structure['tags'].default, ['x'])
+            self.assertEqual(schema.structure['nested'].default, {'value': 1})
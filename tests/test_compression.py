@@ -0,0 +1,50 @@
+import zlib
+
+try:
+    from unittest2 import TestCase
+except ImportError:
+    from unittest import TestCase
+
+from mesh.transport.compression import *
+
+class TestCompression(TestCase):
+    def test_negotiation(self):
+        compression = Compression()
+        self.assertEqual(compression.negotiate(None), None)
+        self.assertEqual(compression.negotiate('gzip, deflate'), 'gzip')
+        self.assertEqual(compression.negotiate('deflate'), 'deflate')
+        self.assertEqual(compression.negotiate('gzip;q=0.5, deflate'), 'deflate')
+        self.assertEqual(compression.negotiate('gzip;q=0, br'), None)
+        self.assertEqual(compression.negotiate('*'), 'gzip')
+        self.assertEqual(compression.negotiate('identity'), None)
+
+    def test_compression(self):
+        compression = Compression(level=9)
+        data = b'{"id": 1}' * 200
+
+        for encoding in ('gzip', 'deflate'):
+            compressed = compression.compress(data, encoding)
+            self.assertTrue(len(compressed) < len(data))
+            self.assertEqual(Compression.decompress(compressed, encoding), data)
+
+        raw = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+        compressed = raw.compress(data) + raw.flush()
+        self.assertEqual(Compression.decompress(compressed, 'deflate'), data)
+
+        self.assertEqual(Compression.decompress(data, 'identity'), data)
+        self.assertRaises(UnsupportedEncoding, Compression.decompress, data, 'br')
+
+    def test_chunked_compression(self):
+        compression = Compression()
+        chunks = [b'[', b'{"id": 1}', b', ', u'{"id": 2}', b']']
+
+        compressed = compression.compress(chunks, 'gzip')
+        self.assertFalse(isinstance(compressed, list))
+        self.assertEqual(Compression.decompress(b''.join(compressed), 'gzip'),
+            b'[{"id": 1}, {"id": 2}]')
+
+    def test_threshold(self):
+        compression = Compression(threshold=10)
+        self.assertFalse(compression.should_compress(b'123456789'))
+        self.assertTrue(compression.should_compress(b'1234567890'))
+        self.assertTrue(compression.should_compress([b'12345', b'67890']))
@@ -3,6 +3,8 @@ try:
 except ImportError:
     from unittest import TestCase
 
+from datetime import datetime
+
 from mesh.address import *
 from mesh.constants import *
 from mesh.endpoint import *
@@ -10,6 +12,7 @@ from mesh.exceptions import *
 from mesh.transport.base import *
 from scheme import *
 from scheme.common import Errors
+from scheme.timezone import UTC
 
 class TestEndpointResponse(TestCase):
     def test_construction(self):
@@ -320,6 +323,43 @@ class TestEndpoint(TestCase):
 
         self.assertEqual(response.status, SERVER_ERROR)
 
+    def test_validation_policies(self):
+        endpoint = self._construct_example_endpoint(ok={'id': Integer(required=True)})
+        policy = ValidationPolicy(ValidationPolicy.TRUSTED)
+
+        controller = self._construct_controller_harness(data={})
+        request, response = self._construct_request_response()
+        endpoint.process(controller, request, response, validation_policy=policy)
+        self.assertEqual(response.status, OK)
+        self.assertEqual(response.data, {})
+
+        policy.configure(ValidationPolicy.SAMPLED, 1.0)
+        request, response = self._construct_request_response()
+        endpoint.process(controller, request, response, validation_policy=policy)
+        self.assertEqual(response.status, SERVER_ERROR)
+
+        policy.configure(rate=0.0)
+        request, response = self._construct_request_response()
+        endpoint.process(controller, request, response, validation_policy=policy)
+        self.assertEqual(response.status, OK)
+
+        endpoint.validation_policy = ValidationPolicy()
+        request, response = self._construct_request_response()
+        endpoint.process(controller, request, response, validation_policy=policy)
+        self.assertEqual(response.status, SERVER_ERROR)
+
+        endpoint = self._construct_example_endpoint(ok={'created': DateTime(required=True)})
+        controller = self._construct_controller_harness(
+            data={'created': datetime(2000, 1, 1, tzinfo=UTC)})
+        request, response = self._construct_request_response()
+        request.serialized = True
+        endpoint.process(controller, request, response,
+            validation_policy=ValidationPolicy(ValidationPolicy.TRUSTED))
+        self.assertEqual(response.data, {'created': '2000-01-01T00:00:00Z'})
+
+        self.assertRaises(ValueError, ValidationPolicy, 'never')
+        self.assertRaises(ValueError, ValidationPolicy, ValidationPolicy.SAMPLED, 2)
+
     def test_general_validators(self):
         class Resource(object):
             @validator()
@@ -360,6 +400,47 @@ class TestEndpoint(TestCase):
         self.assertEqual(response.status, INVALID)
         self.assertEqual(response.data, (None, {'id': [{'token': 'incorrect'}]}))
 
+    def test_batch_validators(self):
+        class Resource(object):
+            @validator('id', batch=True)
+            def validate_ids(cls, items):
+                errors = [None] * len(items)
+                for i, item in enumerate(items):
+                    if item['id'] % 2:
+                        errors[i] = ValidationError({'token': 'odd'})
+                if any(errors):
+                    raise ValidationError(structure=errors)
+
+            @validator()
+            def validate(cls, data):
+                if data['id'] > 3:
+                    raise ValidationError({'token': 'large'})
+
+        validators = [Resource.validate_ids, Resource.validate]
+        endpoint = self._construct_example_endpoint(Resource, validators=validators)
+        controller = self._construct_controller_harness()
+        request, response = self._construct_request_response(data={'id': 1})
+        endpoint.process(controller, request, response)
+
+        self.assertEqual(response.status, INVALID)
+        self.assertEqual(response.data, (None, {'id': [{'token': 'odd'}]}))
+
+        endpoint = Endpoint(name='import', batch=True, validators=validators)
+        self.assertIsNone(endpoint.validate([{'id': 2}]))
+
+        items = [{'id': i} for i in range(6)]
+        for concurrency in (None, 4):
+            endpoint.validation_concurrency = concurrency
+            endpoint.validation_threshold = 4
+            with self.assertRaises(ValidationError) as context:
+                endpoint.validate(items)
+
+            errors = context.exception.structure
+            self.assertEqual([error and error.serialize() for error in errors], [None,
+                (None, {'id': [{'token': 'odd'}]}), None, (None, {'id': [{'token': 'odd'}]}),
+                ([{'token': 'large'}], None),
+                ([{'token': 'large'}], {'id': [{'token': 'odd'}]})])
+
     def test_mediation_before_validation(self):
         class TestMediator(Mediator):
             def before_validation(self, definition, request, response):
@@ -3,9 +3,88 @@ try:
 except ImportError:
     from unittest import TestCase
 
+import errno
+import json
+import os
+import socket
+import time
+from io import BytesIO
+
+try:
+    from httplib import BadStatusLine
+except ImportError:
+    from http.client import BadStatusLine
+
+try:
+    from http.client import RemoteDisconnected
+except ImportError:
+    RemoteDisconnected = None
+
+from scheme import Json, Text
+from scheme.exceptions import StructuralError
+
 from mesh.transport.http import *
+from mesh.transport.http import Connection
+
+from mesh.address import Address
+from mesh.bundle import Bundle, mount
+from mesh.caching import ResponseCache
+from mesh.constants import *
+from mesh.exceptions import (ConnectionFailed, ConnectionReset, PayloadTooLargeError,
+    ServerError)
+from mesh.resource import Controller
+from mesh.transport.internal import InternalServer
+from mesh.standard import Resource as StandardResource
 
 from tests.fixtures import *
+from tests.wsgi import ThreadedWsgiServer
+
+class MockConnection(object):
+    def __init__(self, host, timeout=None):
+        self.closed = False
+        self.host = host
+        self.sock, self.peer = socket.socketpair()
+        self.timeout = timeout
+
+    def close(self):
+        self.closed = True
+        if self.sock:
+            self.sock.close()
+            self.peer.close()
+            self.sock = None
+
+class MockResponse(object):
+    status = 200
+    will_close = False
+
+    def getheaders(self):
+        return [('content-type', 'text/plain')]
+
+    def read(self):
+        return b'ok'
+
+class ScriptedConnection(MockConnection):
+    failures = []
+    methods = []
+
+    def request(self, method, url, body, headers):
+        self.methods.append(method)
+        self.failure = self.failures.pop(0) if self.failures else None
+        if self.failure == 'send':
+            raise socket.error(errno.EPIPE, 'broken pipe')
+
+    def getresponse(self):
+        if self.failure == 'closed':
+            if RemoteDisconnected is not None:
+                raise RemoteDisconnected('closed')
+            raise BadStatusLine("''")
+        elif self.failure == 'reset':
+            raise socket.error(errno.ECONNRESET, 'connection reset by peer')
+        elif self.failure == 'garbled':
+            raise BadStatusLine('garbled')
+        elif self.failure == 'timeout':
+            raise socket.timeout()
+        return MockResponse()
 
 class WsgiHarness(object):
     def request(self, server, method, path, data=None, mimetype=None,
@@ -15,6 +94,7 @@ class WsgiHarness(object):
             'REQUEST_METHOD': method,
             'SCRIPT_NAME': '',
             'PATH_INFO': path,
+            'QUERY_STRING': '',
             'SERVER_NAME': 'mock-wsgi',
             'SERVER_PORT': '0',
             'SERVER_PROTOCOL': 'HTTP/1.1',
@@ -24,7 +104,675 @@ class WsgiHarness(object):
             'wsgi.multiprocess': False,
         }
 
+        if identity:
+            environ['REMOTE_ADDR'] = identity
+        if headers:
+            environ.update(headers)
+
+        if method == GET:
+            environ['QUERY_STRING'] = data or ''
+        elif data is not None:
+            if not isinstance(data, bytes):
+                data = data.encode('utf8')
+            environ.setdefault('CONTENT_LENGTH', str(len(data)))
+            environ.setdefault('wsgi.input', BytesIO(data))
+
+        if mimetype:
+            environ['CONTENT_TYPE'] = mimetype
+
+        response = {}
+        def start_response(status, headers):
+            response.update(status=status, headers=dict(headers))
+
+        body = b''.join(server(environ, start_response))
+        return response['status'], response['headers'], body
+
+class Item(StandardResource):
+    name = 'item'
+    version = 1
+    endpoints = 'create get query'
+
+    class schema:
+        name = Text()
+
+class ItemController(Controller):
+    resource = Item
+    version = (1, 0)
+
+    calls = 0
+    names = {}
+
+    def acquire(self, subject):
+        return {'id': int(subject), 'name': self.names.get(subject, 'item %s' % subject)}
+
+    def get(self, request, response, subject, data):
+        ItemController.calls += 1
+        if subject['id'] == 2:
+            response.version = 'v2'
+        return subject
+
+    def query(self, request, response, subject, data):
+        resources = ({'id': i, 'name': 'item %d' % i} for i in range(1, 501))
+        if request.context and request.context.get('invalid'):
+            resources = iter([{'id': 1}, {'id': 'invalid'}])
+        return {'total': 500, 'resources': resources}
+
+    def create(self, request, response, subject, data):
+        self.names['5'] = data['name']
+        return {'id': 5}
+
+ItemBundle = Bundle('items',
+    mount(Item, ItemController),
+)
+
+class OtherItem(StandardResource):
+    name = 'item'
+    version = 1
+    endpoints = 'create get'
+
+    class schema:
+        name = Text()
+
+class OtherItemController(Controller):
+    resource = OtherItem
+    version = (1, 0)
+
+    def acquire(self, subject):
+        return {'id': int(subject), 'name': 'other %s' % subject}
+
+    def get(self, request, response, subject, data):
+        return subject
+
+    def create(self, request, response, subject, data):
+        return {'id': 5}
+
+OtherItemBundle = Bundle('others',
+    mount(OtherItem, OtherItemController),
+)
+
+class TestConnectionPool(TestCase):
+    def test_connection_reuse(self):
+        pool = ConnectionPool(MockConnection, 'localhost')
+        connection, reused = pool.acquire()
+        self.assertFalse(reused)
+
+        pool.release(connection)
+        candidate, reused = pool.acquire(5)
+        self.assertIs(candidate, connection)
+        self.assertTrue(reused)
+        self.assertEqual(candidate.timeout, 5)
+
+        second, reused = pool.acquire()
+        self.assertIsNot(second, connection)
+        self.assertFalse(reused)
+
+    def test_maximum_size(self):
+        pool = ConnectionPool(MockConnection, 'localhost', maxsize=1)
+        first, second = pool.acquire()[0], pool.acquire()[0]
+
+        pool.release(first)
+        pool.release(second)
+        self.assertEqual(pool.idle, [(first, pool.idle[0][1])])
+        self.assertFalse(first.closed)
+        self.assertTrue(second.closed)
+
+    def test_idle_eviction(self):
+        pool = ConnectionPool(MockConnection, 'localhost', idle_timeout=10)
+        connection = pool.acquire()[0]
+
+        pool.release(connection)
+        pool.idle[0] = (connection, pool.idle[0][1] - 20)
+
+        candidate, reused = pool.acquire()
+        self.assertIsNot(candidate, connection)
+        self.assertFalse(reused)
+        self.assertTrue(connection.closed)
+
+    def test_dropped_connection(self):
+        pool = ConnectionPool(MockConnection, 'localhost')
+        connection = pool.acquire()[0]
+
+        pool.release(connection)
+        connection.peer.close()
+
+        candidate, reused = pool.acquire()
+        self.assertIsNot(candidate, connection)
+        self.assertTrue(connection.closed)
+
+        candidate.close()
+        pool.release(candidate)
+        self.assertEqual(pool.idle, [])
+
+    def test_idle_connection_with_high_descriptor(self):
+        try:
+            import resource
+        except ImportError:
+            resource = None
+        if not resource or resource.getrlimit(resource.RLIMIT_NOFILE)[0] <= 1100:
+            self.skipTest('descriptors beyond FD_SETSIZE are unavailable')
+
+        pool = ConnectionPool(MockConnection, 'localhost')
+        connection = pool.acquire()[0]
+
+        os.dup2(connection.sock.fileno(), 1100)
+        try:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM, fileno=1100)
+        except TypeError:
+            os.close(1100)
+            connection.close()
+            self.skipTest('sockets cannot be constructed from descriptors')
+
+        connection.sock.close()
+        connection.sock = sock
+
+        pool.release(connection)
+        self.assertEqual(pool.acquire(), (connection, True))
+
+        connection.close()
+        pool.release(connection)
+        self.assertEqual(pool.idle, [])
+
+    def test_shared_pools(self):
+        pool = ConnectionPool.get_pool('http', 'shared.test', MockConnection)
+        self.assertIs(ConnectionPool.get_pool('http', 'shared.test', MockConnection), pool)
+        self.assertIsNot(ConnectionPool.get_pool('https', 'shared.test', MockConnection), pool)
+
+        first = HttpClient('http://shared.test/api')
+        second = HttpClient('shared.test')
+        self.assertIs(first.connection.pool, pool)
+        self.assertIs(second.connection.pool, pool)
+
+        private = ConnectionPool(MockConnection, 'shared.test')
+        client = HttpClient('shared.test', pool=private)
+        self.assertIs(client.connection.pool, private)
+
+    def test_stale_connection_retry(self):
+        pool = ConnectionPool(ScriptedConnection, 'localhost')
+        connection = Connection('http://localhost', pool=pool)
+
+        for failure, retried in (('send', True), ('closed', True), ('reset', True),
+                ('garbled', False), ('timeout', False)):
+            pool.release(pool.acquire()[0])
+            ScriptedConnection.failures[:] = [failure]
+            del ScriptedConnection.methods[:]
+
+            if retried:
+                response = connection.request('POST', '/', '{}', mimetype=JSON)
+                self.assertEqual(response.data, b'ok')
+                self.assertEqual(ScriptedConnection.methods, ['POST', 'POST'])
+            else:
+                with self.assertRaises(ConnectionFailed):
+                    connection.request('POST', '/', '{}', mimetype=JSON)
+                self.assertEqual(ScriptedConnection.methods, ['POST'])
+            pool.close()
+
+        ScriptedConnection.failures[:] = ['closed']
+        del ScriptedConnection.methods[:]
+        with self.assertRaises(ConnectionReset):
+            connection.request('POST', '/', '{}', mimetype=JSON)
+        self.assertEqual(ScriptedConnection.methods, ['POST'])
+        pool.close()
+
+class TestHttpClient(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.httpd = ThreadedWsgiServer.serve(HttpServer([ExampleBundle]))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.httpd.stop()
+
+    def setUp(self):
+        self.client = HttpClient('127.0.0.1:%d' % self.httpd.server_port, ExampleBundle)
+
+    def test_execution(self):
+        response = self.client.execute('test::/examples/1.0/example', data={'id': 2})
+        self.assertEqual(response.status, OK)
+        self.assertEqual(response.data, {'id': 2})
+
+        response = self.client.execute('operation::/examples/1.0/example', 3)
+        self.assertEqual(response.status, OK)
+        self.assertEqual(response.data, {'id': 3})
+
+    def test_response_processing(self):
+        response = self.client.execute('operation::/examples/1.0/example', 3)
+        self.assertEqual(response.data, {'id': 3})
+        self.assertEqual(len(self.client.processors), 1)
+
+        client = HttpClient('127.0.0.1:%d' % self.httpd.server_port, ExampleBundle, raw=True)
+        response = client.execute('operation::/examples/1.0/example', 3)
+        self.assertEqual(response.data, {'id': 3})
+        self.assertEqual(client.processors, {})
+
+    def test_request_plans(self):
+        prepared = self.client.prepare('operation::/examples/1.0/example', 3, context={'a': '1'})
+        self.assertEqual(prepared['url'], self.client.url + '/examples/1.0/example/3')
+        self.assertEqual(prepared['headers'], {'a': '1'})
+
+        for subject in (4, 5):
+            target = 'operation::/examples/1.0/example/%d' % subject
+            prepared = self.client.prepare(target)
+            self.assertEqual(prepared['url'], self.client.url + '/examples/1.0/example/%d' % subject)
+
+        prepared = self.client.prepare('test::/examples/1.0/example', data={'id': 1})
+        self.assertEqual(prepared['url'], self.client.url + '/examples/1.0/example')
+        self.assertEqual(prepared['data'], '{"id": 1}')
+
+        self.assertEqual(set(self.client.plans.keys()),
+            set(['operation::/examples/1.0/example', 'test::/examples/1.0/example']))
+
+        plan = self.client.plans['operation::/examples/1.0/example']
+        self.assertIs(self.client._find_plan(Address.parse('operation::/examples/1.0/example'))[0],
+            plan)
+
+        endpoint = self.client.specification.find(Address.parse('operation::/examples/1.0/example'))
+        for i in range(3):
+            self.assertIs(self.client._find_plan(dict(endpoint))[0], plan)
+        self.assertEqual(len(self.client.plans), 2)
+
+    def test_compression(self):
+        httpd = ThreadedWsgiServer.serve(HttpServer([ExampleBundle],
+            compression=Compression(threshold=0)))
+        try:
+            client = HttpClient('127.0.0.1:%d' % httpd.server_port, ExampleBundle,
+                compression=Compression(threshold=0, request_encoding='gzip'))
+
+            response = client.execute('test::/examples/1.0/example', data={'id': 2})
+            self.assertEqual(response.status, OK)
+            self.assertEqual(response.data, {'id': 2})
+            self.assertNotIn('Content-Encoding', response.headers)
+        finally:
+            httpd.stop()
+
+    def test_execution_of_many_requests(self):
+        requests = [('operation::/examples/1.0/example', i) for i in range(1, 21)]
+        requests.insert(5, ('test::/examples/1.0/example', None, {'id': 'invalid'}))
+
+        responses = self.client.execute_many(requests, 4)
+        self.assertEqual(len(responses), 21)
+        self.assertIsInstance(responses[5], Exception)
+
+        del responses[5]
+        self.assertEqual([response.data['id'] for response in responses], list(range(1, 21)))
+
+    def test_execution_of_batches(self):
+        requests = [('operation::/examples/1.0/example', i) for i in range(1, 11)]
+        requests.insert(5, ('test::/examples/1.0/example', None, {'id': 'invalid'}))
+        requests.append(('test::/examples/1.0/example', None, {'id': 12}))
+        requests.append(('operation::/examples/1.0/example', 'invalid'))
+
+        responses = self.client.execute_batch(requests)
+        self.assertEqual(len(responses), 13)
+        self.assertIsInstance(responses[5], Exception)
+        self.assertEqual(responses[11].data, {'id': 12})
+        self.assertIsInstance(responses[12], ServerError)
 
+        del responses[5]
+        self.assertEqual([response.data['id'] for response in responses[:10]],
+            list(range(1, 11)))
+
+        responses = self.client.execute_batch(requests[:5], parallel=True)
+        self.assertEqual([response.status for response in responses], [OK] * 5)
+
+class MockResponseConnection(object):
+    def __init__(self, *responses):
+        self.requests = []
+        self.responses = list(responses)
+
+    def request(self, method, url=None, body=None, headers=None):
+        self.requests.append((method, url, body, dict(headers)))
+        status, headers = self.responses.pop(0)
+        return HttpResponse(status, b'{"id": 1}' if status == OK else None,
+            mimetype='application/json', headers=headers)
+
+class TestHttpClientCache(TestCase):
+    def construct_client(self, *responses):
+        from tests.standard_fixtures import ExampleBundle as StandardBundle
+
+        client = HttpClient('cache.test', StandardBundle, cache=HttpClientCache())
+        client.connection = MockResponseConnection(*responses)
+        return client
+
+    def test_fresh_responses(self):
+        client = self.construct_client((OK, {'Cache-Control': 'max-age=30'}))
+        for i in range(3):
+            response = client.execute('get::/examples/1.0/example', 1)
+            self.assertEqual(response.status, OK)
+            self.assertEqual(response.data['id'], 1)
+
+        self.assertEqual(len(client.connection.requests), 1)
+
+    def test_uncacheable_responses(self):
+        client = self.construct_client((OK, {'Cache-Control': 'no-store'}),
+            (OK, {'Cache-Control': 'no-cache'}), (OK, {}))
+
+        for i in range(3):
+            client.execute('get::/examples/1.0/example', 1)
+        self.assertEqual(len(client.connection.requests), 3)
+
+    def test_revalidation(self):
+        client = self.construct_client(
+            (OK, {'Cache-Control': 'must-revalidate, no-cache', 'Etag': '"v1"'}),
+            (NOT_MODIFIED, {}))
+
+        first = client.execute('get::/examples/1.0/example', 1)
+        second = client.execute('get::/examples/1.0/example', 1)
+
+        self.assertEqual(second.status, OK)
+        self.assertIs(second.data, first.data)
+
+        requests = client.connection.requests
+        self.assertEqual(len(requests), 2)
+        self.assertNotIn('If-None-Match', requests[0][3])
+        self.assertEqual(requests[1][3]['If-None-Match'], '"v1"')
+
+    def test_canonical_keys(self):
+        cache = HttpClientCache()
+        self.assertEqual(cache.lookup(GET, '/path', 'b=2&a=1', {})[0],
+            cache.lookup(GET, '/path', 'a=1&b=2', {})[0])
+
+    def test_contextual_responses(self):
+        client = self.construct_client(*[(OK, {'Cache-Control': 'max-age=30'})] * 3)
+        for user in ('a', 'b', 'a', 'b'):
+            client.execute('get::/examples/1.0/example', 1, context={'user': user})
+        client.execute('get::/examples/1.0/example', 1)
+
+        requests = client.connection.requests
+        self.assertEqual(len(requests), 3)
+        self.assertEqual(requests[0][3]['user'], 'a')
+        self.assertEqual(requests[1][3]['user'], 'b')
+        self.assertNotIn('user', requests[2][3])
 
 class TestHttpServer(TestCase, WsgiHarness):
-    pass
+    def test_dispatch(self):
+        server = HttpServer([ExampleBundle])
+        status, headers, body = self.request(server, POST, '/examples/1.0/example',
+            '{"id": 2}', JSON)
+
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(headers['Content-Type'], JSON)
+        self.assertEqual(body, b'{"id": 2}')
+
+        status, headers, body = self.request(server, POST, '/examples/1.0/invalid')
+        self.assertEqual(status, '404 Not Found')
+        self.assertEqual(headers['Content-Length'], '0')
+
+        response = server.dispatch(POST, '/examples/1.0/example', JSON, {}, {}, '{"id": 2}',
+            None)
+        self.assertEqual(response.data, b'{"id": 2}')
+
+    def test_generated_etags(self):
+        server = HttpServer([ItemBundle])
+        status, headers, body = self.request(server, GET, '/items/1.0/item/1')
+
+        self.assertEqual(status, '200 OK')
+        etag = headers['ETag']
+
+        status, headers, body = self.request(server, GET, '/items/1.0/item/1',
+            headers={'HTTP_IF_NONE_MATCH': etag})
+
+        self.assertEqual(status, '304 Not Modified')
+        self.assertEqual(headers['ETag'], etag)
+        self.assertNotIn('Content-Length', headers)
+        self.assertEqual(body, b'')
+
+        status, headers, body = self.request(server, GET, '/items/1.0/item/3',
+            headers={'HTTP_IF_NONE_MATCH': etag})
+
+        self.assertEqual(status, '200 OK')
+        self.assertNotEqual(headers['ETag'], etag)
+
+    def test_versioned_etags(self):
+        server = HttpServer([ItemBundle])
+        status, headers, body = self.request(server, GET, '/items/1.0/item/2')
+
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(headers['ETag'], '"v2"')
+
+        status, headers, body = self.request(server, GET, '/items/1.0/item/2',
+            headers={'HTTP_IF_NONE_MATCH': 'W/"v1", "v2"'})
+
+        self.assertEqual(status, '304 Not Modified')
+        self.assertEqual(body, b'')
+
+    def test_compression(self):
+        server = HttpServer([ExampleBundle], compression=Compression(threshold=5))
+        status, headers, body = self.request(server, POST, '/examples/1.0/example',
+            '{"id": 2}', JSON, headers={'HTTP_ACCEPT_ENCODING': 'deflate;q=0.5, gzip'})
+
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(headers['Content-Length'], str(len(body)))
+        self.assertEqual(Compression.decompress(body, 'gzip'), b'{"id": 2}')
+
+        status, headers, body = self.request(server, POST, '/examples/1.0/example',
+            '{"id": 2}', JSON)
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertEqual(body, b'{"id": 2}')
+
+        server.compression = Compression(threshold=100)
+        status, headers, body = self.request(server, POST, '/examples/1.0/example',
+            '{"id": 2}', JSON, headers={'HTTP_ACCEPT_ENCODING': 'gzip'})
+        self.assertNotIn('Content-Encoding', headers)
+
+        data = Compression().compress(b'{"id": 3}', 'deflate')
+        status, headers, body = self.request(server, POST, '/examples/1.0/example',
+            data, JSON, headers={'HTTP_CONTENT_ENCODING': 'deflate'})
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(body, b'{"id": 3}')
+
+    def test_streaming(self):
+        server = HttpServer([ItemBundle])
+        status, headers, body = self.request(server, GET, '/items/1.0/item')
+
+        self.assertEqual(status, '200 OK')
+        self.assertNotIn('Content-Length', headers)
+        self.assertNotIn('ETag', headers)
+
+        data = json.loads(body.decode('utf8'))
+        self.assertEqual(data['total'], 500)
+        self.assertEqual(len(data['resources']), 500)
+        self.assertEqual(data['resources'][-1], {'id': 500, 'name': 'item 500'})
+
+        server.StreamChunkSize = 1024
+        chunks = list(server._serialize_stream(Json, {'resources': iter(data['resources'])}))
+        self.assertTrue(len(chunks) > 1)
+        self.assertEqual(json.loads(b''.join(chunks).decode('utf8')),
+            {'resources': data['resources']})
+
+        server.compression = Compression()
+        status, headers, body = self.request(server, GET, '/items/1.0/item',
+            headers={'HTTP_ACCEPT_ENCODING': 'gzip'})
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(Compression.decompress(body, 'gzip').decode('utf8')), data)
+
+    def test_invalid_streamed_resources(self):
+        server = HttpServer([ItemBundle])
+        response = server.dispatch(GET, '/items/1.0/item', None, {'invalid': True}, {}, None,
+            None)
+
+        self.assertEqual(response.status, OK)
+        self.assertRaises(StructuralError, list, response.data)
+
+    def test_exhausted_streams(self):
+        server = InternalServer([ItemBundle])
+        response = server.dispatch(Address.parse('query::/items/1.0/item'))
+
+        self.assertEqual(response.status, OK)
+        self.assertIsInstance(response.data['resources'], list)
+        self.assertEqual(len(response.data['resources']), 500)
+
+    def test_chunked_request_bodies(self):
+        server = HttpServer([ExampleBundle], max_request_size=64)
+        chunked = {'HTTP_TRANSFER_ENCODING': 'chunked', 'CONTENT_LENGTH': ''}
+
+        status, headers, body = self.request(server, POST, '/examples/1.0/example',
+            b'3;ext=1\r\n{"i\r\n6\r\nd": 2}\r\n0\r\nTrailer: 1\r\n\r\n', JSON, headers=chunked)
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(body, b'{"id": 2}')
+
+        status, headers, body = self.request(server, POST, '/examples/1.0/example',
+            b'{"id": 3}', JSON, headers=dict(chunked, **{'wsgi.input_terminated': True}))
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(body, b'{"id": 3}')
+
+        status, headers, body = self.request(server, POST, '/examples/1.0/example',
+            b'20\r\n' + b' ' * 32 + b'\r\n30\r\n', JSON, headers=chunked)
+        self.assertEqual(status, '413 Payload Too Large')
+
+    def test_oversized_request_bodies(self):
+        class UnreadableInput(object):
+            def read(self, *args):
+                raise AssertionError('input was read')
+
+        server = HttpServer([ExampleBundle], max_request_size=8)
+        status, headers, body = self.request(server, POST, '/examples/1.0/example',
+            '{"id": 2}', JSON, headers={'wsgi.input': UnreadableInput()})
+        self.assertEqual(status, '413 Payload Too Large')
+
+        data = Compression().compress(b'{"id": 2}' + b' ' * 200, 'gzip')
+        server.max_request_size = len(data)
+
+        status, headers, body = self.request(server, POST, '/examples/1.0/example',
+            data, JSON, headers={'HTTP_CONTENT_ENCODING': 'gzip'})
+        self.assertEqual(status, '413 Payload Too Large')
+
+    def test_response_caching(self):
+        server = HttpServer([ItemBundle], cache=ResponseCache())
+        ItemController.calls = 0
+        ItemController.names = {}
+
+        status, headers, body = self.request(server, GET, '/items/1.0/item/5')
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(body, b'{"id": 5, "name": "item 5"}')
+
+        status, cached_headers, cached_body = self.request(server, GET, '/items/1.0/item/5')
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(cached_body, body)
+        self.assertEqual(cached_headers['ETag'], headers['ETag'])
+        self.assertEqual(ItemController.calls, 1)
+
+        status, headers, body = self.request(server, GET, '/items/1.0/item/5',
+            headers={'HTTP_IF_NONE_MATCH': headers['ETag']})
+        self.assertEqual(status, '304 Not Modified')
+        self.assertEqual(ItemController.calls, 1)
+
+        status, headers, body = self.request(server, POST, '/items/1.0/item',
+            '{"name": "changed"}', JSON)
+        self.assertEqual(status, '200 OK')
+
+        status, headers, body = self.request(server, GET, '/items/1.0/item/5')
+        self.assertEqual(body, b'{"id": 5, "name": "changed"}')
+        self.assertEqual(ItemController.calls, 2)
+
+        ItemController.names['5'] = 'changed again'
+        self.request(server, GET, '/items/1.0/item/5')
+        self.assertEqual(ItemController.calls, 2)
+
+        ItemController.invalidate(5)
+        status, headers, body = self.request(server, GET, '/items/1.0/item/5')
+        self.assertEqual(body, b'{"id": 5, "name": "changed again"}')
+        self.assertEqual(ItemController.calls, 3)
+
+    def test_response_caching_across_bundles(self):
+        server = HttpServer([ItemBundle, OtherItemBundle], cache=ResponseCache())
+        ItemController.calls = 0
+        ItemController.names = {}
+
+        status, headers, body = self.request(server, GET, '/items/1.0/item/5')
+        self.assertEqual(body, b'{"id": 5, "name": "item 5"}')
+
+        status, headers, body = self.request(server, GET, '/others/1.0/item/5')
+        self.assertEqual(body, b'{"id": 5, "name": "other 5"}')
+
+        status, headers, body = self.request(server, POST, '/others/1.0/item',
+            '{"name": "changed"}', JSON)
+        self.assertEqual(status, '200 OK')
+
+        status, headers, body = self.request(server, GET, '/items/1.0/item/5')
+        self.assertEqual(body, b'{"id": 5, "name": "item 5"}')
+        self.assertEqual(ItemController.calls, 1)
+
+    def test_stale_responses(self):
+        cache = ResponseCache(ttl=0, stale_ttl=60)
+        server = HttpServer([ItemBundle], cache=cache)
+        ItemController.names = {}
+
+        status, headers, body = self.request(server, GET, '/items/1.0/item/6')
+        self.assertEqual(body, b'{"id": 6, "name": "item 6"}')
+
+        ItemController.names['6'] = 'changed'
+        status, headers, body = self.request(server, GET, '/items/1.0/item/6')
+        self.assertEqual(body, b'{"id": 6, "name": "item 6"}')
+
+        for i in range(100):
+            if not cache.revalidating:
+                break
+            time.sleep(0.01)
+
+        status, headers, body = self.request(server, GET, '/items/1.0/item/6')
+        self.assertEqual(body, b'{"id": 6, "name": "changed"}')
+
+    def test_batch_requests(self):
+        server = HttpServer([ItemBundle], batch_concurrency=4)
+        ItemController.names = {}
+
+        batch = {'requests': [
+            {'method': GET, 'path': '/items/1.0/item/1'},
+            {'method': POST, 'path': '/items/1.0/item', 'data': {'name': 'batched'}},
+            {'method': GET, 'path': '/items/1.0/item/5'},
+            {'method': POST, 'path': '/items/1.0/item', 'data': {'name': 1}},
+            {'method': GET, 'path': '/items/1.0/invalid'},
+            {'method': GET, 'path': '/items/1.0/item'},
+        ]}
+
+        status, headers, body = self.request(server, POST, '/_batch', json.dumps(batch), JSON)
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(headers['Content-Type'], JSON)
+
+        responses = json.loads(body.decode('utf8'))
+        self.assertEqual([response['status'] for response in responses],
+            [OK, OK, OK, INVALID, NOT_FOUND, OK])
+        self.assertEqual(responses[0]['data'], {'id': 1, 'name': 'item 1'})
+        self.assertEqual(responses[2]['data'], {'id': 5, 'name': 'batched'})
+        self.assertNotIn('data', responses[4])
+        self.assertEqual(len(responses[5]['data']['resources']), 500)
+
+        batch = {'requests': [{'method': GET, 'path': '/items/1.0/item/%d' % i}
+            for i in range(1, 21)], 'parallel': True}
+
+        status, headers, body = self.request(server, POST, '/_batch', json.dumps(batch), JSON)
+        responses = json.loads(body.decode('utf8'))
+        self.assertEqual([response['data']['id'] for response in responses], list(range(1, 21)))
+
+        for body in ('[]', '{"requests": [{"method": "GET"}]}', '{"requests": [1]}',
+                '{"requests": [{"method": "POST", "path": "/_batch"}]}'):
+            status, headers, body = self.request(server, POST, '/_batch', body, JSON)
+            self.assertEqual(status, '400 Bad Request')
+
+class TestRequestInput(TestCase):
+    def test_chunked_input(self):
+        stream = RequestInput(BytesIO(b'5\r\nab\ncd\r\n3\r\nef\n\r\n0\r\n\r\n'))
+        self.assertEqual(stream.readline(), b'ab\n')
+        self.assertEqual(stream.read(4), b'cdef')
+        self.assertEqual(stream.readline(), b'\n')
+        self.assertEqual(stream.read(), b'')
+
+        stream = RequestInput(BytesIO(b'5\r\nab'))
+        self.assertRaises(ValueError, stream.read)
+
+    def test_terminated_input(self):
+        stream = RequestInput(BytesIO(b'abc\ndef'), terminated=True)
+        stream.BlockSize = 2
+
+        self.assertEqual(stream.readline(), b'abc\n')
+        self.assertEqual(stream.read(), b'def')
+
+    def test_limits(self):
+        stream = RequestInput(BytesIO(b'5\r\nabcde\r\n10\r\n'), limit=10)
+        self.assertRaises(PayloadTooLargeError, stream.read)
+        self.assertEqual(stream.consumed, 5)
+
+        stream = RequestInput(BytesIO(b'abcdefghijk'), limit=10, terminated=True)
+        self.assertRaises(PayloadTooLargeError, stream.read)
@@ -0,0 +1,112 @@
+try:
+    from unittest2 import TestCase
+except ImportError:
+    from unittest import TestCase
+
+from mesh.constants import *
+from mesh.instrumentation import Histogram, Instrumentation
+from mesh.transport.http import HttpServer
+
+from tests.fixtures import *
+
+class TestHistogram(TestCase):
+    def test_observation(self):
+        histogram = Histogram((1, 10, 100))
+        for value in (0, 1, 5, 10, 50, 1000):
+            histogram.observe(value)
+
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['count'], 6)
+        self.assertEqual(snapshot['sum'], 1066)
+        self.assertEqual(snapshot['buckets'], [(1, 2), (10, 4), (100, 5)])
+
+class TestInstrumentation(TestCase):
+    def test_recording(self):
+        instrumentation = Instrumentation()
+        endpoint = Example.endpoints['test']
+
+        started = instrumentation.timer()
+        ended = instrumentation.record(endpoint, 'dispatch', started)
+        self.assertTrue(ended >= started)
+
+        instrumentation.record_response(endpoint, OK, 100)
+        instrumentation.record_response(endpoint, OK, 2000)
+        instrumentation.record_response(endpoint, INVALID)
+
+        snapshot = instrumentation.snapshot()['example:1:test']
+        self.assertEqual(snapshot['phases']['dispatch']['count'], 1)
+        self.assertEqual(snapshot['statuses'], {OK: 2, INVALID: 1})
+        self.assertEqual(snapshot['sizes']['count'], 2)
+        self.assertEqual(snapshot['sizes']['sum'], 2100)
+
+        instrumentation.reset()
+        self.assertEqual(instrumentation.snapshot(), {})
+
+    def test_server_instrumentation(self):
+        instrumentation = Instrumentation()
+        server = HttpServer([ExampleBundle], instrumentation=instrumentation,
+            expose_metrics=True)
+
+        for data in ('{"id": 1}', '{"id": "invalid"}'):
+            server.dispatch(POST, '/examples/1.0/example', JSON, {}, {}, data, None)
+
+        response = server.dispatch('OPERATION', '/examples/1.0/example/2', JSON, {}, {},
+            None, None)
+        self.assertEqual(response.status, OK)
+
+        snapshot = instrumentation.snapshot()
+        test = snapshot['/examples/1.0:example:1:test']
+        self.assertEqual(test['statuses'], {OK: 1, INVALID: 1})
+        self.assertEqual(test['phases']['routing']['count'], 2)
+        self.assertEqual(test['phases']['parsing']['count'], 2)
+        self.assertEqual(test['phases']['validation']['count'], 2)
+        self.assertEqual(test['phases']['dispatch']['count'], 1)
+        self.assertEqual(test['phases']['response_validation']['count'], 2)
+        self.assertEqual(test['phases']['serialization']['count'], 2)
+        self.assertEqual(test['sizes']['count'], 2)
+
+        operation = snapshot['/examples/1.0:example:1:operation']
+        self.assertEqual(operation['phases']['acquisition']['count'], 1)
+        self.assertNotIn('parsing', operation['phases'])
+
+        response = server.dispatch(GET, '/_metrics', None, {}, {}, None, None)
+        self.assertEqual(response.status, OK)
+        self.assertEqual(response.mimetype, 'text/plain; version=0.0.4')
+
+        lines = response.data.splitlines()
+        self.assertIn('# TYPE mesh_phase_duration_seconds histogram', lines)
+        self.assertIn('mesh_responses_total{bundle="examples/1.0",resource="example",'
+            'version="1",endpoint="test",status="INVALID"} 1', lines)
+        self.assertIn('mesh_phase_duration_seconds_count{bundle="examples/1.0",'
+            'resource="example",version="1",endpoint="operation",phase="dispatch"} 1', lines)
+
+        response = server.dispatch(POST, '/_batch', JSON, {}, {},
+            '{"requests": [{"method": "GET", "path": "/_metrics"}]}', None)
+        self.assertEqual(response.status, BAD_REQUEST)
+
+        server = HttpServer([ExampleBundle], instrumentation=instrumentation)
+        response = server.dispatch(GET, '/_metrics', None, {}, {}, None, None)
+        self.assertEqual(response.status, NOT_FOUND)
+
+    def test_bundles_and_prefixes(self):
+        from mesh.bundle import Bundle, mount
+
+        instrumentation = Instrumentation()
+        server = HttpServer([ExampleBundle, Bundle('others', mount(Example, ExampleController))],
+            prefix='api', instrumentation=instrumentation, expose_metrics=True)
+
+        for bundle in ('examples', 'others', 'others'):
+            response = server.dispatch(POST, '/api/%s/1.0/example' % bundle, JSON, {}, {},
+                '{"id": 1}', None)
+            self.assertEqual(response.status, OK)
+
+        snapshot = instrumentation.snapshot()
+        self.assertEqual(snapshot['/api/examples/1.0:example:1:test']['statuses'], {OK: 1})
+        self.assertEqual(snapshot['/api/others/1.0:example:1:test']['statuses'], {OK: 2})
+
+        response = server.dispatch(GET, '/api/_metrics', None, {}, {}, None, None)
+        lines = response.data.splitlines()
+        self.assertIn('mesh_responses_total{prefix="/api",bundle="examples/1.0",'
+            'resource="example",version="1",endpoint="test",status="OK"} 1', lines)
+        self.assertIn('mesh_responses_total{prefix="/api",bundle="others/1.0",'
+            'resource="example",version="1",endpoint="test",status="OK"} 2', lines)
@@ -1,7 +1,13 @@
 try:
-    from unittest2 import TestCase
+    from unittest2 import TestCase, skipIf
 except ImportError:
-    from unittest import TestCase
+    from unittest import TestCase, skipIf
+
+try:
+    import asyncio
+    from tests.asynchronous_fixtures import *
+except (ImportError, SyntaxError):
+    asyncio = None
 
 from scheme import formats
 
@@ -56,3 +62,103 @@ class TestInternalTransport(TestCase):
         for invalid in ('invalid::/examples/1.0/example', 'operation::/examples/1.0/invalid'):
             with self.assertRaises(NotFoundError):
                 self.client.execute(invalid)
+
+class TestFrozenInternalTransport(TestCase):
+    def setUp(self):
+        self.server = InternalServer([ExampleBundle])
+
+    def test_frozen_responses(self):
+        from mesh.util import FrozenMapping
+
+        client = InternalClient(self.server, 'examples', frozen=True)
+        response = client.execute('test::/examples/1.0/example', data={'id': 2})
+        self.assertEqual(response.status, OK)
+        self.assertIsInstance(response.data, FrozenMapping)
+        self.assertEqual(response.data, {'id': 2})
+        self.assertEqual(response.data.thaw(), {'id': 2})
+
+        response = client.execute('test::/examples/1.0/example', data=response.data)
+        self.assertEqual(response.data, {'id': 2})
+
+        response = client.execute('test::/examples/1.0/example', data={'id': 2},
+            format='json')
+        self.assertEqual(response.data, {'id': 2})
+        self.assertIsInstance(response.data, dict)
+
+        client = InternalClient(self.server, 'examples')
+        response = client.execute('test::/examples/1.0/example', data={'id': 2})
+        self.assertIsInstance(response.data, dict)
+
+class TestConcurrentInternalTransport(TestCase):
+    def setUp(self):
+        self.server = InternalServer([ExampleBundle])
+        self.client = InternalClient(self.server, 'examples')
+
+    def tearDown(self):
+        if self.client._executor is not None:
+            self.client._executor.shutdown()
+
+    def test_future_execution(self):
+        futures = [self.client.execute_future('operation::/examples/1.0/example', i)
+            for i in range(1, 11)]
+        self.assertEqual([future.result().data for future in futures],
+            [{'id': i} for i in range(1, 11)])
+
+        future = self.client.execute_future('test::/examples/1.0/example', data={'id': 2},
+            format='json')
+        self.assertEqual(future.result().data, {'id': 2})
+
+    def test_future_execution_errors(self):
+        future = self.client.execute_future('operation::/examples/1.0/invalid')
+        with self.assertRaises(NotFoundError):
+            future.result()
+
+        future = self.client.execute_future('test::/examples/1.0/example',
+            data={'id': 'invalid'})
+        with self.assertRaises(InvalidError):
+            future.result()
+
+@skipIf(asyncio is None, 'asyncio is not available')
+class TestAsyncInternalTransport(TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def test_synchronous_controllers(self):
+        client = InternalClient(InternalServer([ExampleBundle]), 'examples')
+        try:
+            responses = self.loop.run_until_complete(asyncio.gather(*[client.execute_async(
+                'operation::/examples/1.0/example', i) for i in range(1, 11)]))
+            self.assertEqual([response.data for response in responses],
+                [{'id': i} for i in range(1, 11)])
+
+            with self.assertRaises(NotFoundError):
+                self.loop.run_until_complete(
+                    client.execute_async('operation::/examples/1.0/invalid'))
+        finally:
+            client.executor.shutdown()
+
+    def test_coroutine_controllers(self):
+        server = InternalServer([ThingBundle], mediators=[ForbiddingMediator()])
+        client = InternalClient(server, 'things', frozen=True)
+
+        ThingController.peak = 0
+        responses = self.loop.run_until_complete(asyncio.gather(*[client.execute_async(
+            'create::/things/1.0/thing', data={'name': 'abc'}) for i in range(10)]))
+        self.assertEqual([response.data for response in responses], [{'id': 3}] * 10)
+        self.assertGreater(ThingController.peak, 1)
+
+        response = self.loop.run_until_complete(
+            client.execute_async('get::/things/1.0/thing', 3, format='json'))
+        self.assertEqual(response.data, {'id': 3, 'name': 'thing 3'})
+
+        with self.assertRaises(GoneError):
+            self.loop.run_until_complete(client.execute_async('get::/things/1.0/thing', '0'))
+
+        with self.assertRaises(ForbiddenError):
+            self.loop.run_until_complete(client.execute_async('get::/things/1.0/thing', 3,
+                context={'forbidden': True}))
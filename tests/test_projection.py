@@ -0,0 +1,97 @@
+try:
+    from unittest2 import TestCase
+except ImportError:
+    from unittest import TestCase
+
+from scheme import *
+
+from mesh.address import Address
+from mesh.constants import *
+from mesh.projection import Projection
+from mesh.resource import Controller
+from mesh.standard import Resource
+from mesh.transport.base import Request, Response
+from mesh.util import LruCache
+
+class Document(Resource):
+    name = 'document'
+    version = 1
+
+    class schema:
+        title = Text()
+        author = Text()
+        body = Text(deferred=True)
+
+class DocumentController(Controller):
+    resource = Document
+    version = (1, 0)
+
+    projections = []
+    document = {'id': 1, 'title': 'Title', 'author': 'Author', 'body': 'Body'}
+
+    def acquire(self, subject):
+        return self.document
+
+    def get(self, request, response, subject, data):
+        self.projections.append(request.projection)
+        response(subject)
+
+    def query(self, request, response, subject, data):
+        self.projections.append(request.projection)
+        response({'total': 1, 'resources': iter([self.document])})
+
+def process(name, subject=None, data=None):
+    address = Address(bundle=('documents', (1, 0)), resource='document', subject=subject)
+    request, response = Request(address, data), Response()
+    Document.endpoints[name].process(DocumentController, request, response)
+    return response
+
+class TestProjection(TestCase):
+    def test_resolution(self):
+        structure = Document.endpoints['get'].responses[OK].schema
+
+        projection = Projection.resolve(structure)
+        self.assertEqual(projection.fields, frozenset(['id', 'title', 'author']))
+        self.assertFalse(projection.complete)
+
+        projection = Projection.resolve(structure, {'include': ['body'], 'exclude': ['title']})
+        self.assertEqual(projection.fields, frozenset(['id', 'author', 'body']))
+
+        projection = Projection.resolve(structure, {'fields': ['title', 'author', 'body'],
+            'exclude': ['author']})
+        self.assertEqual(set(projection), set(['id', 'title', 'author', 'body']))
+        self.assertTrue(projection.complete)
+        self.assertIn('body', projection)
+
+        projected = projection.project(structure)
+        self.assertEqual(set(projected.structure.keys()), set(structure.structure.keys()))
+        self.assertFalse(projected.strict)
+
+    def test_projected_responses(self):
+        response = process('get', 1, {'fields': ['title']})
+        self.assertEqual(response.status, OK)
+        self.assertEqual(response.data, {'id': 1, 'title': 'Title'})
+        self.assertEqual(DocumentController.projections[-1].fields, frozenset(['id', 'title']))
+
+        response = process('get', 1, {'include': ['body']})
+        self.assertEqual(response.data, DocumentController.document)
+
+        response = process('query', data={'exclude': ['author']})
+        self.assertEqual(response.status, OK)
+        self.assertEqual(response.data, {'total': 1, 'resources': [{'id': 1,
+            'title': 'Title'}]})
+
+        endpoint = Document.endpoints['get']
+        self.assertEqual(len(endpoint.projections), 1)
+
+        processors = dict(endpoint.processors)
+        projections, endpoint.projections = endpoint.projections, LruCache(1)
+        try:
+            for fields in (['title'], ['author'], ['title']):
+                response = process('get', 1, {'fields': fields})
+                self.assertEqual(set(response.data.keys()), set(['id'] + fields))
+                self.assertEqual(len(endpoint.projections), 1)
+        finally:
+            endpoint.projections = projections
+
+        self.assertEqual(endpoint.processors, processors)
@@ -514,3 +514,111 @@ class TestController(TestHarness):
             class ExampleController(ExampleController):
                 resource = Second
                 version = (1, 1)
+
+class TestControllerLifecycle(TestHarness):
+    def _construct_lifecycle_controller(self, declared_lifecycle, **params):
+        example = self._construct_example_resource()
+
+        class ExampleController(Controller):
+            resource = example
+            version = (1, 0)
+            lifecycle = declared_lifecycle
+            events = []
+
+            def setup(self):
+                self.events.append(('setup', self))
+
+            def teardown(self):
+                self.events.append(('teardown', self))
+
+            def test(self, request, response, subject, data):
+                response(OK, {'id': id(self)})
+
+        for name, value in params.items():
+            setattr(ExampleController, name, value)
+        return ExampleController
+
+    def _process(self, controller):
+        from mesh.address import Address
+        from mesh.transport.base import Request, Response
+
+        request = Request(Address('test', None, ('bundle', (1, 0)), 'example'))
+        response = Response()
+        controller.resource.endpoints['test'].process(controller, request, response)
+        return response.data['id']
+
+    def test_transient_instances(self):
+        ExampleController = self._construct_lifecycle_controller(None)
+        self.assertIsNone(ExampleController.provider)
+
+        self._process(ExampleController)
+        self.assertEqual(ExampleController.events, [])
+
+    def test_singleton_instances(self):
+        ExampleController = self._construct_lifecycle_controller('singleton')
+        first = self._process(ExampleController)
+        self.assertEqual(self._process(ExampleController), first)
+
+        events = ExampleController.events
+        self.assertEqual([event for event, instance in events], ['setup'])
+
+        ExampleController.shutdown()
+        self.assertEqual([event for event, instance in events], ['setup', 'teardown'])
+        self.assertNotEqual(self._process(ExampleController), first)
+
+    def test_thread_instances(self):
+        from threading import Thread
+
+        ExampleController = self._construct_lifecycle_controller('thread')
+        identities = [self._process(ExampleController)]
+
+        thread = Thread(target=lambda: identities.append(self._process(ExampleController)))
+        thread.start()
+        thread.join()
+
+        identities.append(self._process(ExampleController))
+        self.assertEqual(len(set(identities)), 2)
+        self.assertEqual(identities[0], identities[2])
+
+        ExampleController.shutdown()
+        self.assertEqual(len([e for e, i in ExampleController.events if e == 'teardown']), 2)
+
+    def test_thread_instances_of_exited_threads(self):
+        from threading import Thread
+
+        ExampleController = self._construct_lifecycle_controller('thread')
+        provider, events = ExampleController.provider, ExampleController.events
+
+        for i in range(3):
+            thread = Thread(target=lambda: self._process(ExampleController))
+            thread.start()
+            thread.join()
+            self.assertEqual(len(provider.instances), 1)
+
+        self.assertEqual([event for event, instance in events],
+            ['setup', 'teardown', 'setup', 'teardown', 'setup'])
+        self.assertEqual(len(provider.threads), 1)
+
+        self._process(ExampleController)
+        self.assertEqual(len(provider.instances), 1)
+        self.assertEqual(events[-2][0], 'teardown')
+
+        ExampleController.shutdown()
+        self.assertEqual(provider.instances, [])
+
+    def test_pooled_instances(self):
+        ExampleController = self._construct_lifecycle_controller('pooled', pool_size=1)
+        self.assertEqual(self._process(ExampleController), self._process(ExampleController))
+
+        provider = ExampleController.provider
+        first, second = provider.acquire(), provider.acquire()
+        self.assertIsNot(first, second)
+
+        provider.release(first)
+        provider.release(second)
+        self.assertEqual(ExampleController.events[-1], ('teardown', second))
+        self.assertIs(provider.acquire(), first)
+
+    def test_invalid_lifecycle(self):
+        with self.assertRaises(SpecificationError):
+            self._construct_lifecycle_controller('invalid')
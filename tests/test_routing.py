@@ -0,0 +1,69 @@
+try:
+    from unittest2 import TestCase
+except ImportError:
+    from unittest import TestCase
+
+from mesh.address import Address
+from mesh.transport.routing import *
+
+def construct_router(prefix=None, capacity=1000):
+    router = Router(prefix, capacity)
+    collection = Address(prefix=prefix, bundle=('example', (1, 0)), resource='item')
+    nested = Address(prefix=prefix, bundle=('example', (1, 0), 'nested', (2, 1)),
+        resource='item')
+
+    router.add(collection, 'POST', 'item', 'controller', 'create')
+    router.add(collection.clone(subject=True), 'GET', 'item', 'controller', 'get')
+    router.add(collection.clone(subject=True), 'PUT', 'item', 'controller', 'put')
+    router.add(nested.clone(subject=True), 'GET', 'nested', 'controller', 'get')
+    return router
+
+class TestRouter(TestCase):
+    def test_resolution(self):
+        router = construct_router()
+
+        address, candidates = router.resolve('/example/1.0/item')
+        self.assertEqual(address.signature, (None, None, ('example', (1, 0)), 'item'))
+        self.assertEqual(candidates, {'POST': ('item', 'controller', 'create')})
+
+        address, candidates = router.resolve('/example/1.0/item/a-1:2/')
+        self.assertEqual(address.subject, 'a-1:2')
+        self.assertEqual(sorted(candidates), ['GET', 'PUT'])
+
+        address, candidates = router.resolve('/example/1.0/nested/2.1/item/3!json')
+        self.assertEqual(address.bundle, ('example', (1, 0), 'nested', (2, 1)))
+        self.assertEqual(address.subject, '3')
+        self.assertEqual(address.format, 'json')
+        self.assertEqual(candidates['GET'][0], 'nested')
+
+        for path in ('', '/', '/example', '/example/1.0', '/example/2.0/item',
+                '/example/1.0/item/1/2', '/example/1.0/item/a b', '/example/1.0/item//',
+                '/example/1.0/item!', 'example/1.0/item'):
+            self.assertIs(router.resolve(path), None, path)
+
+    def test_prefixed_resolution(self):
+        router = construct_router('/api')
+
+        address, candidates = router.resolve('/api/example/1.0/item/1')
+        self.assertEqual(address.prefix, '/api')
+        self.assertEqual(address.render_prefixed_path(), '/api/example/1.0/item/1')
+
+        self.assertIs(router.resolve('/example/1.0/item/1'), None)
+        self.assertIs(router.resolve('/apix/example/1.0/item/1'), None)
+
+    def test_memoization(self):
+        router = construct_router()
+        first = router.resolve('/example/1.0/item/1')
+        self.assertIn('/example/1.0/item/1', router.cache)
+
+        second = router.resolve('/example/1.0/item/1')
+        self.assertIsNot(first[0], second[0])
+        self.assertEqual(second[0].subject, '1')
+        self.assertIs(first[1], second[1])
+
+        router.resolve('/example/1.0/item/1/2')
+        self.assertEqual(len(router.cache), 1)
+
+        router = construct_router(capacity=0)
+        self.assertIs(router.cache, None)
+        self.assertEqual(router.resolve('/example/1.0/item/1')[0].subject, '1')
@@ -0,0 +1,88 @@
+try:
+    from unittest2 import TestCase
+except ImportError:
+    from unittest import TestCase
+
+from mesh.util import *
+
+class TestLruCache(TestCase):
+    def test_eviction(self):
+        cache = LruCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertEqual(cache.get('b', 0), 0)
+
+    def test_expiration(self):
+        cache = LruCache(ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2, -1)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+
+    def test_discarding(self):
+        cache = LruCache()
+        for key in (('a', 1), ('a', 2), ('b', 1)):
+            cache.set(key, True)
+
+        cache.discard(('b', 1))
+        self.assertNotIn(('b', 1), cache)
+
+        cache.discard_matching(lambda key: key[0] == 'a')
+        self.assertEqual(len(cache), 0)
+
+class TestExecuteConcurrently(TestCase):
+    def test_execution(self):
+        def divide(value):
+            return 12 // value
+
+        results = execute_concurrently(divide, [(1,), (0,), (3,)], 2)
+        self.assertEqual(results[0], 12)
+        self.assertIsInstance(results[1], ZeroDivisionError)
+        self.assertEqual(results[2], 4)
+
+class TestFreezing(TestCase):
+    def test_frozen_views(self):
+        value = {'a': [1, {'b': 2}], 'c': 'c'}
+        frozen = freeze(value)
+
+        self.assertIsInstance(frozen, FrozenMapping)
+        self.assertEqual(frozen, value)
+        self.assertIsInstance(frozen['a'], FrozenSequence)
+        self.assertEqual(frozen['a'], [1, {'b': 2}])
+        self.assertIsInstance(frozen['a'][1], FrozenMapping)
+        self.assertEqual(frozen['a'][1:], [{'b': 2}])
+        self.assertEqual(len(frozen), 2)
+        self.assertIn('c', frozen)
+
+        with self.assertRaises(TypeError):
+            frozen['c'] = 'd'
+        with self.assertRaises(TypeError):
+            frozen['a'][0] = 2
+        self.assertFalse(hasattr(frozen['a'], 'append'))
+
+        thawed = frozen.thaw()
+        self.assertEqual(thawed, value)
+        thawed['a'][1]['b'] = 3
+        self.assertEqual(value['a'][1]['b'], 2)
+
+        self.assertIs(freeze('a'), 'a')
+
+    def test_unwrapping(self):
+        value = {'a': [1, {'b': 2}]}
+        self.assertIs(unwrap(value), value)
+        self.assertIs(unwrap(freeze(value)), value)
+
+        composed = {'x': freeze(value), 'y': [freeze(value['a'])], 'z': [1]}
+        unwrapped = unwrap(composed)
+        self.assertIsNot(unwrapped, composed)
+        self.assertIs(unwrapped['x'], value)
+        self.assertIs(unwrapped['y'][0], value['a'])
+        self.assertIs(unwrapped['z'], composed['z'])
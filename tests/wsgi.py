@@ -1,5 +1,32 @@
-from wsgiref.simple_server import WSGIServer
+from threading import Thread
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
 
+try:
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from SocketServer import ThreadingMixIn
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+class ThreadedWsgiServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    @classmethod
+    def serve(cls, application):
+        server = cls(('127.0.0.1', 0), QuietRequestHandler)
+        server.set_app(application)
+
+        thread = Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return server
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
 
 class MockWSGIServer(object):
     application = None